@@ -0,0 +1,41 @@
+from http import HTTPStatus
+from typing import Optional
+
+from flask import Blueprint, jsonify, request
+
+from app.apis.params import describe_delay, parse_delay
+from app.utils.auth import is_authorized
+from app.utils.delay import DelayInjector
+
+
+def make_admin_blueprint(injector: DelayInjector, token: Optional[str] = None) -> Blueprint:
+    """
+    Create a Flask Blueprint that contains the endpoint for the admin APIs.
+    The delay profile is switched only in the process that serves the request,
+    and only by the clients that send `token` as `Authorization: Bearer <token>`.
+    :param injector: Injector of the synthetic delays.
+    :param token: Secret the clients must send to switch the delay profile, None to forbid it.
+    :return: Flask Blueprint with admin APIs.
+    """
+
+    blueprint = Blueprint("admin", __name__, url_prefix="/admin")
+
+    @blueprint.route("/delay", methods=["GET"])
+    def get_delay():
+        return jsonify(describe_delay(injector))
+
+    @blueprint.route("/delay", methods=["PUT"])
+    def configure_delay():
+        if token is None:
+            return "", HTTPStatus.NOT_FOUND
+        if not is_authorized(request.headers.get("Authorization"), token):
+            return "", HTTPStatus.UNAUTHORIZED, {"WWW-Authenticate": "Bearer"}
+        if not request.is_json:
+            return "", HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        try:
+            injector.configure(*parse_delay(request.json))
+        except ValueError:
+            return "", HTTPStatus.BAD_REQUEST
+        return "", HTTPStatus.NO_CONTENT
+
+    return blueprint
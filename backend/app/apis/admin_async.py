@@ -0,0 +1,42 @@
+from http import HTTPStatus
+from typing import Optional
+
+from aiohttp import web
+
+from app.apis.params import describe_delay, parse_delay
+from app.utils.auth import is_authorized
+from app.utils.delay import DelayInjector
+
+
+def make_async_admin_app(injector: DelayInjector, token: Optional[str] = None) -> web.Application:
+    """
+    Create an aiohttp application that contains the endpoint for the admin APIs.
+    It serves the same APIs as `make_admin_blueprint` and should be mounted at `/admin`.
+    :param injector: Injector of the synthetic delays.
+    :param token: Secret the clients must send to switch the delay profile, None to forbid it.
+    :return: aiohttp application with admin APIs.
+    """
+
+    routes = web.RouteTableDef()
+
+    @routes.get("/delay", name="get_delay")
+    async def get_delay(_: web.Request) -> web.StreamResponse:
+        return web.json_response(describe_delay(injector))
+
+    @routes.put("/delay", name="configure_delay")
+    async def configure_delay(request: web.Request) -> web.StreamResponse:
+        if token is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        if not is_authorized(request.headers.get("Authorization"), token):
+            return web.Response(status=HTTPStatus.UNAUTHORIZED, headers={"WWW-Authenticate": "Bearer"})
+        if request.content_type != "application/json":
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        try:
+            injector.configure(*parse_delay(await request.json()))
+        except ValueError:
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        return web.Response(status=HTTPStatus.NO_CONTENT)
+
+    app = web.Application()
+    app.add_routes(routes)
+    return app
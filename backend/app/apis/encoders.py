@@ -0,0 +1,115 @@
+import json
+import os
+from functools import lru_cache
+from typing import Sequence, Optional, Any
+from uuid import UUID
+
+from app.models.todo import Todo
+
+try:
+    import orjson
+except ImportError:  # pragma: nocover
+    orjson = None
+
+
+class TodoEncoder:
+    """
+    Serialize API responses to JSON bytes, with a fast path for Todos.
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Serialize any JSON-compatible object; UUIDs are serialized as strings.
+        :param obj: Object to serialize.
+        :return: JSON bytes.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def todo(self, todo: Todo) -> bytes:
+        """
+        :param todo: Todo to serialize.
+        :return: JSON object with the fields of the Todo.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def todos(self, todos: Sequence[Todo]) -> bytes:
+        """
+        :param todos: Todos to serialize.
+        :return: JSON array of Todo objects.
+        """
+        return b"[" + b",".join(map(self.todo, todos)) + b"]"
+
+    def page(self, todos: Sequence[Todo], next_: Optional[UUID]) -> bytes:
+        """
+        :param todos: Todos of the page.
+        :param next_: Cursor of the next page, None for the last page.
+        :return: JSON object with the Todos and the cursor of the next page.
+        """
+        return b'{"todos":' + self.todos(todos) + b',"next":' + self.dumps(next_) + b"}"
+
+
+class StdlibTodoEncoder(TodoEncoder):
+    """
+    Encoder based on the `json` module of the standard library.
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=str, separators=(",", ":")).encode()
+
+    def todo(self, todo: Todo) -> bytes:
+        return self.dumps(todo._asdict())
+
+    def todos(self, todos: Sequence[Todo]) -> bytes:
+        return self.dumps([todo._asdict() for todo in todos])
+
+
+class OrjsonTodoEncoder(TodoEncoder):
+    """
+    Encoder based on `orjson`, which serializes UUIDs natively.
+    Todos are encoded field by field, without building a dict for each of them.
+    The bytes of each Todo can be kept in a LRU cache: since Todos are immutable, the cache is keyed
+    by the Todo itself, so that modified Todos are always encoded again.
+    """
+
+    _ACTIVE = (b',"active":false}', b',"active":true}')
+
+    def __init__(self, cache_size: int = 0):
+        """
+        :param cache_size: Max number of encoded Todos to keep, 0 to disable the cache.
+        """
+        assert orjson is not None, "orjson is not installed"
+        assert cache_size >= 0
+        if cache_size:
+            self.todo = lru_cache(maxsize=cache_size)(self.todo)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str)
+
+    def todo(self, todo: Todo) -> bytes:
+        return b"".join(
+            (b'{"id":', orjson.dumps(todo.id), b',"text":', orjson.dumps(todo.text), self._ACTIVE[todo.active])
+        )
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserialize JSON bytes, with `orjson` when installed.
+    :param data: JSON bytes.
+    :return: Deserialized object.
+    :raise ValueError: If the bytes are not valid JSON.
+    """
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def make_encoder() -> TodoEncoder:
+    """
+    Create the encoder from the environment: `JSON_ENCODER` is `orjson` (the default when installed)
+    or `stdlib`, and `JSON_ENCODER_CACHE_SIZE` the number of encoded Todos to cache (default 0).
+    :return: Encoder.
+    """
+    name = os.environ.get("JSON_ENCODER", "orjson" if orjson is not None else "stdlib")
+    if name == "stdlib":
+        return StdlibTodoEncoder()
+    if name == "orjson":
+        return OrjsonTodoEncoder(cache_size=int(os.environ.get("JSON_ENCODER_CACHE_SIZE", 0)))
+    raise ValueError("Invalid JSON encoder: {}".format(name))
@@ -0,0 +1,180 @@
+import hashlib
+from typing import Optional, Tuple, List, Mapping, Iterator, Iterable, Any
+from uuid import UUID, uuid1
+
+from app.apis.encoders import loads
+from app.models.todo import Todo
+from app.utils.delay import DelayInjector
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 1000
+# Todos per chunk of the export: large enough to amortize the writes to the socket
+EXPORT_CHUNK_SIZE = 1000
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def parse_uuid(id_: str) -> UUID:
+    """
+    :param id_: ID from the URL.
+    :return: The ID, or the nil UUID, which matches no Todo, if malformed.
+    """
+    try:
+        return UUID(id_)
+    except ValueError:
+        return UUID(int=0)
+
+
+def parse_float(value: Optional[str]) -> float:
+    """
+    :param value: Number from a header or a cookie, if any.
+    :return: The number, 0 if missing or malformed.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def version_etag(version: int) -> str:
+    """
+    :param version: Data version of the repository.
+    :return: Strong entity tag, quoted, for any read served at that version.
+    """
+    return '"v{}"'.format(version)
+
+
+def body_etag(body: bytes) -> str:
+    """
+    :param body: Representation of a single Todo.
+    :return: Strong entity tag, quoted, that changes with the representation only:
+      unlike the version of the whole repository, it cannot match another Todo, nor be newer than the body.
+    """
+    return '"b{}"'.format(hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks whether a conditional request already holds the current representation.
+    :param if_none_match: Value of the If-None-Match header, if any.
+    :param etag: Current entity tag, quoted.
+    :return: True if the response can be 304 Not Modified.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # weak comparison, as required for If-None-Match
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def parse_batch(items: List[str]) -> List[str]:
+    """
+    Validates the items of a batch request.
+    :param items: Items from the JSON body, expected to be a list of strings.
+    :return: The same items.
+    :raise ValueError: If the items are not a list of strings or the batch is too large.
+    """
+    if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+        raise ValueError("Batch must be a list of strings")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError("Batch too large")
+    return items
+
+
+def parse_ndjson(lines: Iterable[bytes]) -> Iterator[Todo]:
+    """
+    Parses Todos from newline-delimited JSON, one line at a time.
+    :param lines: Lines of the body.
+    :return: Iterator over the Todos.
+    :raise ValueError: If a line is not a valid Todo.
+    """
+    for line in lines:
+        todo = parse_ndjson_line(line)
+        if todo is not None:
+            yield todo
+
+
+def parse_ndjson_line(line: bytes) -> Optional[Todo]:
+    """
+    Parses a Todo from a JSON object: without ID, it gets a new one, and it is active unless stated otherwise.
+    :param line: Line of newline-delimited JSON.
+    :return: The Todo, None for a blank line.
+    :raise ValueError: If the line is not a valid Todo.
+    """
+    if not line.strip():
+        return None
+    # both JSONDecodeError and orjson.JSONDecodeError are ValueErrors
+    item = loads(line)
+    if not isinstance(item, dict):
+        raise ValueError("Todo must be an object")
+    id_raw, text, active = item.get("id"), item.get("text"), item.get("active", True)
+    if not isinstance(text, str) or not isinstance(active, bool) or not isinstance(id_raw, (str, type(None))):
+        raise ValueError("Invalid Todo")
+    return Todo(id=UUID(id_raw) if id_raw is not None else uuid1(), text=text, active=active)
+
+
+def parse_page(args: Mapping[str, str]) -> Tuple[Optional[UUID], int]:
+    """
+    Extracts the keyset pagination parameters from the query string.
+    :param args: Query string arguments.
+    :return: Cursor (None for the first page) and page size.
+    :raise ValueError: If any parameter is malformed or out of range.
+    """
+    after_raw = args.get("after")
+    after = UUID(after_raw) if after_raw else None
+    limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError("Page size out of range")
+    return after, limit
+
+
+def parse_filters(args: Mapping[str, str]) -> Tuple[Optional[bool], Optional[str]]:
+    """
+    Extracts the filters of the Todos from the query string.
+    :param args: Query string arguments.
+    :return: Status of the Todos (None for any) and text they must contain (None for any).
+    :raise ValueError: If the status is neither `true` nor `false`.
+    """
+    active_raw = args.get("active")
+    if active_raw is None:
+        active = None
+    elif active_raw in ("true", "false"):
+        active = active_raw == "true"
+    else:
+        raise ValueError("Invalid status filter")
+    return active, args.get("q") or None
+
+
+def describe_delay(injector: DelayInjector) -> Mapping[str, Any]:
+    """
+    :param injector: Injector of the synthetic delays.
+    :return: Current delay profile and seed, and the delays of every profile.
+    """
+    return {
+        "profile": injector.profile,
+        "seed": injector.seed,
+        "profiles": {
+            name: {point: delay._asdict() for point, delay in delays.items()}
+            for name, delays in injector.profiles.items()
+        },
+    }
+
+
+def parse_delay(body: Any) -> Tuple[str, Optional[int]]:
+    """
+    Extracts the delay configuration from the JSON body.
+    :param body: JSON body, e.g. `{"profile": "none", "seed": 42}`.
+    :return: Profile name and seed (None to keep the current one).
+    :raise ValueError: If any field is missing or malformed.
+    """
+    if not isinstance(body, dict) or not isinstance(body.get("profile"), str):
+        raise ValueError("Missing delay profile")
+    seed = body.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError("Seed must be an integer")
+    return body["profile"], seed
@@ -1,33 +1,130 @@
+import math
+import time
 from http import HTTPStatus
-from uuid import UUID
+from itertools import islice
+from typing import Optional, Iterator
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, g
 
+from app.apis.encoders import TodoEncoder, make_encoder
+from app.apis.params import (
+    EXPORT_CHUNK_SIZE,
+    NDJSON_MIMETYPE,
+    parse_uuid,
+    parse_float,
+    parse_page,
+    parse_filters,
+    parse_batch,
+    parse_ndjson,
+    version_etag,
+    body_etag,
+    etag_matches,
+)
 from app.repository.base import Repository
+from app.repository.routing import pin_to_primary, unpin
 
+# cookie holding the time, in seconds since the epoch, until which the client reads from the primary
+READ_YOUR_WRITES_COOKIE = "read_your_writes_until"
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
 
-def make_todos_blueprint(repository: Repository) -> Blueprint:
+
+def make_todos_blueprint(
+    repository: Repository, encoder: Optional[TodoEncoder] = None, read_your_writes_window: float = 0.0
+) -> Blueprint:
     """
     Create a Flask Blueprint that contains the endpoint for all Todo REST APIs.
     :param repository: Instance of a ready-to-use repository.
+    :param encoder: Encoder of the Todos read, configured from the environment by default.
+    :param read_your_writes_window: Time during which a client that wrote reads from the primary, in seconds,
+      so that it sees its writes even when reads usually go to a lagging replica. 0 to disable.
     :return: Flask Blueprint with Todo APIs.
     """
 
+    encoder = encoder or make_encoder()
     blueprint = Blueprint("todos", __name__, url_prefix="/todos")
 
+    if read_your_writes_window > 0:
+
+        @blueprint.before_request
+        def pin_recent_writers() -> None:
+            if parse_float(request.cookies.get(READ_YOUR_WRITES_COOKIE)) > time.time():
+                g.read_your_writes_token = pin_to_primary()
+
+        @blueprint.after_request
+        def remember_writers(response: Response) -> Response:
+            if request.method not in READ_METHODS and 200 <= response.status_code < 300:
+                response.set_cookie(
+                    READ_YOUR_WRITES_COOKIE,
+                    "{:.3f}".format(time.time() + read_your_writes_window),
+                    max_age=math.ceil(read_your_writes_window),
+                    path=blueprint.url_prefix,
+                    httponly=True,
+                )
+            return response
+
+        @blueprint.teardown_request
+        def unpin_recent_writers(_: Optional[BaseException]) -> None:
+            token = g.pop("read_your_writes_token", None)
+            if token is not None:
+                unpin(token)
+
     @blueprint.route("/<id_raw>", methods=["GET"])
     def get_todo(id_raw: str):
-        id_ = _parse_uuid(id_raw)
+        id_ = parse_uuid(id_raw)
         todo = repository.get(id_)
         if todo is None:
             return "", HTTPStatus.NOT_FOUND
-        else:
-            return jsonify(todo._asdict())
+        body = encoder.todo(todo)
+        etag = body_etag(body)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return "", HTTPStatus.NOT_MODIFIED, {"ETag": etag}
+        return _json_response(body, etag)
 
     @blueprint.route("/", methods=["GET"])
     def list_todos():
-        todos = repository.list()
-        return jsonify([todo._asdict() for todo in todos])
+        paginated = "after" in request.args or "limit" in request.args
+        try:
+            after, limit = parse_page(request.args)
+            active, text = parse_filters(request.args)
+        except ValueError:
+            return "", HTTPStatus.BAD_REQUEST
+        filtered = active is not None or bool(text)
+        etag = version_etag(repository.version())
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return "", HTTPStatus.NOT_MODIFIED, {"ETag": etag}
+        if not paginated:
+            todos = repository.search(active=active, text=text) if filtered else repository.list()
+            return _json_response(encoder.todos(todos), etag)
+        if filtered:
+            todos = repository.search(active=active, text=text, after=after, limit=limit)
+        else:
+            todos = repository.list_page(after=after, limit=limit)
+        next_ = todos[-1].id if len(todos) == limit else None
+        return _json_response(encoder.page(todos, next_), etag)
+
+    @blueprint.route("/export", methods=["GET"])
+    def export_todos():
+        # called now, so that the export reads from the pool picked for this request
+        todos = repository.export_todos()
+
+        def chunks() -> Iterator[bytes]:
+            while True:
+                chunk = b"".join(encoder.todo(todo) + b"\n" for todo in islice(todos, EXPORT_CHUNK_SIZE))
+                if not chunk:
+                    return
+                yield chunk
+
+        return Response(chunks(), mimetype=NDJSON_MIMETYPE)
+
+    @blueprint.route("/import", methods=["POST"])
+    def import_todos():
+        if request.mimetype != NDJSON_MIMETYPE:
+            return "", HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        try:
+            imported = repository.import_todos(todos=parse_ndjson(request.stream))
+        except ValueError:
+            return "", HTTPStatus.BAD_REQUEST
+        return jsonify(imported=imported)
 
     @blueprint.route("/", methods=["POST"])
     def create_todo():
@@ -49,7 +146,7 @@ def make_todos_blueprint(repository: Repository) -> Blueprint:
             return "", HTTPStatus.UNSUPPORTED_MEDIA_TYPE
         else:
             try:
-                id_ = _parse_uuid(id_raw)
+                id_ = parse_uuid(id_raw)
                 result = repository.edit_text(id_=id_, text=request.json["text"])
                 return "", HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND
             except KeyError:
@@ -57,27 +154,68 @@ def make_todos_blueprint(repository: Repository) -> Blueprint:
 
     @blueprint.route("/<id_raw>/activate", methods=["POST"])
     def activate_todo(id_raw: str):
-        id_ = _parse_uuid(id_raw)
+        id_ = parse_uuid(id_raw)
         result = repository.activate(id_=id_)
         return "", HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND
 
     @blueprint.route("/<id_raw>/deactivate", methods=["POST"])
     def deactivate_todo(id_raw: str):
-        id_ = _parse_uuid(id_raw)
+        id_ = parse_uuid(id_raw)
         result = repository.deactivate(id_=id_)
         return "", HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND
 
     @blueprint.route("/<id_raw>", methods=["DELETE"])
     def delete_todo(id_raw: str):
-        id_ = _parse_uuid(id_raw)
+        id_ = parse_uuid(id_raw)
         result = repository.delete(id_)
         return "", HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND
 
+    @blueprint.route("/batch", methods=["POST"])
+    def create_todos():
+        if not request.is_json:
+            return "", HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        try:
+            texts = parse_batch(request.json["texts"])
+        except (KeyError, TypeError, ValueError):
+            return "", HTTPStatus.BAD_REQUEST
+        valid_texts = [text for text in texts if "speck" not in text.lower()]
+        ids = iter(repository.insert_many(texts=valid_texts))
+        results = [
+            {"id": next(ids), "status": HTTPStatus.CREATED}
+            if "speck" not in text.lower()
+            else {"status": HTTPStatus.INTERNAL_SERVER_ERROR}
+            for text in texts
+        ]
+        return jsonify(results=results)
+
+    @blueprint.route("/batch/activate", methods=["POST"])
+    def activate_todos():
+        return _update_many(lambda ids: repository.set_active_many(ids=ids, active=True))
+
+    @blueprint.route("/batch/deactivate", methods=["POST"])
+    def deactivate_todos():
+        return _update_many(lambda ids: repository.set_active_many(ids=ids, active=False))
+
+    @blueprint.route("/batch/delete", methods=["POST"])
+    def delete_todos():
+        return _update_many(lambda ids: repository.delete_many(ids=ids))
+
+    def _update_many(operation):
+        if not request.is_json:
+            return "", HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        try:
+            ids_raw = parse_batch(request.json["ids"])
+        except (KeyError, TypeError, ValueError):
+            return "", HTTPStatus.BAD_REQUEST
+        ids = [parse_uuid(id_raw) for id_raw in ids_raw]
+        results = [
+            {"id": id_raw, "status": HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND}
+            for id_raw, result in zip(ids_raw, operation(ids))
+        ]
+        return jsonify(results=results)
+
     return blueprint
 
 
-def _parse_uuid(id_: str) -> UUID:
-    try:
-        return UUID(id_)
-    except ValueError:
-        return UUID(int=0)
+def _json_response(body: bytes, etag: str) -> Response:
+    return Response(body, mimetype="application/json", headers={"ETag": etag})
@@ -0,0 +1,215 @@
+import functools
+import json
+from http import HTTPStatus
+from typing import Callable, Awaitable, Sequence, Tuple, Optional, AsyncIterator
+from uuid import UUID
+
+from aiohttp import web
+
+from app.apis.encoders import TodoEncoder, make_encoder
+from app.apis.params import (
+    EXPORT_CHUNK_SIZE,
+    NDJSON_MIMETYPE,
+    parse_uuid,
+    parse_page,
+    parse_filters,
+    parse_batch,
+    parse_ndjson_line,
+    version_etag,
+    body_etag,
+    etag_matches,
+)
+from app.models.todo import Todo
+from app.repository.aio.base import AsyncRepository
+
+_dumps = functools.partial(json.dumps, default=str)
+
+
+def make_async_todos_app(
+    repository: AsyncRepository, encoder: Optional[TodoEncoder] = None
+) -> web.Application:
+    """
+    Create an aiohttp application that contains the endpoint for all Todo REST APIs.
+    It serves the same APIs as `make_todos_blueprint` and should be mounted at `/todos`.
+    :param repository: Instance of a ready-to-use asynchronous repository.
+    :param encoder: Encoder of the Todos read, configured from the environment by default.
+    :return: aiohttp application with Todo APIs.
+    """
+
+    encoder = encoder or make_encoder()
+
+    routes = web.RouteTableDef()
+
+    # batch routes go first: aiohttp matches routes in registration order
+    @routes.post("/batch", name="create_todos")
+    async def create_todos(request: web.Request) -> web.StreamResponse:
+        if request.content_type != "application/json":
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        try:
+            texts = parse_batch((await request.json())["texts"])
+        except (KeyError, TypeError, ValueError):
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        valid_texts = [text for text in texts if "speck" not in text.lower()]
+        ids = iter(await repository.insert_many(texts=valid_texts))
+        results = [
+            {"id": next(ids), "status": HTTPStatus.CREATED}
+            if "speck" not in text.lower()
+            else {"status": HTTPStatus.INTERNAL_SERVER_ERROR}
+            for text in texts
+        ]
+        return web.json_response({"results": results}, dumps=_dumps)
+
+    @routes.post("/batch/activate", name="activate_todos")
+    async def activate_todos(request: web.Request) -> web.StreamResponse:
+        return await _update_many(
+            request, lambda ids: repository.set_active_many(ids=ids, active=True)
+        )
+
+    @routes.post("/batch/deactivate", name="deactivate_todos")
+    async def deactivate_todos(request: web.Request) -> web.StreamResponse:
+        return await _update_many(
+            request, lambda ids: repository.set_active_many(ids=ids, active=False)
+        )
+
+    @routes.post("/batch/delete", name="delete_todos")
+    async def delete_todos(request: web.Request) -> web.StreamResponse:
+        return await _update_many(request, lambda ids: repository.delete_many(ids=ids))
+
+    @routes.get("/export", name="export_todos")
+    async def export_todos(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": NDJSON_MIMETYPE})
+        await response.prepare(request)
+        chunk = []
+        async for todo in repository.export_todos():
+            chunk.append(encoder.todo(todo) + b"\n")
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                await response.write(b"".join(chunk))
+                chunk = []
+        await response.write(b"".join(chunk))
+        await response.write_eof()
+        return response
+
+    @routes.post("/import", name="import_todos")
+    async def import_todos(request: web.Request) -> web.StreamResponse:
+        if request.content_type != NDJSON_MIMETYPE:
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+
+        async def todos() -> AsyncIterator[Todo]:
+            async for line in request.content:
+                todo = parse_ndjson_line(line)
+                if todo is not None:
+                    yield todo
+
+        try:
+            imported = await repository.import_todos(todos=todos())
+        except ValueError:
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        return web.json_response({"imported": imported}, dumps=_dumps)
+
+    @routes.get("/{id_raw}", name="get_todo")
+    async def get_todo(request: web.Request) -> web.StreamResponse:
+        id_ = parse_uuid(request.match_info["id_raw"])
+        todo = await repository.get(id_)
+        if todo is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        body = encoder.todo(todo)
+        etag = body_etag(body)
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+        return _json_response(body, etag)
+
+    @routes.get("/", name="list_todos")
+    async def list_todos(request: web.Request) -> web.StreamResponse:
+        paginated = "after" in request.query or "limit" in request.query
+        try:
+            after, limit = parse_page(request.query)
+            active, text = parse_filters(request.query)
+        except ValueError:
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        filtered = active is not None or bool(text)
+        etag = version_etag(await repository.version())
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+        if not paginated:
+            todos = await (repository.search(active=active, text=text) if filtered else repository.list())
+            return _json_response(encoder.todos(todos), etag)
+        if filtered:
+            todos = await repository.search(active=active, text=text, after=after, limit=limit)
+        else:
+            todos = await repository.list_page(after=after, limit=limit)
+        next_ = todos[-1].id if len(todos) == limit else None
+        return _json_response(encoder.page(todos, next_), etag)
+
+    @routes.post("/", name="create_todo")
+    async def create_todo(request: web.Request) -> web.StreamResponse:
+        if request.content_type != "application/json":
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        else:
+            try:
+                text = (await request.json())["text"]
+            except (KeyError, ValueError):
+                return web.Response(status=HTTPStatus.BAD_REQUEST)
+            if "speck" in text.lower():
+                return web.Response(status=HTTPStatus.INTERNAL_SERVER_ERROR)
+            id_ = await repository.insert(text=text)
+            return web.json_response({"id": id_}, status=HTTPStatus.CREATED, dumps=_dumps)
+
+    @routes.patch("/{id_raw}", name="update_todo")
+    async def update_todo(request: web.Request) -> web.StreamResponse:
+        if request.content_type != "application/json":
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        else:
+            try:
+                id_ = parse_uuid(request.match_info["id_raw"])
+                text = (await request.json())["text"]
+            except (KeyError, ValueError):
+                return web.Response(status=HTTPStatus.BAD_REQUEST)
+            result = await repository.edit_text(id_=id_, text=text)
+            return _no_content_or_not_found(result)
+
+    @routes.post("/{id_raw}/activate", name="activate_todo")
+    async def activate_todo(request: web.Request) -> web.StreamResponse:
+        id_ = parse_uuid(request.match_info["id_raw"])
+        result = await repository.activate(id_=id_)
+        return _no_content_or_not_found(result)
+
+    @routes.post("/{id_raw}/deactivate", name="deactivate_todo")
+    async def deactivate_todo(request: web.Request) -> web.StreamResponse:
+        id_ = parse_uuid(request.match_info["id_raw"])
+        result = await repository.deactivate(id_=id_)
+        return _no_content_or_not_found(result)
+
+    @routes.delete("/{id_raw}", name="delete_todo")
+    async def delete_todo(request: web.Request) -> web.StreamResponse:
+        id_ = parse_uuid(request.match_info["id_raw"])
+        result = await repository.delete(id_)
+        return _no_content_or_not_found(result)
+
+    async def _update_many(
+        request: web.Request,
+        operation: Callable[[Sequence[UUID]], Awaitable[Tuple[bool, ...]]],
+    ) -> web.StreamResponse:
+        if request.content_type != "application/json":
+            return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        try:
+            ids_raw = parse_batch((await request.json())["ids"])
+        except (KeyError, TypeError, ValueError):
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
+        ids = [parse_uuid(id_raw) for id_raw in ids_raw]
+        results = [
+            {"id": id_raw, "status": HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND}
+            for id_raw, result in zip(ids_raw, await operation(ids))
+        ]
+        return web.json_response({"results": results}, dumps=_dumps)
+
+    app = web.Application()
+    app.add_routes(routes)
+    return app
+
+
+def _json_response(body: bytes, etag: str) -> web.Response:
+    return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+
+def _no_content_or_not_found(result: bool) -> web.Response:
+    return web.Response(status=HTTPStatus.NO_CONTENT if result else HTTPStatus.NOT_FOUND)
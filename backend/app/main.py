@@ -1,35 +1,66 @@
 import os
-from typing import NoReturn
+from http import HTTPStatus
+from typing import NoReturn, Optional, Union
 
 from flask import Flask, Response
-from prometheus_client.exposition import start_http_server as run_prometheus_http_server
 
+from app.apis.admin import make_admin_blueprint
 from app.apis.todo import make_todos_blueprint
 from app.metrics.flask import register_prometheus
+from app.metrics.profiler import start_http_server as run_prometheus_http_server
 from app.repository.base import Repository
+from app.repository.caching import CachingRepository
+from app.repository.durable import DurableInMemoryRepository
 from app.repository.instrumented import InstrumentedRepository
+from app.repository.pool import PoolTimeout
 from app.repository.postgresql import PostgreSQLRepository
+from app.repository.single_flight import SingleFlightRepository
+from app.utils.delay import DelayInjector, INJECTOR
 
 
 def main() -> None:
     run_prometheus()
 
-    repository = PostgreSQLRepository.factory()
-    repository.connect()
+    repository = connect_repository()
     try:
-        repository.initialize()
         instrumented_repository = InstrumentedRepository(repository)
         register_custom_metrics(instrumented_repository)
-        run_flask_app(instrumented_repository)
+        run_flask_app(
+            make_caching_repository(make_single_flight_repository(instrumented_repository)),
+            delay_injector=INJECTOR,
+        )
     finally:
         repository.disconnect()
 
 
+def connect_repository() -> Union[PostgreSQLRepository, DurableInMemoryRepository]:
+    backend = os.environ.get("REPOSITORY_BACKEND", "postgresql")
+
+    if backend == "durable_in_memory":
+        # the Todos live in this process: it cannot be shared by several Gunicorn workers
+        repository = DurableInMemoryRepository.factory()
+        repository.connect()
+        return repository
+    if backend != "postgresql":
+        raise ValueError("Invalid REPOSITORY_BACKEND: {}".format(backend))
+    repository = PostgreSQLRepository.factory()
+    repository.connect()
+    try:
+        repository.initialize()
+    except BaseException:
+        repository.disconnect()
+        raise
+    return repository
+
+
 def run_prometheus() -> None:
     host = os.environ.get("PROMETHEUS_HOST", "0.0.0.0")
     port = os.environ.get("PROMETHEUS_PORT", 6000)
 
-    run_prometheus_http_server(addr=host, port=port)
+    # secret to send to take a profile at `/profile`, which is disabled without one
+    profiler_token = os.environ.get("PROFILER_TOKEN") or None
+
+    run_prometheus_http_server(addr=host, port=int(port), token=profiler_token)
 
 
 def register_custom_metrics(repository: Repository) -> None:
@@ -40,15 +71,48 @@ def register_custom_metrics(repository: Repository) -> None:
     pass
 
 
-def run_flask_app(repository: Repository) -> NoReturn:
+def make_caching_repository(repository: Repository) -> Repository:
+    ttl = float(os.environ.get("REPOSITORY_CACHE_TTL", 0))
+    max_size = int(os.environ.get("REPOSITORY_CACHE_MAX_SIZE", 10000))
+
+    if ttl <= 0:
+        return repository
+    return CachingRepository(repository, max_size=max_size, ttl=ttl)
+
+
+def make_single_flight_repository(repository: Repository) -> Repository:
+    # opt-in: identical concurrent reads share a single call
+    if os.environ.get("REPOSITORY_SINGLE_FLIGHT", "false").lower() != "true":
+        return repository
+    return SingleFlightRepository(repository)
+
+
+def run_flask_app(repository: Repository, delay_injector: Optional[DelayInjector] = None) -> NoReturn:
     host = os.environ.get("FLASK_HOST", "0.0.0.0")
     port = os.environ.get("FLASK_PORT", 5000)
 
+    app = make_flask_app(repository, delay_injector=delay_injector)
+    app.run(host=host, port=port)
+
+
+def make_flask_app(repository: Repository, delay_injector: Optional[DelayInjector] = None) -> Flask:
+    # seconds during which a client that wrote reads from the primary, when reads go to a replica
+    read_your_writes_window = float(os.environ.get("READ_YOUR_WRITES_WINDOW", 0))
+    # secret to send to switch the delay profile, which cannot be switched without one
+    admin_token = os.environ.get("ADMIN_TOKEN") or None
+
     app = Flask(__name__)
     app.after_request(_cors_support)
-    app.register_blueprint(make_todos_blueprint(repository))
+    app.register_error_handler(PoolTimeout, _service_unavailable)
+    app.register_blueprint(make_todos_blueprint(repository, read_your_writes_window=read_your_writes_window))
+    if delay_injector is not None:
+        app.register_blueprint(make_admin_blueprint(delay_injector, token=admin_token))
     register_prometheus(app)
-    app.run(host=host, port=port)
+    return app
+
+
+def _service_unavailable(_: PoolTimeout):
+    return "", HTTPStatus.SERVICE_UNAVAILABLE
 
 
 def _cors_support(response: Response) -> Response:
@@ -0,0 +1,51 @@
+import os
+
+from aiohttp import web
+
+from app.apis.admin_async import make_async_admin_app
+from app.apis.todo_async import make_async_todos_app
+from app.main import run_prometheus
+from app.repository.aio.instrumented import AsyncInstrumentedRepository
+from app.repository.aio.postgresql import AsyncPostgreSQLRepository
+from app.utils.delay import INJECTOR
+
+
+def main() -> None:
+    run_prometheus()
+
+    host = os.environ.get("FLASK_HOST", "0.0.0.0")
+    port = int(os.environ.get("FLASK_PORT", 5000))
+    web.run_app(make_app(), host=host, port=port)
+
+
+async def make_app() -> web.Application:
+    """
+    Create the asynchronous backend: same APIs as the Flask application,
+    served by a single event loop that can hold thousands of in-flight requests.
+    :return: aiohttp application, ready to be served.
+    """
+    max_connections = int(os.environ.get("POSTGRESQL_MAX_CONNECTIONS", 10))
+    # secret to send to switch the delay profile, which cannot be switched without one
+    admin_token = os.environ.get("ADMIN_TOKEN") or None
+
+    repository = AsyncPostgreSQLRepository.factory(max_connections=max_connections)
+    await repository.connect()
+    await repository.initialize()
+    instrumented_repository = AsyncInstrumentedRepository(repository)
+
+    app = web.Application()
+    app.on_response_prepare.append(_cors_support)
+    app.on_cleanup.append(lambda _: repository.disconnect())
+    app.add_subapp("/todos", make_async_todos_app(instrumented_repository))
+    app.add_subapp("/admin", make_async_admin_app(INJECTOR, token=admin_token))
+    return app
+
+
+async def _cors_support(_: web.Request, response: web.StreamResponse) -> None:
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    response.headers.add("Access-Control-Allow-Methods", "*")
+    response.headers.add("Access-Control-Allow-Headers", "*")
+
+
+if __name__ == "__main__":
+    main()
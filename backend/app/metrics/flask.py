@@ -1,33 +1,166 @@
+import threading
+import time
 from http import HTTPStatus
-from typing import Optional
+from typing import Optional, Dict, Tuple, NamedTuple
+from weakref import WeakKeyDictionary
 
-from flask import request, Flask, Response
-from prometheus_client.registry import REGISTRY
+from flask import request, Flask, Request, Response
+from prometheus_client import Counter, Gauge, Histogram, Summary
+from prometheus_client.registry import REGISTRY, CollectorRegistry
 
+# key of the per-request metrics state in the WSGI environment
+ENVIRON_KEY = "app.metrics.flask"
 
-def register_prometheus(app: Flask, registry=REGISTRY) -> None:
+# requests that do not match any route (e.g., the bot calling `/speck`) share this endpoint label,
+# so that random URLs cannot blow up the number of time series
+UNMATCHED_ENDPOINT = "unmatched"
+OTHER_METHOD = "other"
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+REQUEST_DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 0.75, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 10.0,
+)
+
+
+class _FlaskMetrics(NamedTuple):
+    requests_total: Counter
+    request_duration: Histogram
+    request_size: Summary
+    response_size: Summary
+    requests_in_progress: Gauge
+
+
+# a registry rejects metrics with the same name, so they are created once per registry and shared by the apps
+_metrics: "WeakKeyDictionary[CollectorRegistry, _FlaskMetrics]" = WeakKeyDictionary()
+_metrics_lock = threading.Lock()
+
+
+def _get_metrics(registry: CollectorRegistry) -> _FlaskMetrics:
+    """
+    :param registry: Metrics registry.
+    :return: Metrics about HTTP calls registered in the registry, created on first use.
     """
-    Automatically collect and expose metrics about HTTP calls in a Flask application.
+    with _metrics_lock:
+        metrics = _metrics.get(registry)
+        if metrics is None:
+            metrics = _FlaskMetrics(
+                requests_total=Counter(
+                    "app_flask_http_request_total",
+                    "Number of HTTP calls handled by Flask.",
+                    ["endpoint", "method", "status_code"],
+                    registry=registry,
+                ),
+                request_duration=Histogram(
+                    "app_flask_http_request_duration_seconds",
+                    "Time spent handling HTTP calls.",
+                    ["endpoint", "method"],
+                    buckets=REQUEST_DURATION_BUCKETS,
+                    registry=registry,
+                ),
+                request_size=Summary(
+                    "app_flask_http_request_size_bytes",
+                    "Size of the HTTP request bodies.",
+                    ["endpoint", "method"],
+                    registry=registry,
+                ),
+                response_size=Summary(
+                    "app_flask_http_response_size_bytes",
+                    "Size of the HTTP response bodies.",
+                    ["endpoint", "method"],
+                    registry=registry,
+                ),
+                requests_in_progress=Gauge(
+                    "app_flask_http_requests_in_progress",
+                    "Number of HTTP calls currently handled by Flask.",
+                    ["endpoint", "method"],
+                    multiprocess_mode="livesum",
+                    registry=registry,
+                ),
+            )
+            _metrics[registry] = metrics
+        return metrics
+
+
+def register_prometheus(app: Flask, registry: CollectorRegistry = REGISTRY) -> None:
+    """
+    Automatically collect and expose metrics about HTTP calls in a Flask application:
+    number of calls, duration, request and response sizes, and calls in progress.
+    Several applications can be registered with the same registry: their calls are counted together.
     :param app: Instance of a Flask application.
     :param registry: Metrics registry to expose, defaults to default Prometheus registry.
     """
 
+    collectors = _get_metrics(registry)
+
+    # label children, bound on first use: creating them requires a lock and a dict lookup
+    children: Dict[Tuple[str, str], Tuple[Histogram, Summary, Summary, Gauge]] = {}
+    counters: Dict[Tuple[str, str, int], Counter] = {}
+
+    def before() -> None:
+        # resolve the `request` proxy once: each access to it costs a context-stack lookup
+        req = request._get_current_object()
+        key = (_get_endpoint(req), _get_method(req))
+        metrics = children.get(key)
+        if metrics is None:
+            labels = {"endpoint": key[0], "method": key[1]}
+            metrics = (
+                collectors.request_duration.labels(**labels),
+                collectors.request_size.labels(**labels),
+                collectors.response_size.labels(**labels),
+                collectors.requests_in_progress.labels(**labels),
+            )
+            children[key] = metrics
+        req.environ[ENVIRON_KEY] = (key, metrics, time.perf_counter())
+        metrics[3].inc()
+
     def after(response: Response) -> Response:
-        endpoint = _get_endpoint()
+        req = request._get_current_object()
+        state = req.environ.get(ENVIRON_KEY)
+        if state is None:
+            return response
+        (endpoint, method), metrics, start = state
         status_code = _get_status_code(response)
 
-        # TODO (1): count the number of calls by Flask endpoint and status_code
+        counter = counters.get((endpoint, method, status_code))
+        if counter is None:
+            counter = collectors.requests_total.labels(
+                endpoint=endpoint, method=method, status_code=status_code
+            )
+            counters[(endpoint, method, status_code)] = counter
+        counter.inc()
+
+        metrics[1].observe(req.content_length or 0)
+        if response.content_length is not None:
+            metrics[2].observe(response.content_length)
+        metrics[0].observe(time.perf_counter() - start)
 
         return response
 
-    def _get_endpoint() -> Optional[str]:
+    def teardown(_: Optional[BaseException]) -> None:
+        state = request.environ.pop(ENVIRON_KEY, None)
+        if state is not None:
+            state[1][3].dec()
+
+    def _get_endpoint(req: Request) -> str:
         """
         Extracts the endpoint from a Flask request.
-        :return: Flask endpoint.
+        :param req: Flask request.
+        :return: Flask endpoint, or `UNMATCHED_ENDPOINT` if the request matched no route.
+        """
+        endpoint = req.endpoint
+        if endpoint is None:
+            return UNMATCHED_ENDPOINT
+        return endpoint.rpartition(".")[2]
+
+    def _get_method(req: Request) -> str:
+        """
+        Extracts the HTTP method from a Flask request.
+        :param req: Flask request.
+        :return: HTTP method, or `OTHER_METHOD` for non-standard ones.
         """
-        if request.endpoint is None:
-            return None
-        return request.endpoint.split(".")[-1]
+        method = req.method
+        return method if method in KNOWN_METHODS else OTHER_METHOD
 
     def _get_status_code(response: Response) -> int:
         """
@@ -41,5 +174,8 @@ def register_prometheus(app: Flask, registry=REGISTRY) -> None:
         else:
             return status_code
 
-    # Flask will execute the `after` function after serving each request
+    # Flask will execute `before` and `after` before and after serving each request,
+    # and `teardown` in any case, even if an exception escaped
+    app.before_request(before)
     app.after_request(after)
+    app.teardown_request(teardown)
@@ -0,0 +1,303 @@
+import collections
+import inspect
+import os
+import socket
+import sys
+import threading
+import time
+from http import HTTPStatus
+from types import CodeType, FrameType
+from typing import Dict, Optional, Mapping, Tuple, Iterator, Type, Iterable, Set
+from urllib.parse import urlparse, parse_qs
+
+from flask import Flask
+from prometheus_client import Counter
+from prometheus_client.exposition import MetricsHandler, _ThreadingSimpleServer
+from prometheus_client.registry import REGISTRY
+
+from app.repository.base import Repository
+from app.utils.auth import is_authorized
+
+MAX_DURATION = 60.0
+MAX_FREQUENCY = 1000
+DEFAULT_DURATION = 10.0
+DEFAULT_FREQUENCY = 100
+
+PROFILES = Counter(
+    "app_profiler_profiles_total",
+    "Number of profiles taken by the stack sampler, by mode.",
+    ["mode"],
+)
+
+# the CPU clocks of other threads are read by their kernel ID, only known from Python 3.8, and only on Linux
+CPU_MODE_SUPPORTED = sys.platform.startswith("linux") and hasattr(threading, "get_native_id")
+
+
+class ProfilerBusy(Exception):
+    """
+    Raised when a profile is requested while another one is being taken.
+    """
+
+
+class StackSampler:
+    """
+    Statistical profiler: takes the Python stack of every thread of the process at a fixed frequency,
+    and counts identical stacks, collapsed into a single line each (as expected by `flamegraph.pl`).
+
+    Stacks are attributed to the Flask endpoint the thread is serving and to the outermost `Repository` method
+    it is running, as two extra root frames: `endpoint:<name>` (or `thread:<name>` outside of Flask views),
+    then `repository:<method>`. Both are found from the code objects on the stack, so nothing runs on
+    the request path: the overhead is the sampling thread alone, and only while a profile is taken.
+    In `cpu` mode, a thread is only sampled if it used CPU since the previous sample, so that threads
+    waiting on sockets or locks do not drown the ones doing the work; `wall` mode samples every thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: Dict[CodeType, str] = {}
+
+    def sample(self, duration: float, frequency: int = DEFAULT_FREQUENCY, mode: str = "cpu") -> Dict[str, int]:
+        """
+        Profile the process, blocking the calling thread.
+        :param duration: Time to sample for, in seconds.
+        :param frequency: Number of samples per second.
+        :param mode: `cpu` to sample only the threads that used CPU, `wall` to sample all threads.
+        :return: Number of samples of each collapsed stack.
+        :raise ValueError: If a parameter is out of range, or the mode is not supported.
+        :raise ProfilerBusy: If another profile is being taken.
+        """
+        if not 0 < duration <= MAX_DURATION or not 0 < frequency <= MAX_FREQUENCY:
+            raise ValueError("Duration or frequency out of range")
+        if mode not in ("cpu", "wall") or (mode == "cpu" and not CPU_MODE_SUPPORTED):
+            raise ValueError("Unsupported mode: {}".format(mode))
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            PROFILES.labels(mode=mode).inc()
+            return self._sample(duration, 1 / frequency, mode == "cpu")
+        finally:
+            self._lock.release()
+
+    def _sample(self, duration: float, interval: float, cpu: bool) -> Dict[str, int]:
+        stacks: Dict[str, int] = collections.Counter()
+        repository_methods = _repository_methods()
+        cpu_times: Dict[int, int] = {}
+        if cpu:
+            # the threads running when the profile starts are compared with their CPU time at that point,
+            # the ones started later with their start, so that a short request is not missed
+            self._used_cpu(threading.enumerate(), cpu_times)
+        deadline = time.monotonic() + duration
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            self._sample_once(stacks, repository_methods, cpu_times if cpu else None)
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+        return stacks
+
+    def _sample_once(
+        self,
+        stacks: Dict[str, int],
+        repository_methods: Mapping[CodeType, str],
+        cpu_times: Optional[Dict[int, int]],
+    ) -> None:
+        """
+        Count the current stack of every other thread.
+        :param stacks: Number of samples of each collapsed stack, updated.
+        :param repository_methods: Name of the `Repository` method run by each code object.
+        :param cpu_times: CPU time of each thread at the previous sample, updated; None to sample idle threads.
+        """
+        own_id = threading.get_ident()
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        busy = self._used_cpu(threads.values(), cpu_times) if cpu_times is not None else None
+        # the frames hold the locals of all threads: they are released when this function returns
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (busy is not None and thread_id not in busy):
+                continue
+            thread = threads.get(thread_id)
+            name = thread.name if thread is not None else str(thread_id)
+            stacks[self._collapse(frame, name, repository_methods)] += 1
+
+    @staticmethod
+    def _used_cpu(threads: Iterable[threading.Thread], cpu_times: Dict[int, int]) -> Set[int]:
+        """
+        :param threads: Threads to check.
+        :param cpu_times: CPU time of each thread at the previous sample in nanoseconds, by kernel ID, replaced by
+        the current ones: the threads that ended are dropped, as their IDs can be reused.
+        :return: Identifiers of the threads that used CPU since the previous sample, or since they started if
+        they were not running then.
+        """
+        current = {}
+        busy = set()
+        for thread in threads:
+            try:
+                cpu_time = time.clock_gettime_ns(_cpu_clock(thread.native_id))
+            except (OSError, TypeError):
+                # the thread ended, or did not start yet
+                continue
+            current[thread.native_id] = cpu_time
+            if cpu_time > cpu_times.get(thread.native_id, 0):
+                busy.add(thread.ident)
+        cpu_times.clear()
+        cpu_times.update(current)
+        return busy
+
+    def _collapse(self, frame: FrameType, thread_name: str, repository_methods: Mapping[CodeType, str]) -> str:
+        """
+        :param frame: Innermost frame of the stack.
+        :param thread_name: Name of the thread running the stack.
+        :param repository_methods: Name of the `Repository` method run by each code object.
+        :return: Frames of the stack from the outermost, separated by semicolons.
+        """
+        names = []
+        endpoint = None
+        method = None
+        callee: Optional[CodeType] = None
+        while frame is not None:
+            code = frame.f_code
+            name = self._names.get(code)
+            if name is None:
+                name = "{}:{}".format(frame.f_globals.get("__name__", "?"), code.co_name)
+                self._names[code] = name
+            names.append(name)
+            # the view function is called by `dispatch_request`, and named after its endpoint by default
+            if code is _DISPATCH_REQUEST and callee is not None:
+                endpoint = callee.co_name
+            method = repository_methods.get(code, method)
+            callee = code
+            frame = frame.f_back
+        roots = ["endpoint:" + endpoint if endpoint is not None else "thread:" + thread_name.replace(";", "_")]
+        if method is not None:
+            roots.append("repository:" + method)
+        names.extend(reversed(roots))
+        return ";".join(reversed(names))
+
+
+_DISPATCH_REQUEST = Flask.dispatch_request.__code__
+
+
+def _cpu_clock(native_id: int) -> int:
+    """
+    :param native_id: Kernel ID of a thread of the process.
+    :return: Identifier of the CPU clock of the thread, as built by `pthread_getcpuclockid`.
+    """
+    # unlike `pthread_getcpuclockid`, the thread is looked up by the kernel: the clock of a thread that
+    # already ended cannot be read (EINVAL), instead of reading the freed memory of its pthread
+    return (~native_id << 3) | 6
+
+
+def _repository_methods() -> Mapping[CodeType, str]:
+    """
+    :return: Name of the public `Repository` method run by each code object, for all implementations loaded.
+    """
+    names = [name for name, value in vars(Repository).items() if callable(value) and not name.startswith("_")]
+    methods = {}
+    for cls in _subclasses(Repository):
+        for name in names:
+            f = cls.__dict__.get(name)
+            # decorators are skipped: their wrapper may be shared by unrelated functions
+            code = getattr(inspect.unwrap(f), "__code__", None) if f is not None else None
+            if code is not None and code.co_name == name:
+                methods[code] = name
+    return methods
+
+
+def _subclasses(cls: Type) -> Iterator[Type]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+SAMPLER = StackSampler()
+
+
+class ProfilingMetricsHandler(MetricsHandler):
+    """
+    Serves the metrics, and the profiles of `sampler` at `/profile` to the clients that send `token`:
+    `GET /profile?seconds=10&hz=100&mode=cpu` with `Authorization: Bearer <token>` returns collapsed stacks.
+    The profile is disabled without a token.
+    """
+
+    sampler: StackSampler = SAMPLER
+    token: Optional[str] = None
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/profile":
+            return super().do_GET()
+        if self.token is None:
+            return self._reply(HTTPStatus.NOT_FOUND)
+        if not is_authorized(self.headers.get("Authorization"), self.token):
+            return self._reply(HTTPStatus.UNAUTHORIZED, headers=(("WWW-Authenticate", "Bearer"),))
+        try:
+            duration, frequency, mode = _parse_profile(parse_qs(url.query))
+            stacks = self.sampler.sample(duration, frequency, mode)
+        except ValueError:
+            return self._reply(HTTPStatus.BAD_REQUEST)
+        except ProfilerBusy:
+            return self._reply(HTTPStatus.CONFLICT)
+        ordered = sorted(stacks.items(), key=lambda item: item[1], reverse=True)
+        body = "".join("{} {}\n".format(stack, count) for stack, count in ordered).encode()
+        # with several processes behind the same port, tells which one was profiled
+        self._reply(HTTPStatus.OK, body, headers=(("X-Profiled-Pid", str(os.getpid())),))
+
+    def _reply(self, status: HTTPStatus, body: bytes = b"", headers: Tuple[Tuple[str, str], ...] = ()) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def _parse_profile(params: Mapping[str, list]) -> Tuple[float, int, str]:
+    """
+    Extracts the profile parameters from the query string.
+    :param params: Query string arguments, each with all its values.
+    :return: Duration in seconds, frequency in Hz, and mode.
+    :raise ValueError: If any parameter is malformed.
+    """
+    duration = float(params.get("seconds", [DEFAULT_DURATION])[0])
+    frequency = int(params.get("hz", [DEFAULT_FREQUENCY])[0])
+    mode = params.get("mode", ["cpu" if CPU_MODE_SUPPORTED else "wall"])[0]
+    return duration, frequency, mode
+
+
+class _ReusePortServer(_ThreadingSimpleServer):
+    """
+    Server that shares its port with the servers of other processes, the kernel spreading connections over them.
+    """
+
+    def server_bind(self) -> None:
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def start_http_server(
+    port: int,
+    addr: str = "",
+    registry=REGISTRY,
+    sampler: StackSampler = SAMPLER,
+    token: Optional[str] = None,
+    reuse_port: bool = False,
+) -> _ThreadingSimpleServer:
+    """
+    Start the HTTP server of the metrics in a daemon thread, like `prometheus_client.start_http_server`,
+    with the profiles of `sampler` at `/profile`.
+    :param port: Port to listen on, 0 for any free port.
+    :param addr: Address to listen on.
+    :param registry: Metrics registry to expose.
+    :param sampler: Profiler of the process.
+    :param token: Secret the clients must send to take a profile, None to disable profiles.
+    :param reuse_port: True to share the port with the servers of other processes, e.g., Gunicorn workers.
+    :return: Running server.
+    """
+    attributes = {"registry": registry, "sampler": sampler, "token": token}
+    handler = type("ProfilingMetricsHandler", (ProfilingMetricsHandler,), attributes)
+    httpd = (_ReusePortServer if reuse_port else _ThreadingSimpleServer)((addr, port), handler)
+    thread = threading.Thread(target=httpd.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return httpd
@@ -0,0 +1,158 @@
+from typing import Tuple, Optional, Sequence, AsyncIterator, AsyncIterable
+from uuid import UUID
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+
+
+class AsyncRepository:
+    """
+    Asynchronous repository for Todos: define coroutines to retrieve, insert, modify and delete Todos.
+    It mirrors `Repository`, so that the same Todos can be served without blocking an event loop.
+    """
+
+    async def stats(self) -> Stats:
+        """
+        Retrieve statistics about the number of Todos stored.
+        :return: Todos statistics.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def version(self) -> int:
+        """
+        Retrieve the version of the stored Todos: it increases whenever Todos are inserted,
+        modified or deleted, so that readers can tell whether anything changed without reading them.
+        :return: Data version.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def get(self, id_: UUID) -> Optional[Todo]:
+        """
+        Retrieve a Todo by its ID.
+        :param id_: ID of the Todo.
+        :return: The Todo if existing, None otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def list(self) -> Tuple[Todo, ...]:
+        """
+        Retrieve all stored Todos.
+        :return: Tuple of all Todos, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        """
+        Retrieve a page of stored Todos using keyset pagination.
+        :param after: ID of the last Todo of the previous page, None for the first page.
+        :param limit: Max number of Todos to return.
+        :return: Tuple of at most `limit` Todos with ID greater than `after`, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        """
+        Retrieve the stored Todos that match some filters, optionally a page of them using keyset pagination.
+        :param active: True for active Todos only, False for inactive Todos only, None for both.
+        :param text: Text the Todos must contain, ignoring case, None or empty for any text.
+        :param after: ID of the last Todo of the previous page, None for the first page.
+        :param limit: Max number of Todos to return, None for all.
+        :return: Tuple of the matching Todos with ID greater than `after`, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def insert(self, text: str) -> UUID:
+        """
+        Insert a new active Todo.
+        :param text: Text for the Todo to insert.
+        :return: ID generated for the Todo.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def edit_text(self, id_: UUID, text: str) -> bool:
+        """
+        Edit the text for an existing Todo.
+        :param id_: ID of the Todo to update.
+        :param text: New text for the Todo.
+        :return: True if the Todo was found and correctly updated, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def activate(self, id_: UUID) -> bool:
+        """
+        Mark an existing Todo as active.
+        :param id_: ID of the Todo to update.
+        :return: True if the Todo was found and correctly updated, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def deactivate(self, id_: UUID) -> bool:
+        """
+        Mark an existing Todo as not active.
+        :param id_: ID of the Todo to update.
+        :return: True if the Todo was found and correctly updated, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def delete(self, id_: UUID) -> bool:
+        """
+        Delete an existing Todo.
+        :param id_: ID of the Todo to delete.
+        :return: True if the Todo was found and correctly deleted, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        """
+        Insert several new active Todos at once.
+        :param texts: Texts for the Todos to insert.
+        :return: IDs generated for the Todos, in the same order as `texts`.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        """
+        Mark several existing Todos as active or not active at once.
+        :param ids: IDs of the Todos to update.
+        :param active: True to mark the Todos as active, False otherwise.
+        :return: For each ID, True if the Todo was found and correctly updated, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        """
+        Delete several existing Todos at once.
+        :param ids: IDs of the Todos to delete.
+        :return: For each ID, True if the Todo was found and correctly deleted, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def export_todos(self) -> AsyncIterator[Todo]:
+        """
+        Retrieve all stored Todos one at a time, e.g., for a backup: unlike `list`,
+        the Todos are never all held in memory by the caller at once.
+        :return: Asynchronous iterator over all Todos, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def import_todos(self, todos: AsyncIterable[Todo]) -> int:
+        """
+        Store Todos as they are, with their ID and status, e.g., from an export. All Todos are stored, or none.
+        :param todos: Todos to store, read as they are stored when possible.
+        :return: Number of Todos stored.
+        :raise ValueError: If a Todo has the ID of a stored Todo or of another Todo to store,
+          or if reading the Todos raises it.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    async def _clean(self) -> None:
+        """
+        Delete all Todos. Please use this method for tests only!
+        """
+        raise NotImplementedError  # pragma: nocover
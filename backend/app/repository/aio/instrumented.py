@@ -0,0 +1,143 @@
+import time
+from typing import Tuple, Optional, Sequence, Awaitable, TypeVar, AsyncIterator, AsyncIterable
+from uuid import UUID
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.aio.base import AsyncRepository
+from app.repository.instrumented import QueryMetrics
+
+T = TypeVar("T")
+
+
+class AsyncInstrumentedRepository(AsyncRepository):
+    """
+    Prometheus-instrumented decorator for a concrete implementation of AsyncRepository.
+    It records the same metrics as `InstrumentedRepository`; the duration includes
+    the time the operation spends suspended on the event loop.
+    Please use it as follows:
+    ```
+        basic_repository = ...
+        instrumented_repository = AsyncInstrumentedRepository(basic_repository)
+    ```
+    """
+
+    def __init__(self, repository: AsyncRepository):
+        self._repository = repository
+        self._stats = QueryMetrics("stats")
+        self._version = QueryMetrics("version")
+        self._get = QueryMetrics("get")
+        self._list = QueryMetrics("list")
+        self._list_page = QueryMetrics("list_page")
+        self._search = QueryMetrics("search")
+        self._export_todos = QueryMetrics("export_todos")
+        self._import_todos = QueryMetrics("import_todos")
+        self._insert = QueryMetrics("insert")
+        self._edit_text = QueryMetrics("edit_text")
+        self._activate = QueryMetrics("activate")
+        self._deactivate = QueryMetrics("deactivate")
+        self._delete = QueryMetrics("delete")
+        self._insert_many = QueryMetrics("insert_many")
+        self._set_active_many = QueryMetrics("set_active_many")
+        self._delete_many = QueryMetrics("delete_many")
+
+    async def stats(self) -> Stats:
+        return await _observe(self._stats, self._repository.stats())
+
+    async def version(self) -> int:
+        return await _observe(self._version, self._repository.version())
+
+    async def get(self, id_: UUID) -> Optional[Todo]:
+        return await _observe(self._get, self._repository.get(id_=id_))
+
+    async def list(self) -> Tuple[Todo, ...]:
+        return await _observe(self._list, self._repository.list())
+
+    async def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return await _observe(self._list_page, self._repository.list_page(after=after, limit=limit))
+
+    async def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        return await _observe(
+            self._search, self._repository.search(active=active, text=text, after=after, limit=limit)
+        )
+
+    def export_todos(self) -> AsyncIterator[Todo]:
+        return _observe_iteration(self._export_todos, self._repository.export_todos())
+
+    async def import_todos(self, todos: AsyncIterable[Todo]) -> int:
+        return await _observe(self._import_todos, self._repository.import_todos(todos=todos))
+
+    async def insert(self, text: str) -> UUID:
+        return await _observe(self._insert, self._repository.insert(text=text))
+
+    async def edit_text(self, id_: UUID, text: str) -> bool:
+        return await _observe(self._edit_text, self._repository.edit_text(id_=id_, text=text))
+
+    async def activate(self, id_: UUID) -> bool:
+        return await _observe(self._activate, self._repository.activate(id_=id_))
+
+    async def deactivate(self, id_: UUID) -> bool:
+        return await _observe(self._deactivate, self._repository.deactivate(id_=id_))
+
+    async def delete(self, id_: UUID) -> bool:
+        return await _observe(self._delete, self._repository.delete(id_=id_))
+
+    async def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        return await _observe(self._insert_many, self._repository.insert_many(texts=texts))
+
+    async def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        return await _observe(
+            self._set_active_many, self._repository.set_active_many(ids=ids, active=active)
+        )
+
+    async def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        return await _observe(self._delete_many, self._repository.delete_many(ids=ids))
+
+    async def _clean(self) -> None:
+        return await self._repository._clean()
+
+
+async def _observe(metrics: QueryMetrics, operation: Awaitable[T]) -> T:
+    """
+    Await a repository operation and record its metrics.
+    :param metrics: Metrics of the operation.
+    :param operation: Operation to await.
+    :return: Result of the operation.
+    """
+    metrics.in_progress.inc()
+    start = time.perf_counter()
+    try:
+        return await operation
+    except Exception:
+        metrics.exceptions.inc()
+        raise
+    finally:
+        metrics.duration.observe(time.perf_counter() - start)
+        metrics.in_progress.dec()
+
+
+async def _observe_iteration(metrics: QueryMetrics, items: AsyncIterator[T]) -> AsyncIterator[T]:
+    """
+    Record the metrics of a repository operation over the iteration of its result,
+    from the first item until the iterator is exhausted or closed.
+    :param metrics: Metrics of the operation.
+    :param items: Result of the operation.
+    :return: Items of the result.
+    """
+    metrics.in_progress.inc()
+    start = time.perf_counter()
+    try:
+        async for item in items:
+            yield item
+    except Exception:
+        metrics.exceptions.inc()
+        raise
+    finally:
+        metrics.duration.observe(time.perf_counter() - start)
+        metrics.in_progress.dec()
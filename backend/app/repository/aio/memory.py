@@ -0,0 +1,76 @@
+from typing import Tuple, Optional, Sequence, AsyncIterator, AsyncIterable
+from uuid import UUID
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.aio.base import AsyncRepository
+from app.repository.memory import InMemoryRepository
+
+
+class AsyncInMemoryRepository(AsyncRepository):
+    """
+    In-memory implementation of an asynchronous Todos repository.
+    Operations never await, so each of them runs atomically on the event loop.
+    """
+
+    def __init__(self):
+        self._repository = InMemoryRepository()
+
+    async def stats(self) -> Stats:
+        return self._repository.stats()
+
+    async def version(self) -> int:
+        return self._repository.version()
+
+    async def get(self, id_: UUID) -> Optional[Todo]:
+        return self._repository.get(id_=id_)
+
+    async def list(self) -> Tuple[Todo, ...]:
+        return self._repository.list()
+
+    async def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return self._repository.list_page(after=after, limit=limit)
+
+    async def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        return self._repository.search(active=active, text=text, after=after, limit=limit)
+
+    async def insert(self, text: str) -> UUID:
+        return self._repository.insert(text=text)
+
+    async def edit_text(self, id_: UUID, text: str) -> bool:
+        return self._repository.edit_text(id_=id_, text=text)
+
+    async def activate(self, id_: UUID) -> bool:
+        return self._repository.activate(id_=id_)
+
+    async def deactivate(self, id_: UUID) -> bool:
+        return self._repository.deactivate(id_=id_)
+
+    async def delete(self, id_: UUID) -> bool:
+        return self._repository.delete(id_=id_)
+
+    async def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        return self._repository.insert_many(texts=texts)
+
+    async def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        return self._repository.set_active_many(ids=ids, active=active)
+
+    async def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        return self._repository.delete_many(ids=ids)
+
+    async def export_todos(self) -> AsyncIterator[Todo]:
+        for todo in self._repository.export_todos():
+            yield todo
+
+    async def import_todos(self, todos: AsyncIterable[Todo]) -> int:
+        # read first: the import must not be interleaved with other operations
+        return self._repository.import_todos(todos=[todo async for todo in todos])
+
+    async def _clean(self) -> None:
+        return self._repository._clean()
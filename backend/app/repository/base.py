@@ -1,4 +1,4 @@
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence, Iterable, Iterator
 from uuid import UUID
 
 from app.models.stats import Stats
@@ -17,6 +17,14 @@ class Repository:
         """
         raise NotImplementedError  # pragma: nocover
 
+    def version(self) -> int:
+        """
+        Retrieve the version of the stored Todos: it increases whenever Todos are inserted,
+        modified or deleted, so that readers can tell whether anything changed without reading them.
+        :return: Data version.
+        """
+        raise NotImplementedError  # pragma: nocover
+
     def get(self, id_: UUID) -> Optional[Todo]:
         """
         Retrieve a Todo by its ID.
@@ -32,6 +40,32 @@ class Repository:
         """
         raise NotImplementedError  # pragma: nocover
 
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        """
+        Retrieve a page of stored Todos using keyset pagination.
+        :param after: ID of the last Todo of the previous page, None for the first page.
+        :param limit: Max number of Todos to return.
+        :return: Tuple of at most `limit` Todos with ID greater than `after`, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        """
+        Retrieve the stored Todos that match some filters, optionally a page of them using keyset pagination.
+        :param active: True for active Todos only, False for inactive Todos only, None for both.
+        :param text: Text the Todos must contain, ignoring case, None or empty for any text.
+        :param after: ID of the last Todo of the previous page, None for the first page.
+        :param limit: Max number of Todos to return, None for all.
+        :return: Tuple of the matching Todos with ID greater than `after`, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
     def insert(self, text: str) -> UUID:
         """
         Insert a new active Todo.
@@ -73,8 +107,67 @@ class Repository:
         """
         raise NotImplementedError  # pragma: nocover
 
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        """
+        Insert several new active Todos at once.
+        :param texts: Texts for the Todos to insert.
+        :return: IDs generated for the Todos, in the same order as `texts`.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        """
+        Mark several existing Todos as active or not active at once.
+        :param ids: IDs of the Todos to update.
+        :param active: True to mark the Todos as active, False otherwise.
+        :return: For each ID, True if the Todo was found and correctly updated, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        """
+        Delete several existing Todos at once.
+        :param ids: IDs of the Todos to delete.
+        :return: For each ID, True if the Todo was found and correctly deleted, false otherwise.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def export_todos(self) -> Iterator[Todo]:
+        """
+        Retrieve all stored Todos one at a time, e.g., for a backup: unlike `list`,
+        the Todos are never all held in memory by the caller at once.
+        :return: Iterator over all Todos, ordered by increasing ID.
+        """
+        raise NotImplementedError  # pragma: nocover
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        """
+        Store Todos as they are, with their ID and status, e.g., from an export. All Todos are stored, or none.
+        :param todos: Todos to store, read as they are stored when possible.
+        :return: Number of Todos stored.
+        :raise ValueError: If a Todo has the ID of a stored Todo or of another Todo to store,
+          or if reading the Todos raises it.
+        """
+        raise NotImplementedError  # pragma: nocover
+
     def _clean(self) -> None:
         """
         Delete all Todos. Please use this method for tests only!
         """
         raise NotImplementedError  # pragma: nocover
+
+
+def filter_todos(todos: Iterable[Todo], active: Optional[bool], text: Optional[str]) -> Iterator[Todo]:
+    """
+    Filter Todos as `Repository.search` does, by checking each of them.
+    :param todos: Todos to filter.
+    :param active: True for active Todos only, False for inactive Todos only, None for both.
+    :param text: Text the Todos must contain, ignoring case, None or empty for any text.
+    :return: Matching Todos, in the same order.
+    """
+    if active is not None:
+        todos = (todo for todo in todos if todo.active == active)
+    if text:
+        needle = text.lower()
+        todos = (todo for todo in todos if needle in todo.text.lower())
+    return iter(todos)
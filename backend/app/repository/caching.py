@@ -0,0 +1,227 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple, Optional, Sequence, Callable, Any, Iterable, Iterator
+from uuid import UUID
+
+from prometheus_client import Counter
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.base import Repository
+
+CACHE_HITS = Counter(
+    "app_repository_cache_hits_total",
+    "Number of repository reads served from the cache.",
+    ["cache"],
+)
+CACHE_MISSES = Counter(
+    "app_repository_cache_misses_total",
+    "Number of repository reads forwarded to the underlying repository.",
+    ["cache"],
+)
+CACHE_EVICTIONS = Counter(
+    "app_repository_cache_evictions_total",
+    "Number of cached Todos evicted because the cache was full.",
+    ["cache"],
+)
+
+_MISSING = object()
+
+
+class CachingRepository(Repository):
+    """
+    Caching decorator for a concrete implementation of Repository.
+    Single Todos are cached in a bounded LRU, `list` and `stats` results as snapshots;
+    every entry expires after a TTL, and writes invalidate exactly the entries they affect.
+    The data version is never cached: a version that changed, e.g. because another process
+    wrote to the same database, invalidates the whole cache, so that cached Todos are never
+    older than the last version returned.
+    Please use it as follows:
+    ```
+        basic_repository = ...
+        caching_repository = CachingRepository(basic_repository, max_size=10000, ttl=5.0)
+    ```
+    """
+
+    def __init__(
+        self,
+        repository: Repository,
+        max_size: int = 10000,
+        ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        assert max_size > 0
+        assert ttl > 0
+        self._repository = repository
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._todos: OrderedDict = OrderedDict()
+        self._list: Optional[Tuple[float, Tuple[Todo, ...]]] = None
+        self._stats: Optional[Tuple[float, Stats]] = None
+        # bumped on every write, so that values read before a write are never cached after it
+        self._generation = 0
+        self._version: Optional[int] = None
+
+        self._get_hits = CACHE_HITS.labels(cache="get")
+        self._get_misses = CACHE_MISSES.labels(cache="get")
+        self._get_evictions = CACHE_EVICTIONS.labels(cache="get")
+        self._list_hits = CACHE_HITS.labels(cache="list")
+        self._list_misses = CACHE_MISSES.labels(cache="list")
+        self._stats_hits = CACHE_HITS.labels(cache="stats")
+        self._stats_misses = CACHE_MISSES.labels(cache="stats")
+
+    def stats(self) -> Stats:
+        now = self._clock()
+        with self._lock:
+            if self._stats is not None and self._stats[0] > now:
+                self._stats_hits.inc()
+                return self._stats[1]
+            generation = self._generation
+
+        self._stats_misses.inc()
+        stats = self._repository.stats()
+        with self._lock:
+            if generation == self._generation:
+                self._stats = (now + self._ttl, stats)
+        return stats
+
+    def version(self) -> int:
+        version = self._repository.version()
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._clear()
+        return version
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        now = self._clock()
+        with self._lock:
+            entry = self._todos.get(id_, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._todos.move_to_end(id_)
+                self._get_hits.inc()
+                return entry[1]
+            generation = self._generation
+
+        self._get_misses.inc()
+        todo = self._repository.get(id_=id_)
+        with self._lock:
+            if generation == self._generation:
+                self._todos[id_] = (now + self._ttl, todo)
+                self._todos.move_to_end(id_)
+                while len(self._todos) > self._max_size:
+                    self._todos.popitem(last=False)
+                    self._get_evictions.inc()
+        return todo
+
+    def list(self) -> Tuple[Todo, ...]:
+        now = self._clock()
+        with self._lock:
+            if self._list is not None and self._list[0] > now:
+                self._list_hits.inc()
+                return self._list[1]
+            generation = self._generation
+
+        self._list_misses.inc()
+        todos = self._repository.list()
+        with self._lock:
+            if generation == self._generation:
+                self._list = (now + self._ttl, todos)
+        return todos
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return self._repository.list_page(after=after, limit=limit)
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        return self._repository.search(active=active, text=text, after=after, limit=limit)
+
+    def export_todos(self) -> Iterator[Todo]:
+        return self._repository.export_todos()
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        # the imported IDs are only known once the stream is read: drop every entry instead
+        try:
+            return self._repository.import_todos(todos=todos)
+        finally:
+            with self._lock:
+                self._clear()
+
+    def insert(self, text: str) -> UUID:
+        id_ = self._repository.insert(text=text)
+        self._invalidate(ids=(id_,), stats=True)
+        return id_
+
+    def edit_text(self, id_: UUID, text: str) -> bool:
+        return self._write(
+            lambda: self._repository.edit_text(id_=id_, text=text), ids=(id_,), stats=False
+        )
+
+    def activate(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.activate(id_=id_), ids=(id_,), stats=True)
+
+    def deactivate(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.deactivate(id_=id_), ids=(id_,), stats=True)
+
+    def delete(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.delete(id_=id_), ids=(id_,), stats=True)
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        ids = self._repository.insert_many(texts=texts)
+        self._invalidate(ids=ids, stats=True)
+        return ids
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        return self._write(
+            lambda: self._repository.set_active_many(ids=ids, active=active), ids=ids, stats=True
+        )
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        return self._write(lambda: self._repository.delete_many(ids=ids), ids=ids, stats=True)
+
+    def _clean(self) -> None:
+        try:
+            self._repository._clean()
+        finally:
+            with self._lock:
+                self._clear()
+
+    def _write(self, f: Callable[[], Any], ids: Iterable[UUID], stats: bool) -> Any:
+        """
+        Run a write on the underlying repository, then invalidate the entries it affects.
+        Entries are invalidated even if the write fails, since it may have been partially applied.
+        :param f: Write to run.
+        :param ids: IDs of the Todos touched by the write.
+        :param stats: True if the write can change the statistics.
+        :return: Result of the write.
+        """
+        try:
+            return f()
+        finally:
+            self._invalidate(ids=ids, stats=stats)
+
+    def _clear(self) -> None:
+        """
+        Drop every entry; the lock must be held.
+        """
+        self._generation += 1
+        self._todos.clear()
+        self._list = None
+        self._stats = None
+
+    def _invalidate(self, ids: Iterable[UUID], stats: bool) -> None:
+        with self._lock:
+            self._generation += 1
+            for id_ in ids:
+                self._todos.pop(id_, None)
+            self._list = None
+            if stats:
+                self._stats = None
@@ -0,0 +1,331 @@
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Tuple, Optional, Sequence, List, Iterator, Iterable
+from uuid import UUID, uuid1, SafeUUID
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.base import Repository
+
+
+class CompactInMemoryRepository(Repository):
+    """
+    Column-oriented, in-memory implementation of a Todos repository, for large data sets:
+    a Todo costs a few dozen bytes instead of the few hundred of `InMemoryRepository`.
+
+    Each Todo is a row in a set of columns: the ID as two unsigned 64-bit halves, the text as
+    a slice of a UTF-8 arena, and the active flag as a bit. Rows are updated in place and rows
+    of deleted Todos are reused. Rows are ordered by ID in an index made of small sorted chunks,
+    so that inserting or deleting only shifts a chunk. `Todo` objects are created only when
+    returned, at the cost of a slower `get` and `list` than `InMemoryRepository`.
+    `search` scans the rows in ID order instead of keeping secondary indexes, which would cost more
+    memory than the Todos themselves.
+    """
+
+    def __init__(self, chunk_size: int = 1000):
+        """
+        :param chunk_size: Target number of rows per chunk of the index.
+        """
+        assert chunk_size > 1
+        self._chunk_size = chunk_size
+        self._clean()
+        self._version = 0
+
+    def stats(self) -> Stats:
+        return Stats(active=self._active_count, inactive=self._size - self._active_count)
+
+    def version(self) -> int:
+        return self._version
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        row = self._find(id_.int)
+        if row is None:
+            return None
+        return self._todos((row,))[0]
+
+    def list(self) -> Tuple[Todo, ...]:
+        return self._todos(row for chunk in self._chunks for row in chunk)
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return self._todos(self._rows_after(after, limit))
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        rows: Iterator[int] = self._rows_after(after, self._size)
+        if active is not None:
+            rows = (row for row in rows if self._is_active(row) == active)
+        if text:
+            needle = text.lower()
+            rows = (row for row in rows if needle in self._text(row).lower())
+        return self._todos(islice(rows, limit))
+
+    def export_todos(self) -> Iterator[Todo]:
+        # one chunk at a time, copied so that writes during the export do not shift it
+        for chunk in list(self._chunks):
+            yield from self._todos(chunk)
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        todos = list(todos)
+        keys = {todo.id.int for todo in todos}
+        if len(keys) < len(todos) or any(self._find(key) is not None for key in keys):
+            raise ValueError("Duplicate Todo IDs")
+        # encoded before any row is added, so that a text that cannot be encoded leaves nothing behind
+        texts = [todo.text.encode() for todo in todos]
+        for todo, data in zip(todos, texts):
+            self._insert(todo.id.int, data, todo.active)
+        if todos:
+            self._version += 1
+        return len(todos)
+
+    def insert(self, text: str) -> UUID:
+        data = text.encode()
+        id_ = uuid1()
+        self._insert(id_.int, data)
+        self._version += 1
+        return id_
+
+    def edit_text(self, id_: UUID, text: str) -> bool:
+        data = text.encode()
+        row = self._find(id_.int)
+        if row is None:
+            return False
+        self._set_text(row, data)
+        self._version += 1
+        return True
+
+    def activate(self, id_: UUID) -> bool:
+        return self._set_active(id_, True)
+
+    def deactivate(self, id_: UUID) -> bool:
+        return self._set_active(id_, False)
+
+    def delete(self, id_: UUID) -> bool:
+        key = id_.int
+        chunk_index, position = self._locate(key)
+        if position is None:
+            return False
+        chunk = self._chunks[chunk_index]
+        row = chunk.pop(position)
+        if not chunk:
+            del self._chunks[chunk_index]
+            del self._maxes[chunk_index]
+        elif position == len(chunk):
+            self._maxes[chunk_index] = self._key(chunk[-1])
+
+        if self._is_active(row):
+            self._active_count -= 1
+        self._set_bit(row, False)
+        self._garbage += self._text_length[row]
+        self._text_length[row] = 0
+        self._free_rows.append(row)
+        self._size -= 1
+        self._version += 1
+        self._compact_arena_if_wasteful()
+        return True
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        encoded = [text.encode() for text in texts]
+        ids = tuple(uuid1() for _ in texts)
+        for id_, data in zip(ids, encoded):
+            self._insert(id_.int, data)
+        if ids:
+            self._version += 1
+        return ids
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        updated = {id_ for id_ in set(ids) if self._set_active(id_, active)}
+        return tuple(id_ in updated for id_ in ids)
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        deleted = {id_ for id_ in set(ids) if self.delete(id_)}
+        return tuple(id_ in deleted for id_ in ids)
+
+    def _clean(self) -> None:
+        # columns, by row
+        self._id_high = array("Q")
+        self._id_low = array("Q")
+        self._text_offset = array("Q")
+        self._text_length = array("I")
+        self._active = bytearray()
+        self._arena = bytearray()
+        # bytes of the arena no longer referenced by any row
+        self._garbage = 0
+        self._free_rows = array("I")
+        # index: rows sorted by ID, split in chunks, with the greatest ID of each chunk
+        self._chunks: List[array] = []
+        self._maxes: List[int] = []
+        self._size = 0
+        self._active_count = 0
+        self._version = getattr(self, "_version", 0) + 1
+
+    def _key(self, row: int) -> int:
+        return self._id_high[row] << 64 | self._id_low[row]
+
+    def _todos(self, rows: Iterable[int]) -> Tuple[Todo, ...]:
+        """
+        Materialize the Todos of some rows; the hot path of every read, hence the local variables.
+        """
+        id_high, id_low, active = self._id_high, self._id_low, self._active
+        text_offset, text_length, arena = self._text_offset, self._text_length, self._arena
+        new_tuple, new_object, set_attribute = tuple.__new__, object.__new__, object.__setattr__
+        todos = []
+        for row in rows:
+            # same as `UUID(int=...)`, without validating an integer that comes from a UUID
+            id_ = new_object(UUID)
+            set_attribute(id_, "int", id_high[row] << 64 | id_low[row])
+            set_attribute(id_, "is_safe", SafeUUID.unknown)
+            offset = text_offset[row]
+            text = arena[offset : offset + text_length[row]].decode()
+            todos.append(new_tuple(Todo, (id_, text, active[row >> 3] >> (row & 7) & 1 == 1)))
+        return tuple(todos)
+
+    def _text(self, row: int) -> str:
+        offset = self._text_offset[row]
+        return self._arena[offset : offset + self._text_length[row]].decode()
+
+    def _is_active(self, row: int) -> bool:
+        return bool(self._active[row >> 3] >> (row & 7) & 1)
+
+    def _set_bit(self, row: int, active: bool) -> None:
+        if active:
+            self._active[row >> 3] |= 1 << (row & 7)
+        else:
+            self._active[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+    def _locate(self, key: int) -> Tuple[int, Optional[int]]:
+        """
+        Binary search of an ID in the index.
+        :param key: ID as an integer.
+        :return: Index of the chunk that holds or would hold the ID,
+            and position of the ID in that chunk if present.
+        """
+        chunk_index = bisect_left(self._maxes, key)
+        if chunk_index == len(self._maxes):
+            return chunk_index, None
+        position = self._bisect(self._chunks[chunk_index], key)
+        chunk = self._chunks[chunk_index]
+        if position < len(chunk) and self._key(chunk[position]) == key:
+            return chunk_index, position
+        return chunk_index, None
+
+    def _bisect(self, chunk: array, key: int) -> int:
+        """
+        :return: Position of the first row of the chunk whose ID is not less than `key`.
+        """
+        low, high = 0, len(chunk)
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(chunk[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, key: int) -> Optional[int]:
+        chunk_index, position = self._locate(key)
+        return None if position is None else self._chunks[chunk_index][position]
+
+    def _rows_after(self, after: Optional[UUID], limit: int) -> Iterator[int]:
+        chunk_index, position = 0, 0
+        if after is not None:
+            key = after.int
+            chunk_index = bisect_left(self._maxes, key)
+            if chunk_index < len(self._chunks):
+                chunk = self._chunks[chunk_index]
+                position = self._bisect(chunk, key)
+                if position < len(chunk) and self._key(chunk[position]) == key:
+                    position += 1
+        while limit > 0 and chunk_index < len(self._chunks):
+            rows = self._chunks[chunk_index][position : position + limit]
+            yield from rows
+            limit -= len(rows)
+            chunk_index, position = chunk_index + 1, 0
+
+    def _insert(self, key: int, data: bytes, active: bool = True) -> None:
+        """
+        Add a row and index it.
+        :param key: ID as an integer.
+        :param data: Text encoded in UTF-8 by the caller, since encoding may fail.
+        :param active: Whether the Todo is active.
+        """
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._id_high[row] = key >> 64
+            self._id_low[row] = key & 0xFFFFFFFFFFFFFFFF
+        else:
+            row = len(self._id_high)
+            self._id_high.append(key >> 64)
+            self._id_low.append(key & 0xFFFFFFFFFFFFFFFF)
+            self._text_offset.append(0)
+            self._text_length.append(0)
+            if row >> 3 == len(self._active):
+                self._active.append(0)
+
+        if not self._chunks:
+            self._chunks.append(array("I", (row,)))
+            self._maxes.append(key)
+        else:
+            chunk_index = min(bisect_left(self._maxes, key), len(self._chunks) - 1)
+            chunk = self._chunks[chunk_index]
+            chunk.insert(self._bisect(chunk, key), row)
+            if key > self._maxes[chunk_index]:
+                self._maxes[chunk_index] = key
+            if len(chunk) > 2 * self._chunk_size:
+                half = len(chunk) // 2
+                self._chunks[chunk_index : chunk_index + 1] = [chunk[:half], chunk[half:]]
+                self._maxes.insert(chunk_index, self._key(chunk[half - 1]))
+
+        # once indexed, so that the text is kept if the arena gets compacted
+        self._set_text(row, data)
+        self._set_bit(row, active)
+        self._size += 1
+        self._active_count += active
+
+    def _set_active(self, id_: UUID, active: bool) -> bool:
+        row = self._find(id_.int)
+        if row is None:
+            return False
+        if self._is_active(row) != active:
+            self._active_count += 1 if active else -1
+            self._set_bit(row, active)
+        self._version += 1
+        return True
+
+    def _set_text(self, row: int, data: bytes) -> None:
+        """
+        Store the text of a row, encoded in UTF-8: in place if it fits in the previous one,
+        at the end of the arena otherwise.
+        """
+        length = self._text_length[row]
+        if len(data) <= length:
+            offset = self._text_offset[row]
+            self._arena[offset : offset + len(data)] = data
+            self._garbage += length - len(data)
+        else:
+            self._text_offset[row] = len(self._arena)
+            self._arena += data
+            self._garbage += length
+        self._text_length[row] = len(data)
+        self._compact_arena_if_wasteful()
+
+    def _compact_arena_if_wasteful(self) -> None:
+        """
+        Copy the texts of the Todos to a new arena, dropping the bytes no row references anymore,
+        once they make up more than half of the arena.
+        """
+        if self._garbage <= 4096 or self._garbage <= len(self._arena) // 2:
+            return
+        arena = bytearray()
+        for chunk in self._chunks:
+            for row in chunk:
+                offset = self._text_offset[row]
+                self._text_offset[row] = len(arena)
+                arena += self._arena[offset : offset + self._text_length[row]]
+        self._arena = arena
+        self._garbage = 0
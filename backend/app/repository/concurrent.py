@@ -0,0 +1,290 @@
+import heapq
+import threading
+from bisect import bisect_right
+from itertools import islice, chain
+from operator import attrgetter
+from typing import Tuple, Optional, Dict, Callable, Sequence, List, NamedTuple, Iterator, Iterable
+from uuid import UUID, uuid1
+
+from sortedcontainers import SortedDict
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.base import Repository, filter_todos
+
+
+class _Snapshot(NamedTuple):
+    version: int
+    todos: Tuple[Todo, ...]
+    ids: List[UUID]
+
+
+class _Stripe:
+    """
+    Todos whose ID hashes to this stripe, their lock, and counters of the writes made under it.
+    """
+
+    __slots__ = ("lock", "todos", "sorted_todos", "stats", "writes", "version")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.todos: Dict[UUID, Todo] = {}
+        # the same Todos by ID as an integer, which compares much faster than `UUID` objects
+        self.sorted_todos = SortedDict()
+        # replaced as a whole by each write: readers that do not lock see both counts of the same write
+        self.stats = Stats(active=0, inactive=0)
+        # a seqlock: `writes` counts the writes started, `version` the writes done, so the Todos are
+        # not being changed while both are equal
+        self.writes = 0
+        self.version = 0
+
+
+# Todos read from a stripe at a time by `list_page` and `search`
+_CHUNK_SIZE = 32
+_KEY = attrgetter("id.int")
+
+
+class ConcurrentInMemoryRepository(Repository):
+    """
+    Thread-safe, in-memory implementation of a Todos repository.
+
+    Writes lock only the stripe of the Todo they change, so writes to different stripes run concurrently,
+    and `get` takes no lock at all. Each stripe counts its active and inactive Todos and its writes:
+    `stats` and `version` add up the stripes without locking them.
+    `list` reads an immutable snapshot sorted by ID, rebuilt when the version moved since it was taken
+    by merging the sorted Todos of the stripes: each is copied without its lock, and copied again under its
+    lock if a write changed it meanwhile. Merging happens at most once per version.
+    Each stripe also keeps its Todos sorted by ID, updated by its writes: `list_page` and `search`
+    merge the stripes from `after` on, a few Todos at a time under each stripe lock, and stop once
+    the page is full, so that a page read between writes does not sort all Todos again.
+    Pages are consistent within each stripe, not across stripes, unless the snapshot is up to date.
+    """
+
+    def __init__(self, stripes: int = 64):
+        """
+        :param stripes: Number of locks the Todos are spread over.
+        """
+        assert stripes > 0
+        self._stripes = tuple(_Stripe() for _ in range(stripes))
+        self._snapshot = _Snapshot(version=-1, todos=(), ids=[])
+        self._snapshot_lock = threading.Lock()
+        # bumped by `_clean`, which may not change the version of any stripe
+        self._generation = 0
+
+    def stats(self) -> Stats:
+        # each stripe's counts as of one of its writes, so that a Todo changing status is counted once
+        stats = [stripe.stats for stripe in self._stripes]
+        return Stats(
+            active=sum(counts.active for counts in stats),
+            inactive=sum(counts.inactive for counts in stats),
+        )
+
+    def version(self) -> int:
+        # each stripe only counts up, so the sum does too, even when read while writes go on
+        return self._generation + sum(stripe.version for stripe in self._stripes)
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        return self._stripe(id_).todos.get(id_)
+
+    def list(self) -> Tuple[Todo, ...]:
+        return self._take_snapshot().todos
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return tuple(islice(self._todos_after(after), limit))
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        # a scan in ID order: indexes by status or text would have to be maintained under the stripe locks too
+        return tuple(islice(filter_todos(self._todos_after(after), active, text), limit))
+
+    def export_todos(self) -> Iterator[Todo]:
+        return iter(self._take_snapshot().todos)
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        todos = list(todos)
+        # all stripes at once, so that the import is all or nothing
+        for stripe in self._stripes:
+            stripe.lock.acquire()
+        try:
+            ids = {todo.id for todo in todos}
+            if len(ids) < len(todos) or any(id_ in self._stripe(id_).todos for id_ in ids):
+                raise ValueError("Duplicate Todo IDs")
+            for todo in todos:
+                stripe = self._stripe(todo.id)
+                stripe.writes += 1
+                stripe.todos[todo.id] = todo
+                stripe.sorted_todos[todo.id.int] = todo
+                self._count(stripe, None, todo)
+                stripe.version += 1
+            return len(todos)
+        finally:
+            for stripe in self._stripes:
+                stripe.lock.release()
+
+    def insert(self, text: str) -> UUID:
+        id_ = uuid1()
+        todo = Todo(id=id_, text=text, active=True)
+        stripe = self._stripe(id_)
+        with stripe.lock:
+            assert id_ not in stripe.todos
+            stripe.writes += 1
+            stripe.todos[id_] = todo
+            stripe.sorted_todos[id_.int] = todo
+            self._count(stripe, None, todo)
+            stripe.version += 1
+        return id_
+
+    def edit_text(self, id_: UUID, text: str) -> bool:
+        return self._update(id_, lambda todo: Todo(id=id_, text=text, active=todo.active))
+
+    def activate(self, id_: UUID) -> bool:
+        return self._update(id_, lambda todo: Todo(id=id_, text=todo.text, active=True))
+
+    def deactivate(self, id_: UUID) -> bool:
+        return self._update(id_, lambda todo: Todo(id=id_, text=todo.text, active=False))
+
+    def delete(self, id_: UUID) -> bool:
+        stripe = self._stripe(id_)
+        with stripe.lock:
+            todo = stripe.todos.get(id_)
+            if todo is None:
+                return False
+            stripe.writes += 1
+            del stripe.todos[id_]
+            del stripe.sorted_todos[id_.int]
+            self._count(stripe, todo, None)
+            stripe.version += 1
+            return True
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        return tuple(self.insert(text) for text in texts)
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        delta = lambda todo: Todo(id=todo.id, text=todo.text, active=active)
+        updated = {id_ for id_ in set(ids) if self._update(id_, delta)}
+        return tuple(id_ in updated for id_ in ids)
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        deleted = {id_ for id_ in set(ids) if self.delete(id_)}
+        return tuple(id_ in deleted for id_ in ids)
+
+    def _stripe(self, id_: UUID) -> _Stripe:
+        return self._stripes[hash(id_) % len(self._stripes)]
+
+    def _update(self, id_: UUID, delta: Callable[[Todo], Todo]) -> bool:
+        stripe = self._stripe(id_)
+        with stripe.lock:
+            old_todo = stripe.todos.get(id_)
+            if old_todo is None:
+                return False
+            new_todo = delta(old_todo)
+            stripe.writes += 1
+            stripe.todos[id_] = new_todo
+            # the ID is already in the sorted keys: only the value is replaced
+            stripe.sorted_todos[id_.int] = new_todo
+            self._count(stripe, old_todo, new_todo)
+            stripe.version += 1
+            return True
+
+    @staticmethod
+    def _count(stripe: _Stripe, old_todo: Optional[Todo], new_todo: Optional[Todo]) -> None:
+        """
+        Replace a Todo in the counts of its stripe, with a single assignment.
+        :param old_todo: Todo removed from the stripe, None for an insert.
+        :param new_todo: Todo added to the stripe, None for a delete.
+        """
+        active, inactive = stripe.stats
+        for todo, increment in ((old_todo, -1), (new_todo, +1)):
+            if todo is not None:
+                if todo.active:
+                    active += increment
+                else:
+                    inactive += increment
+        stripe.stats = Stats(active=active, inactive=inactive)
+
+    def _todos_after(self, after: Optional[UUID]) -> Iterator[Todo]:
+        """
+        :return: Todos with ID greater than `after`, ordered by ID, read lazily.
+        """
+        snapshot = self._snapshot
+        if snapshot.version >= self.version():
+            # up to date: no need to lock the stripes
+            start = 0 if after is None else bisect_right(snapshot.ids, after)
+            return islice(snapshot.todos, start, None)
+        after_key = -1 if after is None else after.int
+        return heapq.merge(*(self._stripe_todos_after(stripe, after_key) for stripe in self._stripes), key=_KEY)
+
+    @staticmethod
+    def _stripe_todos_after(stripe: _Stripe, after_key: int) -> Iterator[Todo]:
+        """
+        :return: Todos of the stripe with ID greater than `after_key`, ordered by ID,
+          read `_CHUNK_SIZE` at a time so that writers of the stripe wait for a chunk at most.
+        """
+        while True:
+            with stripe.lock:
+                start = stripe.sorted_todos.bisect_right(after_key)
+                chunk = stripe.sorted_todos.values()[start : start + _CHUNK_SIZE]
+            yield from chunk
+            if len(chunk) < _CHUNK_SIZE:
+                return
+            after_key = chunk[-1].id.int
+
+    @staticmethod
+    def _copy_stripe(stripe: _Stripe) -> List[Todo]:
+        """
+        :return: Todos of the stripe sorted by ID, copied without locking the stripe,
+          unless a write is changing it before or during the copy.
+        """
+        sorted_todos = stripe.sorted_todos
+        version = stripe.version
+        if stripe.writes == version:
+            try:
+                todos = list(map(sorted_todos.__getitem__, sorted_todos))
+            except KeyError:
+                # a Todo deleted while being copied
+                pass
+            else:
+                # no write started since the last one done before the copy
+                if stripe.writes == version:
+                    return todos
+        with stripe.lock:
+            sorted_todos = stripe.sorted_todos
+            return list(map(sorted_todos.__getitem__, sorted_todos))
+
+    def _take_snapshot(self) -> _Snapshot:
+        """
+        :return: Todos sorted by ID, as of the current version or later.
+        """
+        # read before copying: the copy holds at least the writes of this version
+        version = self.version()
+        snapshot = self._snapshot
+        if snapshot.version >= version:
+            return snapshot
+        # readers of the same version wait for one of them to sort, writers go on
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot.version >= version:
+                return snapshot
+            # sorting finds the sorted runs of the stripes, and only merges them: O(n log(stripes))
+            todos = tuple(sorted(chain.from_iterable(map(self._copy_stripe, self._stripes)), key=_KEY))
+            snapshot = _Snapshot(version=version, todos=todos, ids=[todo.id for todo in todos])
+            self._snapshot = snapshot
+            return snapshot
+
+    def _clean(self) -> None:
+        for stripe in self._stripes:
+            stripe.lock.acquire()
+        try:
+            for stripe in self._stripes:
+                stripe.todos = {}
+                stripe.sorted_todos = SortedDict()
+                stripe.stats = Stats(active=0, inactive=0)
+            self._generation += 1
+        finally:
+            for stripe in self._stripes:
+                stripe.lock.release()
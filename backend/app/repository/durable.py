@@ -0,0 +1,436 @@
+import gc
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from functools import partial
+from operator import attrgetter
+from typing import Tuple, Optional, Sequence, List, BinaryIO, Iterable, Callable
+from uuid import UUID, uuid1
+
+from sortedcontainers import SortedKeyList
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.memory import InMemoryRepository
+
+
+class DurableInMemoryRepository(InMemoryRepository):
+    """
+    In-memory implementation of a Todos repository that survives restarts.
+
+    Reads and writes are served from memory like `InMemoryRepository`, and every write that changes
+    something is appended to a write-ahead log. The log is flushed to the OS on every write, so it
+    survives a crash of the process, and synced to disk every `sync_every` writes or `sync_interval` seconds,
+    so that a power loss loses at most that many writes.
+    Every `snapshot_every` writes, all Todos are written to a snapshot that is memory-mapped on startup:
+    only the log written since then has to be replayed.
+
+    The log is a series of segments: a snapshot covers all segments before the one it starts,
+    so that older segments can be removed once it is written.
+    A record of the log is a CRC32, an operation, the ID of a Todo, and the text for inserts and edits.
+    A snapshot is a header, then an entry per Todo in ID order, then the texts of all Todos as one UTF-8 string.
+    """
+
+    SNAPSHOT_FILE = "snapshot.bin"
+    SEGMENT_FILE = "wal.{:08d}.log"
+
+    class Op:
+        INSERT = 1
+        EDIT_TEXT = 2
+        ACTIVATE = 3
+        DEACTIVATE = 4
+        DELETE = 5
+
+    # crc32, op, ID, length of the text
+    RECORD = struct.Struct("<IB16sI")
+    # magic, number of Todos, first segment not covered
+    SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+    SNAPSHOT_MAGIC = b"TODOSNP1"
+    # ID, active, length of the text in characters
+    SNAPSHOT_ENTRY = struct.Struct("<16s?I")
+
+    @staticmethod
+    def factory():
+        return DurableInMemoryRepository(
+            directory=os.environ.get("DURABLE_DIRECTORY", "data"),
+            sync_every=int(os.environ.get("DURABLE_SYNC_EVERY", 1)),
+            sync_interval=float(os.environ["DURABLE_SYNC_INTERVAL"])
+            if "DURABLE_SYNC_INTERVAL" in os.environ
+            else None,
+            snapshot_every=int(os.environ.get("DURABLE_SNAPSHOT_EVERY", 100000)),
+        )
+
+    def __init__(
+        self,
+        directory: str,
+        sync_every: int = 1,
+        sync_interval: Optional[float] = None,
+        snapshot_every: int = 100000,
+    ):
+        """
+        :param directory: Directory of the log and the snapshot, created if missing.
+        :param sync_every: Number of writes per sync of the log to disk, 0 to leave it to `sync_interval`.
+        :param sync_interval: Max time in seconds between a write and the sync of the log to disk,
+            checked on the next write; None to sync on `sync_every` only.
+        :param snapshot_every: Number of writes between two snapshots, 0 to never write snapshots automatically.
+        """
+        assert sync_every >= 0 and snapshot_every >= 0
+        super().__init__()
+        self._directory = directory
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._snapshot_every = snapshot_every
+        self._lock = threading.RLock()
+        self._log: Optional[BinaryIO] = None
+        self._segment = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_snapshot = 0
+
+    def connect(self) -> None:
+        """
+        Load the snapshot and replay the log written since, then open the log for writing.
+        """
+        assert self._log is None
+        os.makedirs(self._directory, exist_ok=True)
+        super()._clean()
+        # recovery creates millions of objects but no reference cycles: collecting them is wasted time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._segment = self._load_snapshot()
+            segments = self._segments()
+            for segment in segments:
+                if segment < self._segment:
+                    os.remove(self._segment_path(segment))
+                else:
+                    self._replay(segment, last=segment == segments[-1])
+                    self._segment = segment
+        finally:
+            if gc_enabled:
+                gc.enable()
+        # versions must not repeat across restarts, even if the last unsynced writes were lost
+        self._version = max(self._version, time.time_ns())
+        self._log = self._open_segment()
+        self._last_sync = time.monotonic()
+
+    def disconnect(self) -> None:
+        assert self._log is not None
+        with self._lock:
+            self.sync()
+            self._log.close()
+            self._log = None
+
+    def sync(self) -> None:
+        """
+        Sync the log to disk.
+        """
+        with self._lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def snapshot(self) -> None:
+        """
+        Write a snapshot of all Todos and start a new segment of the log, then remove the segments it covers.
+        """
+        with self._lock:
+            self.sync()
+            self._log.close()
+            self._segment += 1
+            self._log = self._open_segment()
+            self._fsync_directory()
+            self._write_snapshot(self._segment)
+            for segment in self._segments():
+                if segment < self._segment:
+                    os.remove(self._segment_path(segment))
+            self._since_snapshot = 0
+
+    def stats(self) -> Stats:
+        with self._lock:
+            return super().stats()
+
+    def version(self) -> int:
+        with self._lock:
+            return super().version()
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        with self._lock:
+            return super().get(id_)
+
+    def list(self) -> Tuple[Todo, ...]:
+        with self._lock:
+            return super().list()
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        with self._lock:
+            return super().list_page(after, limit)
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        # the first search by text builds the text index, which must not interleave with writes
+        with self._lock:
+            return super().search(active=active, text=text, after=after, limit=limit)
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        todos = list(todos)
+        with self._lock:
+            self._check_new(todos)
+            # as if inserted then deactivated: replayed as a single write, like `insert_many`
+            self._append(
+                [(self.Op.INSERT, todo.id, todo.text) for todo in todos]
+                + [(self.Op.DEACTIVATE, todo.id, "") for todo in todos if not todo.active]
+            )
+            self._add_all(todos)
+            self._commit(len(todos))
+            return len(todos)
+
+    def insert(self, text: str) -> UUID:
+        return self.insert_many([text])[0]
+
+    def edit_text(self, id_: UUID, text: str) -> bool:
+        with self._lock:
+            return self._write(self.Op.EDIT_TEXT, id_, text, partial(super().edit_text, id_, text))
+
+    def activate(self, id_: UUID) -> bool:
+        with self._lock:
+            return self._write(self.Op.ACTIVATE, id_, "", partial(super().activate, id_))
+
+    def deactivate(self, id_: UUID) -> bool:
+        with self._lock:
+            return self._write(self.Op.DEACTIVATE, id_, "", partial(super().deactivate, id_))
+
+    def delete(self, id_: UUID) -> bool:
+        with self._lock:
+            return self._write(self.Op.DELETE, id_, "", partial(super().delete, id_))
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        todos = [Todo(id=uuid1(), text=text, active=True) for text in texts]
+        with self._lock:
+            self._append([(self.Op.INSERT, todo.id, todo.text) for todo in todos])
+            self._add_all(todos)
+            self._commit(len(todos))
+            return tuple(todo.id for todo in todos)
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        with self._lock:
+            op = self.Op.ACTIVATE if active else self.Op.DEACTIVATE
+            written = {id_ for id_ in ids if id_ in self._todos}
+            self._append([(op, id_, "") for id_ in written])
+            updated = super().set_active_many(ids, active)
+            self._commit(len(written))
+            return updated
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        with self._lock:
+            written = {id_ for id_ in ids if id_ in self._todos}
+            self._append([(self.Op.DELETE, id_, "") for id_ in written])
+            # not `super().delete_many`, which would log through `self.delete`
+            for id_ in written:
+                super().delete(id_)
+            self._commit(len(written))
+            return tuple(id_ in written for id_ in ids)
+
+    def _write(self, op: int, id_: UUID, text: str, apply: Callable[[], bool]) -> bool:
+        """
+        Log then apply a write to a single Todo, if it exists.
+        :param op: Operation to log.
+        :param id_: ID of the Todo.
+        :param text: Text to log.
+        :param apply: Applies the write in memory.
+        :return: True if the Todo exists.
+        """
+        if id_ not in self._todos:
+            return False
+        self._append([(op, id_, text)])
+        apply()
+        self._commit(1)
+        return True
+
+    def _append(self, records: Sequence[Tuple[int, UUID, str]]) -> None:
+        """
+        Hand records over to the OS, before the writes they log are applied in memory:
+        if this fails, e.g., the disk is full, nothing was written, neither in memory nor in the log.
+        :param records: Operation, ID of the Todo, and text of each record.
+        """
+        if not records:
+            return
+        # texts that cannot be encoded raise here, before anything is written
+        data = b"".join(self._record(op, id_, text) for op, id_, text in records)
+        end = self._log.tell()
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self._log.write(view) :]
+        except BaseException:
+            # records after a partial one would be dropped as corrupted on replay
+            self._log.truncate(end)
+            self._log.seek(end)
+            raise
+
+    def _record(self, op: int, id_: UUID, text: str) -> bytes:
+        data = text.encode()
+        header = self.RECORD.pack(0, op, id_.bytes, len(data))[4:]
+        return struct.pack("<I", zlib.crc32(data, zlib.crc32(header))) + header + data
+
+    def _commit(self, writes: int) -> None:
+        """
+        Sync or snapshot as configured, once writes are applied.
+        """
+        if not writes:
+            return
+        self._unsynced += writes
+        self._since_snapshot += writes
+        if self._snapshot_every and self._since_snapshot >= self._snapshot_every:
+            self.snapshot()
+        elif (self._sync_every and self._unsynced >= self._sync_every) or (
+            self._sync_interval is not None and time.monotonic() - self._last_sync >= self._sync_interval
+        ):
+            self.sync()
+
+    def _replay(self, segment: int, last: bool) -> None:
+        """
+        Apply the records of a segment of the log.
+        A record cut short or corrupted at the end of the last segment was being written when the process
+        stopped: it is dropped. Anywhere else, the log is corrupted.
+        :param segment: Number of the segment.
+        :param last: Whether the segment is the last one.
+        :raise ValueError: If the segment is corrupted.
+        """
+        path = self._segment_path(segment)
+        with open(path, "rb") as file:
+            data = file.read()
+        offset = 0
+        # consecutive inserts are added at once, which is much faster than one by one
+        inserted: List[Todo] = []
+        while offset < len(data):
+            if offset + self.RECORD.size > len(data):
+                break
+            crc, op, id_bytes, length = self.RECORD.unpack_from(data, offset)
+            end = offset + self.RECORD.size + length
+            if end > len(data) or zlib.crc32(data[offset + 4 : end]) != crc:
+                break
+            text = data[offset + self.RECORD.size : end].decode()
+            if op == self.Op.INSERT:
+                inserted.append(Todo(id=UUID(bytes=id_bytes), text=text, active=True))
+            else:
+                self._restore(inserted)
+                inserted = []
+                self._apply(op, UUID(bytes=id_bytes), text)
+            offset = end
+        self._restore(inserted)
+        if offset < len(data):
+            if not last:
+                raise ValueError("Corrupted log segment: {}".format(path))
+            with open(path, "r+b") as file:
+                file.truncate(offset)
+
+    def _restore(self, todos: List[Todo]) -> None:
+        """
+        Add Todos read from the log, as they were inserted.
+        """
+        self._add_all(todos)
+
+    def _apply(self, op: int, id_: UUID, text: str) -> None:
+        if op == self.Op.EDIT_TEXT:
+            super().edit_text(id_, text)
+        elif op == self.Op.ACTIVATE:
+            super().activate(id_)
+        elif op == self.Op.DEACTIVATE:
+            super().deactivate(id_)
+        elif op == self.Op.DELETE:
+            super().delete(id_)
+        else:
+            raise ValueError("Invalid log record: {}".format(op))
+
+    def _load_snapshot(self) -> int:
+        """
+        :return: First segment of the log not covered by the snapshot, 0 if there is no snapshot.
+        :raise ValueError: If the snapshot is corrupted.
+        """
+        path = os.path.join(self._directory, self.SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, size, segment = self.SNAPSHOT_HEADER.unpack_from(data)
+            if magic != self.SNAPSHOT_MAGIC:
+                raise ValueError("Invalid snapshot: {}".format(path))
+            entries_end = self.SNAPSHOT_HEADER.size + size * self.SNAPSHOT_ENTRY.size
+            entries = self.SNAPSHOT_ENTRY.iter_unpack(data[self.SNAPSHOT_HEADER.size : entries_end])
+            # decoded at once, then sliced by length in characters
+            texts = data[entries_end:].decode()
+        new_todo = tuple.__new__
+        todos: List[Todo] = []
+        offset = 0
+        for id_bytes, active, length in entries:
+            todos.append(new_todo(Todo, (UUID(bytes=id_bytes), texts[offset : offset + length], active)))
+            offset += length
+        self._todos = {todo.id: todo for todo in todos}
+        self._sorted_todos = SortedKeyList(todos, key=attrgetter("id"))
+        self._active = sum(todo.active for todo in todos)
+        self._inactive = len(todos) - self._active
+        self._rebuild_indexes()
+        return segment
+
+    def _write_snapshot(self, segment: int) -> None:
+        """
+        Write the snapshot to a temporary file, then move it in place, so that a snapshot is never partial.
+        :param segment: First segment of the log not covered by the snapshot.
+        """
+        path = os.path.join(self._directory, self.SNAPSHOT_FILE)
+        todos = self.list()
+        with open(path + ".tmp", "wb") as file:
+            file.write(self.SNAPSHOT_HEADER.pack(self.SNAPSHOT_MAGIC, len(todos), segment))
+            entry = self.SNAPSHOT_ENTRY.pack
+            file.write(b"".join(entry(todo.id.bytes, todo.active, len(todo.text)) for todo in todos))
+            file.write("".join(todo.text for todo in todos).encode())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+        self._fsync_directory()
+
+    def _fsync_directory(self) -> None:
+        fd = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _segments(self) -> List[int]:
+        prefix, suffix = self.SEGMENT_FILE.split("{:08d}")
+        return sorted(
+            int(name[len(prefix) : -len(suffix)])
+            for name in os.listdir(self._directory)
+            if name.startswith(prefix) and name.endswith(suffix)
+        )
+
+    def _open_segment(self) -> BinaryIO:
+        # unbuffered: a record is in the OS as soon as `_append` returns, or not at all
+        return open(self._segment_path(self._segment), "ab", buffering=0)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._directory, self.SEGMENT_FILE.format(segment))
+
+    def _clean(self) -> None:
+        with self._lock:
+            super()._clean()
+            if self._log is not None:
+                self._log.close()
+            for segment in self._segments():
+                os.remove(self._segment_path(segment))
+            path = os.path.join(self._directory, self.SNAPSHOT_FILE)
+            if os.path.exists(path):
+                os.remove(path)
+            self._segment = 0
+            self._unsynced = 0
+            self._since_snapshot = 0
+            self._log = self._open_segment()
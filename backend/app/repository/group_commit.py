@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Sequence, Any, Tuple, Generic, TypeVar, Optional
+
+from prometheus_client import Histogram
+
+GROUP_COMMIT_SIZE = Histogram(
+    "app_repository_group_commit_size",
+    "Number of writes committed together by a flush of the group commit.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+GROUP_COMMIT_FLUSH_DURATION = Histogram(
+    "app_repository_group_commit_flush_duration_seconds",
+    "Time spent running a flush of the group commit, from the first statement to the commit.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+GROUP_COMMIT_WAIT_DURATION = Histogram(
+    "app_repository_group_commit_wait_duration_seconds",
+    "Time from the submission of a write to the start of the flush committing it.",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+W = TypeVar("W")
+
+
+class GroupCommitter(Generic[W]):
+    """
+    Gather the writes submitted by many threads, and hand them to a background thread that runs them
+    in batches: a batch is flushed `max_delay` seconds after its first write arrived, or as soon as it
+    holds `max_size` writes. Writes submitted during a flush go to the next batch, so that batches
+    grow with the load even with no delay.
+    Each caller blocks until the batch holding its write is flushed, and gets its own result.
+    A batch that fails is split in two halves flushed apart, down to single writes, so that a failing
+    write only fails its own caller: `flush` must run a batch entirely or not at all.
+    """
+
+    def __init__(
+        self, flush: Callable[[Sequence[W]], Sequence[Any]], max_size: int = 100, max_delay: float = 0.0
+    ):
+        """
+        :param flush: Function to run a batch of writes atomically, returning the result of each write in order.
+        :param max_size: Max number of writes per batch.
+        :param max_delay: Max time in seconds to wait for more writes after the first one of a batch.
+        """
+        assert max_size > 0 and max_delay >= 0
+        self._flush = flush
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._condition = threading.Condition()
+        # writes with the future of their result and their submission time
+        self._queue: Deque[Tuple[W, Future, float]] = deque()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        assert self._thread is None
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """
+        Flush the pending writes, then stop the background thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, write: W) -> Any:
+        """
+        Run a write with the next batch.
+        :param write: Write to run.
+        :return: Result of the write.
+        :raise RuntimeError: If the committer is closed.
+        :raise Exception: Any exception raised by the flush of the write alone.
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Group commit is closed")
+            self._queue.append((write, future, time.monotonic()))
+            if len(self._queue) == 1 or len(self._queue) >= self._max_size:
+                self._condition.notify()
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            start = time.monotonic()
+            for _, _, submitted in batch:
+                GROUP_COMMIT_WAIT_DURATION.observe(start - submitted)
+            self._flush_batch(batch)
+
+    def _flush_batch(self, batch: Sequence[Tuple[W, Future, float]]) -> None:
+        """
+        Flush a batch and complete the futures of its writes, splitting it if it fails.
+        :param batch: Writes with the future of their result and their submission time.
+        """
+        start = time.monotonic()
+        GROUP_COMMIT_SIZE.observe(len(batch))
+        try:
+            results = self._flush([write for write, _, _ in batch])
+        except Exception as e:
+            error = e
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            return
+        finally:
+            GROUP_COMMIT_FLUSH_DURATION.observe(time.monotonic() - start)
+
+        if len(batch) == 1:
+            batch[0][1].set_exception(error)
+        else:
+            # the failing writes are isolated in O(log(n)) more flushes each
+            middle = len(batch) // 2
+            self._flush_batch(batch[:middle])
+            self._flush_batch(batch[middle:])
+
+    def _next_batch(self) -> Sequence[Tuple[W, Future, float]]:
+        """
+        Wait for the next batch to be due.
+        :return: Writes of the batch, empty once closed with no write left.
+        """
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return ()
+                self._condition.wait()
+            deadline = self._queue[0][2] + self._max_delay
+            while len(self._queue) < self._max_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self._max_size, len(self._queue)))]
@@ -1,15 +1,57 @@
-from typing import Tuple, Optional
+import time
+from typing import Tuple, Optional, Sequence, Callable, TypeVar, Iterator, Iterable
 from uuid import UUID
 
+from prometheus_client import Counter, Gauge, Histogram
+
 from app.models.stats import Stats
 from app.models.todo import Todo
 from app.repository.base import Repository
 
+# fine-grained below 10ms for real queries, and around the delays injected in `app.utils.delay`
+QUERY_DURATION_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0, 3.5, 5.0, 10.0,
+)
+
+QUERY_DURATION = Histogram(
+    "app_repository_query_duration_seconds",
+    "Execution time of the repository operations.",
+    ["query"],
+    buckets=QUERY_DURATION_BUCKETS,
+)
+QUERY_EXCEPTIONS = Counter(
+    "app_repository_query_exceptions_total",
+    "Number of repository operations that raised an exception.",
+    ["query"],
+)
+QUERY_IN_PROGRESS = Gauge(
+    "app_repository_queries_in_progress",
+    "Number of repository operations currently running.",
+    ["query"],
+    multiprocess_mode="livesum",
+)
+
+T = TypeVar("T")
+
+
+class QueryMetrics:
+    """
+    Metrics of a single repository operation, with label children bound once.
+    """
+
+    __slots__ = ("duration", "exceptions", "in_progress")
+
+    def __init__(self, query: str):
+        self.duration = QUERY_DURATION.labels(query=query)
+        self.exceptions = QUERY_EXCEPTIONS.labels(query=query)
+        self.in_progress = QUERY_IN_PROGRESS.labels(query=query)
+
 
-# TODO (2): measure the execution time of the different database operations
 class InstrumentedRepository(Repository):
     """
     Prometheus-instrumented decorator for a concrete implementation of Repository.
+    Every operation records its duration, exceptions and in-progress calls, labelled by `query`.
     Please use it as follows:
     ```
         basic_repository = ...
@@ -19,30 +61,122 @@ class InstrumentedRepository(Repository):
 
     def __init__(self, repository: Repository):
         self._repository = repository
+        self._stats = QueryMetrics("stats")
+        self._version = QueryMetrics("version")
+        self._get = QueryMetrics("get")
+        self._list = QueryMetrics("list")
+        self._list_page = QueryMetrics("list_page")
+        self._search = QueryMetrics("search")
+        self._export_todos = QueryMetrics("export_todos")
+        self._import_todos = QueryMetrics("import_todos")
+        self._insert = QueryMetrics("insert")
+        self._edit_text = QueryMetrics("edit_text")
+        self._activate = QueryMetrics("activate")
+        self._deactivate = QueryMetrics("deactivate")
+        self._delete = QueryMetrics("delete")
+        self._insert_many = QueryMetrics("insert_many")
+        self._set_active_many = QueryMetrics("set_active_many")
+        self._delete_many = QueryMetrics("delete_many")
 
     def stats(self) -> Stats:
-        return self._repository.stats()
+        return _observe(self._stats, self._repository.stats)
+
+    def version(self) -> int:
+        return _observe(self._version, self._repository.version)
 
     def get(self, id_: UUID) -> Optional[Todo]:
-        return self._repository.get(id_=id_)
+        return _observe(self._get, lambda: self._repository.get(id_=id_))
 
     def list(self) -> Tuple[Todo, ...]:
-        return self._repository.list()
+        return _observe(self._list, self._repository.list)
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return _observe(self._list_page, lambda: self._repository.list_page(after=after, limit=limit))
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        return _observe(
+            self._search,
+            lambda: self._repository.search(active=active, text=text, after=after, limit=limit),
+        )
+
+    def export_todos(self) -> Iterator[Todo]:
+        # started right away: the implementation may pick its connection pool in the caller's context
+        return _observe_iteration(self._export_todos, self._repository.export_todos())
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        return _observe(self._import_todos, lambda: self._repository.import_todos(todos=todos))
 
     def insert(self, text: str) -> UUID:
-        return self._repository.insert(text=text)
+        return _observe(self._insert, lambda: self._repository.insert(text=text))
 
     def edit_text(self, id_: UUID, text: str) -> bool:
-        return self._repository.edit_text(id_=id_, text=text)
+        return _observe(self._edit_text, lambda: self._repository.edit_text(id_=id_, text=text))
 
     def activate(self, id_: UUID) -> bool:
-        return self._repository.activate(id_=id_)
+        return _observe(self._activate, lambda: self._repository.activate(id_=id_))
 
     def deactivate(self, id_: UUID) -> bool:
-        return self._repository.deactivate(id_=id_)
+        return _observe(self._deactivate, lambda: self._repository.deactivate(id_=id_))
 
     def delete(self, id_: UUID) -> bool:
-        return self._repository.delete(id_=id_)
+        return _observe(self._delete, lambda: self._repository.delete(id_=id_))
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        return _observe(self._insert_many, lambda: self._repository.insert_many(texts=texts))
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        return _observe(
+            self._set_active_many,
+            lambda: self._repository.set_active_many(ids=ids, active=active),
+        )
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        return _observe(self._delete_many, lambda: self._repository.delete_many(ids=ids))
 
     def _clean(self) -> None:
         return self._repository._clean()
+
+
+def _observe(metrics: QueryMetrics, f: Callable[[], T]) -> T:
+    """
+    Run a repository operation and record its metrics.
+    :param metrics: Metrics of the operation.
+    :param f: Operation to run.
+    :return: Result of the operation.
+    """
+    metrics.in_progress.inc()
+    start = time.perf_counter()
+    try:
+        return f()
+    except Exception:
+        metrics.exceptions.inc()
+        raise
+    finally:
+        metrics.duration.observe(time.perf_counter() - start)
+        metrics.in_progress.dec()
+
+
+def _observe_iteration(metrics: QueryMetrics, items: Iterator[T]) -> Iterator[T]:
+    """
+    Record the metrics of a repository operation over the iteration of its result,
+    from the first item until the iterator is exhausted or closed.
+    :param metrics: Metrics of the operation.
+    :param items: Result of the operation.
+    :return: Items of the result.
+    """
+    metrics.in_progress.inc()
+    start = time.perf_counter()
+    try:
+        yield from items
+    except Exception:
+        metrics.exceptions.inc()
+        raise
+    finally:
+        metrics.duration.observe(time.perf_counter() - start)
+        metrics.in_progress.dec()
@@ -1,37 +1,93 @@
-from typing import Tuple, Optional, Dict, Callable
+from itertools import islice
+from operator import attrgetter
+from typing import Tuple, Optional, Dict, Callable, Sequence, Set, Iterator, Iterable
 from uuid import UUID, uuid1
 
+from sortedcontainers import SortedKeyList, SortedList
+
 from app.models.stats import Stats
 from app.models.todo import Todo
-from app.repository.base import Repository
+from app.repository.base import Repository, filter_todos
+
+# length of the substrings of the texts indexed for search: shorter searches scan the Todos
+NGRAM = 3
 
 
 class InMemoryRepository(Repository):
     """
     In-memory implementation of a Todos repository.
+    Todos are indexed by ID and also kept in a list sorted by ID, and the number of active
+    and inactive Todos is maintained on every write: `list` is a linear copy and `stats` is O(1).
+    The data version is a counter bumped by every write that changes something.
+
+    `search` uses secondary indexes: the sorted IDs of the active and of the inactive Todos,
+    and an inverted index from each 3-character substring of the lowercase texts to the IDs of the Todos
+    that contain it. The inverted index costs several times the memory of the Todos, so it is built
+    on the first search by text and maintained by every write from then on.
+    Both index IDs as integers, which hash and compare much faster than `UUID` objects.
     """
 
     def __init__(self):
         self._todos: Dict[UUID, Todo] = {}
+        self._sorted_todos = SortedKeyList(key=attrgetter("id"))
+        self._ids_by_status: Dict[bool, SortedList] = {True: SortedList(), False: SortedList()}
+        self._ids_by_ngram: Optional[Dict[str, Set[int]]] = None
+        self._active = 0
+        self._inactive = 0
+        self._version = 0
 
     def stats(self) -> Stats:
-        todos = self.list()
-        return Stats(
-            active=len(list(filter(lambda todo: todo.active, todos))),
-            inactive=len(list(filter(lambda todo: not todo.active, todos))),
-        )
+        return Stats(active=self._active, inactive=self._inactive)
+
+    def version(self) -> int:
+        return self._version
 
     def get(self, id_: UUID) -> Optional[Todo]:
         return self._todos.get(id_)
 
     def list(self) -> Tuple[Todo, ...]:
-        return tuple(sorted(self._todos.values()))
+        return tuple(self._sorted_todos)
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        start = 0 if after is None else self._sorted_todos.bisect_key_right(after)
+        return tuple(self._sorted_todos.islice(start, start + limit))
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        needle = text.lower() if text else ""
+        if len(needle) >= NGRAM:
+            after_key = -1 if after is None else after.int
+            # sorted as integers, the candidates are in ID order: stop as soon as the page is full
+            todos = (
+                self._todos[UUID(int=key)] for key in sorted(self._ids_containing(needle)) if key > after_key
+            )
+            return tuple(islice(filter_todos(todos, active, needle), limit))
+        return tuple(islice(filter_todos(self._todos_after(active, after), None, text), limit))
+
+    def export_todos(self) -> Iterator[Todo]:
+        # a copy of the references only, so that writes during the export do not break the iteration
+        return iter(self.list())
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        todos = list(todos)
+        self._check_new(todos)
+        self._add_all(todos)
+        return len(todos)
 
     def insert(self, text: str) -> UUID:
         id_ = uuid1()
         todo = Todo(id=id_, text=text, active=True)
         assert self._todos.get(id_) is None
         self._todos[id_] = todo
+        self._sorted_todos.add(todo)
+        self._index(todo)
+        self._count(todo, +1)
+        self._version += 1
         return id_
 
     def edit_text(self, id_: UUID, text: str) -> bool:
@@ -48,7 +104,28 @@ class InMemoryRepository(Repository):
 
     def delete(self, id_: UUID) -> bool:
         result = self._todos.pop(id_, None)
-        return result is not None
+        if result is None:
+            return False
+        else:
+            self._sorted_todos.remove(result)
+            self._unindex(result)
+            self._count(result, -1)
+            self._version += 1
+            return True
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        todos = [Todo(id=uuid1(), text=text, active=True) for text in texts]
+        self._add_all(todos)
+        return tuple(todo.id for todo in todos)
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        delta = lambda todo: Todo(id=todo.id, text=todo.text, active=active)
+        updated = {id_ for id_ in set(ids) if self._update(id_=id_, delta=delta)}
+        return tuple(id_ in updated for id_ in ids)
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        deleted = {id_ for id_ in set(ids) if self.delete(id_)}
+        return tuple(id_ in deleted for id_ in ids)
 
     def _update(self, id_: UUID, delta: Callable[[Todo], Todo]):
         old_todo = self._todos.get(id_)
@@ -57,7 +134,128 @@ class InMemoryRepository(Repository):
         else:
             new_todo = delta(old_todo)
             self._todos[id_] = new_todo
+            self._sorted_todos.remove(old_todo)
+            self._sorted_todos.add(new_todo)
+            self._reindex(old_todo, new_todo)
+            self._count(old_todo, -1)
+            self._count(new_todo, +1)
+            self._version += 1
             return True
 
+    def _check_new(self, todos: Sequence[Todo]) -> None:
+        """
+        :raise ValueError: If a Todo has the ID of a stored Todo or of another Todo of `todos`.
+        """
+        ids = {todo.id for todo in todos}
+        if len(ids) < len(todos) or any(id_ in self._todos for id_ in ids):
+            raise ValueError("Duplicate Todo IDs")
+
+    def _add_all(self, todos: Sequence[Todo]) -> None:
+        """
+        Add new Todos, as a single write.
+        """
+        self._todos.update((todo.id, todo) for todo in todos)
+        self._sorted_todos.update(todos)
+        for status, ids in self._ids_by_status.items():
+            ids.update(todo.id.int for todo in todos if todo.active == status)
+        if self._ids_by_ngram is not None:
+            for todo in todos:
+                self._index_text(todo)
+        active = sum(todo.active for todo in todos)
+        self._active += active
+        self._inactive += len(todos) - active
+        if todos:
+            self._version += 1
+
+    def _rebuild_indexes(self) -> None:
+        """
+        Rebuild the secondary indexes from the Todos sorted by ID.
+        """
+        self._ids_by_status = {
+            status: SortedList(todo.id.int for todo in self._sorted_todos if todo.active == status)
+            for status in (True, False)
+        }
+        self._ids_by_ngram = None
+
+    def _index(self, todo: Todo) -> None:
+        self._ids_by_status[todo.active].add(todo.id.int)
+        if self._ids_by_ngram is not None:
+            self._index_text(todo)
+
+    def _unindex(self, todo: Todo) -> None:
+        self._ids_by_status[todo.active].remove(todo.id.int)
+        if self._ids_by_ngram is not None:
+            self._unindex_text(todo)
+
+    def _reindex(self, old_todo: Todo, new_todo: Todo) -> None:
+        if old_todo.active != new_todo.active:
+            self._ids_by_status[old_todo.active].remove(old_todo.id.int)
+            self._ids_by_status[new_todo.active].add(new_todo.id.int)
+        if self._ids_by_ngram is not None and old_todo.text != new_todo.text:
+            self._unindex_text(old_todo)
+            self._index_text(new_todo)
+
+    def _index_text(self, todo: Todo) -> None:
+        key = todo.id.int
+        ids_by_ngram = self._ids_by_ngram
+        for ngram in _ngrams(todo.text.lower()):
+            ids = ids_by_ngram.get(ngram)
+            if ids is None:
+                ids_by_ngram[ngram] = {key}
+            else:
+                ids.add(key)
+
+    def _unindex_text(self, todo: Todo) -> None:
+        key = todo.id.int
+        for ngram in _ngrams(todo.text.lower()):
+            ids = self._ids_by_ngram[ngram]
+            ids.discard(key)
+            if not ids:
+                del self._ids_by_ngram[ngram]
+
+    def _ids_containing(self, needle: str) -> Set[int]:
+        """
+        :param needle: Lowercase text of at least `NGRAM` characters.
+        :return: IDs of the Todos whose lowercase text contains all substrings of the needle,
+          a superset of the ones that contain the needle.
+        """
+        if self._ids_by_ngram is None:
+            self._ids_by_ngram = {}
+            for todo in self._sorted_todos:
+                self._index_text(todo)
+        empty: Set[int] = set()
+        postings = sorted((self._ids_by_ngram.get(ngram, empty) for ngram in _ngrams(needle)), key=len)
+        # each intersection costs a lookup per candidate, in a set too large for the CPU caches:
+        # it is only worth it with substrings that rule out at least half of the Todos
+        common = len(self._todos) // 2
+        return postings[0].intersection(*(ids for ids in postings[1:] if len(ids) <= common))
+
+    def _todos_after(self, active: Optional[bool], after: Optional[UUID]) -> Iterator[Todo]:
+        """
+        :return: Todos with ID greater than `after` and the given status, if any, ordered by ID.
+        """
+        if active is None:
+            start = 0 if after is None else self._sorted_todos.bisect_key_right(after)
+            return self._sorted_todos.islice(start)
+        ids = self._ids_by_status[active]
+        start = 0 if after is None else ids.bisect_right(after.int)
+        return (self._todos[UUID(int=key)] for key in ids.islice(start))
+
+    def _count(self, todo: Todo, increment: int) -> None:
+        if todo.active:
+            self._active += increment
+        else:
+            self._inactive += increment
+
     def _clean(self) -> None:
         self._todos = {}
+        self._sorted_todos = SortedKeyList(key=attrgetter("id"))
+        self._ids_by_status = {True: SortedList(), False: SortedList()}
+        self._ids_by_ngram = None
+        self._active = 0
+        self._inactive = 0
+        self._version += 1
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[start : start + NGRAM] for start in range(len(text) - NGRAM + 1)}
@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import psycopg2
+from prometheus_client import Gauge, Histogram
+from psycopg2.extensions import connection, TRANSACTION_STATUS_IDLE
+from psycopg2.pool import PoolError
+
+POOL_CONNECTIONS = Gauge(
+    "app_repository_pool_connections",
+    "Number of open database connections, by state.",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+POOL_WAITERS = Gauge(
+    "app_repository_pool_waiters",
+    "Number of threads waiting for a database connection.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_ACQUIRE_DURATION = Histogram(
+    "app_repository_pool_acquire_duration_seconds",
+    "Time spent waiting for a database connection.",
+    ["pool"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class PoolTimeout(PoolError):
+    """
+    Raised when no connection becomes available within the acquire timeout.
+    """
+
+
+class BlockingConnectionPool:
+    """
+    Thread-safe pool of PostgreSQL connections.
+    Unlike `psycopg2.pool.ThreadedConnectionPool`, `getconn` waits for a connection
+    to be returned when the pool is exhausted, up to a timeout.
+    Connections are checked on checkout and replaced when they are broken,
+    older than `max_lifetime` or idle for longer than `max_idle`. Idle connections are reused
+    most recently used first, so the least recently used ones are also closed on checkin and checkout
+    once expired: otherwise, under a steady load lower than the pool size, they would never be checked out.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        max_connections: int,
+        acquire_timeout: float = 5.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        ping_after: float = 30.0,
+        name: str = "primary",
+        connect: Callable[[str], connection] = psycopg2.connect,
+    ):
+        """
+        :param dsn: Connection string.
+        :param max_connections: Max number of open connections.
+        :param acquire_timeout: Max time to wait for a connection, in seconds.
+        :param max_lifetime: Connections older than this are closed on checkout, in seconds.
+        :param max_idle: Connections unused for longer than this are closed on checkout, in seconds.
+        :param ping_after: Connections unused for longer than this are pinged on checkout, in seconds.
+        :param name: Name of the pool, used as metrics label.
+        :param connect: Function to open a new connection.
+        """
+        assert max_connections > 0
+        self._dsn = dsn
+        self._max_connections = max_connections
+        self._acquire_timeout = acquire_timeout
+        self._max_lifetime = max_lifetime
+        self._max_idle = max_idle
+        self._ping_after = ping_after
+        self._connect = connect
+
+        self._condition = threading.Condition()
+        # idle connections with their creation and last use time, most recently used last
+        self._idle: Deque[Tuple[connection, float, float]] = deque()
+        self._created: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+
+        self._in_use_gauge = POOL_CONNECTIONS.labels(pool=name, state="in_use")
+        self._idle_gauge = POOL_CONNECTIONS.labels(pool=name, state="idle")
+        self._waiters_gauge = POOL_WAITERS.labels(pool=name)
+        self._acquire_duration = POOL_ACQUIRE_DURATION.labels(pool=name)
+
+    def getconn(self) -> connection:
+        """
+        Take a healthy connection from the pool, opening a new one if needed.
+        :return: Connection, to be given back with `putconn`.
+        :raise PoolTimeout: If no connection becomes available within the acquire timeout.
+        """
+        start = time.monotonic()
+        deadline = start + self._acquire_timeout
+        try:
+            while True:
+                idle = self._checkout(deadline)
+                if idle is None:
+                    conn = self._open()
+                    self._created[id(conn)] = time.monotonic()
+                    return conn
+                conn, created, last_used = idle
+                if self._is_healthy(conn, created, last_used):
+                    return conn
+                self._discard(conn)
+        finally:
+            self._acquire_duration.observe(time.monotonic() - start)
+
+    def putconn(self, conn: connection, close: bool = False) -> None:
+        """
+        Give a connection back to the pool.
+        :param conn: Connection taken with `getconn`.
+        :param close: True to close the connection instead of reusing it.
+        """
+        if close or self._closed or not self._is_reusable(conn):
+            self._discard(conn)
+            return
+
+        with self._condition:
+            created = self._created.get(id(conn), time.monotonic())
+            self._idle.append((conn, created, time.monotonic()))
+            self._in_use_gauge.dec()
+            self._idle_gauge.inc()
+            self._condition.notify()
+            expired = self._reap()
+        self._close(expired)
+
+    def closeall(self) -> None:
+        """
+        Close all idle connections; connections in use are closed when given back.
+        """
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._idle_gauge.dec()
+                self._size -= 1
+                self._created.pop(id(conn), None)
+                conn.close()
+            self._condition.notify_all()
+
+    def _checkout(self, deadline: float) -> Optional[Tuple[connection, float, float]]:
+        """
+        Wait for an idle connection or for room to open a new one.
+        :param deadline: Monotonic time after which to give up.
+        :return: An idle connection with its creation and last use time, or None to open a new one.
+        """
+        with self._condition:
+            expired = self._reap()
+        self._close(expired)
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    self._idle_gauge.dec()
+                    self._in_use_gauge.inc()
+                    return self._idle.pop()
+                if self._size < self._max_connections:
+                    self._size += 1
+                    self._in_use_gauge.inc()
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        "no connection available within {}s".format(self._acquire_timeout)
+                    )
+                self._waiters_gauge.inc()
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiters_gauge.dec()
+
+    def _reap(self) -> List[connection]:
+        """
+        Remove the expired connections from the least recently used end of the idle ones.
+        Must be called with the condition held; the connections are closed by the caller, without it.
+        :return: Connections removed.
+        """
+        now = time.monotonic()
+        expired = []
+        while self._idle:
+            conn, created, last_used = self._idle[0]
+            if now - last_used <= self._max_idle and now - created <= self._max_lifetime:
+                break
+            self._idle.popleft()
+            self._idle_gauge.dec()
+            self._size -= 1
+            self._created.pop(id(conn), None)
+            expired.append(conn)
+        if expired:
+            self._condition.notify(len(expired))
+        return expired
+
+    @staticmethod
+    def _close(connections: List[connection]) -> None:
+        for conn in connections:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+    def _open(self) -> connection:
+        try:
+            return self._connect(self._dsn)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._in_use_gauge.dec()
+                self._condition.notify()
+            raise
+
+    def _is_healthy(self, conn: connection, created: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created > self._max_lifetime or now - last_used > self._max_idle:
+            return False
+        if now - last_used > self._ping_after:
+            try:
+                with conn.cursor() as curs:
+                    curs.execute("SELECT 1;")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    @staticmethod
+    def _is_reusable(conn: connection) -> bool:
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _discard(self, conn: connection) -> None:
+        with self._condition:
+            self._size -= 1
+            self._created.pop(id(conn), None)
+            self._in_use_gauge.dec()
+            self._condition.notify()
+        self._close([conn])
@@ -0,0 +1,87 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from prometheus_client import Counter, Gauge
+
+READ_ROUTING = Counter(
+    "app_repository_read_routing_total",
+    "Number of reads, by pool they were sent to and reason.",
+    ["pool", "reason"],
+)
+REPLICA_LAG = Gauge(
+    "app_repository_replica_lag_seconds",
+    "Replication lag of the replica, as last measured: +Inf if it could not be measured.",
+    multiprocess_mode="max",
+)
+
+# reads made in this context go to the primary, e.g., right after the client wrote
+_read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+@contextmanager
+def read_from_primary() -> Iterator[None]:
+    """
+    Send the reads made within the block to the primary, to read your own writes.
+    """
+    token = _read_from_primary.set(True)
+    try:
+        yield
+    finally:
+        _read_from_primary.reset(token)
+
+
+def pin_to_primary() -> object:
+    """
+    Send the reads made in the current context to the primary, until `unpin`.
+    :return: Token to give to `unpin`.
+    """
+    return _read_from_primary.set(True)
+
+
+def unpin(token: object) -> None:
+    """
+    :param token: Token returned by `pin_to_primary`.
+    """
+    _read_from_primary.reset(token)
+
+
+def is_pinned_to_primary() -> bool:
+    return _read_from_primary.get()
+
+
+class ReplicaLag:
+    """
+    Replication lag of a replica, measured at most once every `refresh_interval` seconds.
+    The thread that finds the measure stale refreshes it, the others keep using the last one.
+    """
+
+    def __init__(self, measure: Callable[[], float], refresh_interval: float = 1.0):
+        """
+        :param measure: Function to measure the lag in seconds, may raise if the replica is unreachable.
+        :param refresh_interval: Min time between measures, in seconds.
+        """
+        self._measure = measure
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._lag = 0.0
+        self._measured_at = -math.inf
+
+    def get(self) -> float:
+        """
+        :return: Last measured lag in seconds, +Inf if the last measure failed.
+        """
+        if time.monotonic() - self._measured_at >= self._refresh_interval and self._lock.acquire(blocking=False):
+            try:
+                try:
+                    self._lag = self._measure()
+                except Exception:
+                    self._lag = math.inf
+                self._measured_at = time.monotonic()
+                REPLICA_LAG.set(self._lag)
+            finally:
+                self._lock.release()
+        return self._lag
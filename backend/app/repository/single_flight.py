@@ -0,0 +1,168 @@
+import threading
+from typing import Tuple, Optional, Sequence, Callable, Any, Iterable, Iterator, Dict, Hashable, TypeVar
+from uuid import UUID
+
+from prometheus_client import Counter
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.base import Repository
+from app.repository.routing import is_pinned_to_primary
+
+COALESCED_CALLS = Counter(
+    "app_repository_coalesced_calls_total",
+    "Number of repository reads that shared the call of an identical read already running.",
+    ["query"],
+)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """
+    Call in progress, and its outcome once `done` is set.
+    """
+
+    __slots__ = ("generation", "done", "result", "error")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlightRepository(Repository):
+    """
+    Request-coalescing decorator for a concrete implementation of Repository.
+    A read made while an identical read is running on the underlying repository waits for that call
+    and gets its result, or its exception, instead of running its own: a burst of identical reads runs once.
+    Nothing is kept once the call returns, so a result is never older than the call that produced it;
+    a write made through this decorator also stops later reads from joining calls started before it ended.
+    Please use it as follows, inside `InstrumentedRepository` to measure only the calls that run:
+    ```
+        basic_repository = ...
+        single_flight_repository = SingleFlightRepository(InstrumentedRepository(basic_repository))
+    ```
+    """
+
+    def __init__(self, repository: Repository):
+        self._repository = repository
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        # bumped after every write
+        self._generation = 0
+        self._coalesced = {
+            query: COALESCED_CALLS.labels(query=query)
+            for query in ("stats", "version", "get", "list", "list_page", "search")
+        }
+
+    def stats(self) -> Stats:
+        return self._call(("stats",), self._repository.stats)
+
+    def version(self) -> int:
+        return self._call(("version",), self._repository.version)
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        return self._call(("get", id_), lambda: self._repository.get(id_=id_))
+
+    def list(self) -> Tuple[Todo, ...]:
+        return self._call(("list",), self._repository.list)
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        return self._call(
+            ("list_page", after, limit), lambda: self._repository.list_page(after=after, limit=limit)
+        )
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        return self._call(
+            ("search", active, text, after, limit),
+            lambda: self._repository.search(active=active, text=text, after=after, limit=limit),
+        )
+
+    def export_todos(self) -> Iterator[Todo]:
+        return self._repository.export_todos()
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        return self._write(lambda: self._repository.import_todos(todos=todos))
+
+    def insert(self, text: str) -> UUID:
+        return self._write(lambda: self._repository.insert(text=text))
+
+    def edit_text(self, id_: UUID, text: str) -> bool:
+        return self._write(lambda: self._repository.edit_text(id_=id_, text=text))
+
+    def activate(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.activate(id_=id_))
+
+    def deactivate(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.deactivate(id_=id_))
+
+    def delete(self, id_: UUID) -> bool:
+        return self._write(lambda: self._repository.delete(id_=id_))
+
+    def insert_many(self, texts: Sequence[str]) -> Tuple[UUID, ...]:
+        return self._write(lambda: self._repository.insert_many(texts=texts))
+
+    def set_active_many(self, ids: Sequence[UUID], active: bool) -> Tuple[bool, ...]:
+        return self._write(lambda: self._repository.set_active_many(ids=ids, active=active))
+
+    def delete_many(self, ids: Sequence[UUID]) -> Tuple[bool, ...]:
+        return self._write(lambda: self._repository.delete_many(ids=ids))
+
+    def _clean(self) -> None:
+        return self._write(self._repository._clean)
+
+    def _call(self, key: Tuple[Hashable, ...], f: Callable[[], T]) -> T:
+        """
+        Run a read, or wait for the identical read already running.
+        :param key: Name of the operation, followed by its arguments.
+        :param f: Read to run.
+        :return: Result of the read.
+        :raise Exception: Any exception raised by the read.
+        """
+        # reads pinned to the primary must not get the result of a read from a replica, nor the opposite
+        key += (is_pinned_to_primary(),)
+        with self._lock:
+            flight = self._flights.get(key)
+            # a call started before the last write ended may not see it
+            leader = flight is None or flight.generation != self._generation
+            if leader:
+                flight = _Flight(self._generation)
+                self._flights[key] = flight
+        if not leader:
+            self._coalesced[key[0]].inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = f()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def _write(self, f: Callable[[], T]) -> T:
+        """
+        Run a write on the underlying repository, then stop reads from joining the calls it may have raced with.
+        Reads are separated even if the write fails, since it may have been partially applied.
+        :param f: Write to run.
+        :return: Result of the write.
+        """
+        try:
+            return f()
+        finally:
+            with self._lock:
+                self._generation += 1
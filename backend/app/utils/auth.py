@@ -0,0 +1,12 @@
+import hmac
+from typing import Optional
+
+
+def is_authorized(authorization: Optional[str], token: str) -> bool:
+    """
+    Check a bearer token, in constant time so that the response time does not leak the token.
+    :param authorization: Value of the `Authorization` header of the request, None if missing.
+    :param token: Secret the request must send.
+    :return: True if the header is `Bearer <token>`.
+    """
+    return hmac.compare_digest((authorization or "").encode(), "Bearer {}".format(token).encode())
@@ -1,47 +1,200 @@
+import asyncio
 import functools
+import json
+import os
 import random
+import threading
 import time
+from typing import NamedTuple, Dict, Optional, Mapping, Any
 
+from prometheus_client import Histogram
 
-def random_delay(min_delay: float, max_delay: float):
+INJECTED_DELAY = Histogram(
+    "app_injected_delay_seconds",
+    "Synthetic delay injected before an operation, by injection point.",
+    ["point"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0, 5.0, 10.0),
+)
+
+
+class Delay(NamedTuple):
     """
-    Decorator to add a random delay before executing the function.
-    :param min_delay: Min delay in seconds.
-    :param max_delay: Max delay in seconds.
-    :return: Decorator.
+    With probability `probability`, wait for a time drawn uniformly between `min_delay` and `max_delay`.
     """
-    assert min_delay >= 0
-    assert min_delay <= max_delay
 
-    def decorator(f):
-        @functools.wraps(f)
-        def wrapper(*args, **kwargs):
-            wait = random.uniform(min_delay, max_delay)
-            time.sleep(wait)
-            return f(*args, **kwargs)
+    min_delay: float
+    max_delay: float
+    probability: float = 1.0
 
-        return wrapper
+    def sample(self, rnd: random.Random) -> float:
+        """
+        :param rnd: Source of randomness.
+        :return: Time to wait in seconds, 0 if no delay should be injected.
+        """
+        if rnd.random() >= self.probability:
+            return 0.0
+        return rnd.uniform(self.min_delay, self.max_delay)
 
-    return decorator
+    def validate(self) -> "Delay":
+        """
+        :return: The same delay.
+        :raise ValueError: If any parameter is out of range.
+        """
+        if not 0 <= self.min_delay <= self.max_delay:
+            raise ValueError("Delay bounds out of range")
+        if not 0 <= self.probability <= 1:
+            raise ValueError("Delay probability out of range")
+        return self
+
+
+# profile name -> injection point -> delay
+Profiles = Mapping[str, Mapping[str, Delay]]
+
+PROFILES: Profiles = {
+    "none": {},
+    # the delays the workshop starts with
+    "workshop": {
+        "postgresql.list": Delay(1.5, 1.5, probability=0.2),
+        "postgresql.insert": Delay(0.5, 2.0),
+        "postgresql.deactivate": Delay(3.0, 3.0, probability=0.1),
+    },
+}
+
+
+class DelayInjector:
+    """
+    Pick the delays to inject from a set of named profiles.
+    The active profile can be switched at runtime, and the random generator seeded
+    so that the same sequence of delays is injected on every run.
+    """
+
+    def __init__(self, profiles: Profiles = PROFILES, profile: str = "workshop", seed: Optional[int] = None):
+        """
+        :param profiles: Available profiles by name.
+        :param profile: Name of the active profile.
+        :param seed: Seed of the random generator, None to seed from the system.
+        """
+        self._profiles = {name: dict(delays) for name, delays in profiles.items()}
+        self._lock = threading.Lock()
+        self._profile = ""
+        self._delays: Mapping[str, Delay] = {}
+        self._seed: Optional[int] = None
+        self._random = random.Random()
+        self.configure(profile=profile, seed=seed)
 
+    @classmethod
+    def from_env(cls) -> "DelayInjector":
+        """
+        Create an injector from the environment:
+        `DELAY_PROFILES_FILE` is a JSON file with additional profiles, e.g.
+        `{"tail": {"postgresql.get": {"min_delay": 0.2, "max_delay": 0.2, "probability": 0.01}}}`,
+        `DELAY_PROFILE` is the active profile (default `workshop`) and `DELAY_SEED` the seed.
+        :return: Configured injector.
+        """
+        profiles = dict(PROFILES)
+        path = os.environ.get("DELAY_PROFILES_FILE")
+        if path:
+            with open(path) as file:
+                profiles.update(parse_profiles(json.load(file)))
+        seed = os.environ.get("DELAY_SEED")
+        return cls(
+            profiles=profiles,
+            profile=os.environ.get("DELAY_PROFILE", "workshop"),
+            seed=int(seed) if seed else None,
+        )
 
-def rare_delay(delay: float, probability: float):
+    @property
+    def profiles(self) -> Profiles:
+        return self._profiles
+
+    @property
+    def profile(self) -> str:
+        return self._profile
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self._seed
+
+    def configure(self, profile: str, seed: Optional[int] = None) -> None:
+        """
+        Switch the active profile.
+        :param profile: Name of the profile to activate.
+        :param seed: New seed of the random generator, None to keep the current sequence.
+        :raise ValueError: If the profile does not exist.
+        """
+        if profile not in self._profiles:
+            raise ValueError("Unknown delay profile: {}".format(profile))
+        with self._lock:
+            self._profile = profile
+            self._delays = self._profiles[profile]
+            if seed is not None:
+                self._seed = seed
+                self._random.seed(seed)
+
+    def sample(self, point: str) -> float:
+        """
+        :param point: Name of the injection point.
+        :return: Time to wait before the operation in seconds, 0 if none.
+        """
+        delay = self._delays.get(point)
+        if delay is None:
+            return 0.0
+        with self._lock:
+            return delay.sample(self._random)
+
+
+def parse_profiles(data: Any) -> Dict[str, Dict[str, Delay]]:
+    """
+    :param data: Profiles as decoded from JSON.
+    :return: Profiles by name.
+    :raise ValueError: If the profiles are malformed.
     """
-    Decorator to add a fixed random delay before executing the function
-    with a given probability.
-    :param delay: Delay in seconds.
-    :param probability: Probability of delaying the function execution.
+    try:
+        return {
+            name: {point: Delay(**delay).validate() for point, delay in delays.items()}
+            for name, delays in data.items()
+        }
+    except (AttributeError, TypeError) as e:
+        raise ValueError("Malformed delay profiles") from e
+
+
+INJECTOR = DelayInjector.from_env()
+
+
+def inject_delay(point: str, injector: Optional[DelayInjector] = None):
+    """
+    Decorator to wait before executing the function, for as long as the active delay profile says.
+    Coroutine functions are delayed with `asyncio.sleep`, so they do not block the event loop.
+    :param point: Name of the injection point, looked up in the active profile.
+    :param injector: Injector to sample delays from, the global `INJECTOR` by default.
     :return: Decorator.
     """
-    assert probability >= 0
-    assert probability <= 1
 
     def decorator(f):
+        injected_delay = INJECTED_DELAY.labels(point=point)
+
+        def sample() -> float:
+            wait = (injector or INJECTOR).sample(point)
+            if wait > 0:
+                injected_delay.observe(wait)
+            return wait
+
+        if asyncio.iscoroutinefunction(f):
+
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                wait = sample()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                return await f(*args, **kwargs)
+
+            return async_wrapper
+
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
-            number = random.random()
-            if probability >= number:
-                time.sleep(delay)
+            wait = sample()
+            if wait > 0:
+                time.sleep(wait)
             return f(*args, **kwargs)
 
         return wrapper
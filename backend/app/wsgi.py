@@ -0,0 +1,32 @@
+"""
+WSGI entry point for production: every worker process imports this module
+and gets its own connection pool. Please run it with Gunicorn from the `backend` folder,
+so that `gunicorn.conf.py` is loaded as well:
+```
+    gunicorn app.wsgi:app
+```
+"""
+import os
+
+from app.main import (
+    register_custom_metrics,
+    make_caching_repository,
+    make_single_flight_repository,
+    make_flask_app,
+)
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.postgresql import PostgreSQLRepository
+from app.utils.delay import INJECTOR
+
+# every worker thread holds at most one connection at a time
+max_connections = int(
+    os.environ.get("POSTGRESQL_MAX_CONNECTIONS", os.environ.get("GUNICORN_THREADS", 4))
+)
+
+repository = PostgreSQLRepository.factory(max_connections=max_connections)
+repository.connect()
+instrumented_repository = InstrumentedRepository(repository)
+register_custom_metrics(instrumented_repository)
+app = make_flask_app(
+    make_caching_repository(make_single_flight_repository(instrumented_repository)), delay_injector=INJECTOR
+)
@@ -0,0 +1,131 @@
+"""
+Throughput of thread-safe in-memory repositories against the number of threads.
+
+Compares `ConcurrentInMemoryRepository` with `InMemoryRepository` behind one global lock,
+the simplest way to make it thread-safe. Every thread runs a mix of point reads and writes,
+and one more thread lists all Todos in a loop: with a global lock, writers wait for every `list`.
+With `--reads list_page`, that thread reads pages of 100 Todos instead, each after a write:
+the workload of a paginated client, for which the stripes are merged rather than sorted.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_concurrent --size 100000 --threads 1 2 4 8 16
+    PYTHONPATH=. python -m benchmarks.bench_concurrent --size 1000000 --threads 4 --reads list_page
+```
+"""
+import argparse
+import random
+import threading
+import time
+from typing import List, Dict
+
+from app.repository.base import Repository
+from app.repository.concurrent import ConcurrentInMemoryRepository
+from app.repository.memory import InMemoryRepository
+from benchmarks.common import populate, percentiles, format_seconds
+
+
+class LockedRepository(Repository):
+    """
+    Reference implementation: every method of the wrapped repository runs under one lock.
+    """
+
+    def __init__(self, repository: Repository):
+        lock = threading.Lock()
+        for name in dir(Repository):
+            if not name.startswith("_"):
+                setattr(self, name, self._locked(lock, getattr(repository, name)))
+
+    @staticmethod
+    def _locked(lock: threading.Lock, method):
+        def locked(*args, **kwargs):
+            with lock:
+                return method(*args, **kwargs)
+
+        return locked
+
+
+IMPLEMENTATIONS = {
+    "concurrent": ConcurrentInMemoryRepository,
+    "global_lock": lambda: LockedRepository(InMemoryRepository()),
+}
+
+
+def run(repository: Repository, ids: List, threads: int, duration: float, reads: str) -> Dict[str, float]:
+    """
+    :return: Throughput of the mix, number of lists or pages, and write latency percentiles.
+    """
+    counts = [0] * threads
+    write_latencies: List[List[float]] = [[] for _ in range(threads)]
+    lists = [0]
+
+    def work(index: int) -> None:
+        rnd = random.Random(index)
+        while time.perf_counter() < deadline:
+            id_ = rnd.choice(ids)
+            operation = rnd.random()
+            if operation < 0.8:
+                repository.get(id_)
+            else:
+                start = time.perf_counter()
+                if operation < 0.9:
+                    repository.edit_text(id_, "Edited")
+                else:
+                    repository.set_active_many([id_], operation < 0.95)
+                write_latencies[index].append(time.perf_counter() - start)
+            counts[index] += 1
+
+    def list_all() -> None:
+        rnd = random.Random(-1)
+        while time.perf_counter() < deadline:
+            if reads == "list":
+                repository.list()
+            else:
+                repository.list_page(after=rnd.choice(ids), limit=100)
+            repository.stats()
+            lists[0] += 1
+
+    workers = [threading.Thread(target=work, args=(index,)) for index in range(threads)]
+    workers.append(threading.Thread(target=list_all))
+    # every thread checks the deadline: with many threads, the main thread could wake up much later
+    deadline = time.perf_counter() + duration
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    latencies = percentiles([latency for thread in write_latencies for latency in thread], (0.5, 0.99))
+    return {"throughput": sum(counts) / duration, "lists": lists[0], **latencies}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=10 ** 5)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--reads", choices=("list", "list_page"), default="list")
+    args = parser.parse_args()
+
+    print(
+        "{:<12} {:>8} {:>12} {:>8} {:>10} {:>10}".format(
+            "impl", "threads", "ops/s", args.reads + "s", "write p50", "write p99"
+        )
+    )
+    for name, factory in IMPLEMENTATIONS.items():
+        repository = factory()
+        ids = list(populate(repository, args.size))
+        for threads in args.threads:
+            result = run(repository, ids, threads, args.duration, args.reads)
+            print(
+                "{:<12} {:>8} {:>12,.0f} {:>8} {:>10} {:>10}".format(
+                    name,
+                    threads,
+                    result["throughput"],
+                    result["lists"],
+                    format_seconds(result["p50"]),
+                    format_seconds(result["p99"]),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Throughput and peak RSS of `GET /todos/export` and `POST /todos/import`, against the endpoints they replace.
+
+`export` streams NDJSON from a server-side cursor, `list` serializes the whole table at once.
+`import` streams an NDJSON body into `COPY ... FROM STDIN`, `batch` posts the same Todos to `/todos/batch`,
+`MAX_BATCH_SIZE` at a time. Request bodies are written to a temporary file before the baseline RSS is taken,
+and responses are read chunk by chunk and dropped. Each mode runs in a fresh process, so that the peak RSS
+reflects only that mode. Injected delays are disabled.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_export --size 1000000
+```
+"""
+import argparse
+import os
+import tempfile
+import time
+from uuid import uuid1
+
+from flask import Flask
+
+from app.apis.params import MAX_BATCH_SIZE
+from app.apis.todo import make_todos_blueprint
+from app.utils.delay import INJECTOR
+from benchmarks.common import BACKENDS, make_repository, populate, peak_rss_bytes, run_isolated, format_bytes
+
+MODES = ("list", "export", "batch", "import")
+
+
+def run(backend: str, size: int, mode: str) -> dict:
+    INJECTOR.configure("none")
+    repository = make_repository(backend)
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(repository))
+    client = app.test_client()
+    with tempfile.TemporaryFile() as body:
+        if mode in ("list", "export"):
+            populate(repository, size)
+        else:
+            # one in three is inactive, as with `populate`
+            for i in range(size):
+                line = '{{"id":"{}","text":"Todo #{}","active":{}}}\n'.format(uuid1(), i, "true" if i % 3 else "false")
+                body.write(line.encode())
+            body.seek(0)
+        baseline_rss = peak_rss_bytes()
+
+        start = time.perf_counter()
+        if mode == "list":
+            response = client.get("/todos/")
+            _check(response)
+        elif mode == "export":
+            response = client.get("/todos/export", buffered=False)
+            _check(response)
+            for _ in response.response:
+                pass
+            response.close()
+        elif mode == "import":
+            response = client.post(
+                "/todos/import",
+                input_stream=body,
+                content_length=os.fstat(body.fileno()).st_size,
+                content_type="application/x-ndjson",
+            )
+            _check(response)
+        else:
+            for start_index in range(0, size, MAX_BATCH_SIZE):
+                texts = ["Todo #{}".format(i) for i in range(start_index, min(size, start_index + MAX_BATCH_SIZE))]
+                _check(client.post("/todos/batch", json={"texts": texts}))
+        duration = time.perf_counter() - start
+
+    assert repository.stats().active + repository.stats().inactive == size
+    rss = peak_rss_bytes() - baseline_rss
+    repository._clean()
+    return {"rows_per_second": size / duration, "duration": duration, "rss": rss}
+
+
+def _check(response) -> None:
+    assert response.status_code == 200, response.status_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=BACKENDS, default="postgresql")
+    parser.add_argument("--size", type=int, default=10 ** 6)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    print("backend={} size={}".format(args.backend, args.size))
+    print("{:<8} {:>12} {:>10} {:>12}".format("mode", "rows/s", "duration", "peak RSS +"))
+    for mode in args.modes:
+        result = run_isolated(run, args.backend, args.size, mode)
+        print(
+            "{:<8} {:>12,.0f} {:>9.2f}s {:>12}".format(
+                mode, result["rows_per_second"], result["duration"], format_bytes(result["rss"])
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Throughput and latency of concurrent inserts into `PostgreSQLRepository`, with and without group commit.
+
+Every thread inserts Todos in a loop; with group commit, the inserts of all threads are committed
+in batches by the background flusher. Injected delays are disabled.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_group_commit --threads 1 8 32 --duration 5
+```
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.repository.group_commit import GROUP_COMMIT_SIZE
+from app.repository.postgresql import PostgreSQLRepository, GroupCommit
+from app.utils.delay import INJECTOR
+from benchmarks.common import percentiles, format_seconds
+
+CONFIGURATIONS = {
+    "none": None,
+    "window=0": GroupCommit(max_delay=0.0),
+    "window=2ms": GroupCommit(max_delay=0.002),
+}
+
+
+def run(group_commit: Optional[GroupCommit], threads: int, duration: float) -> Dict[str, float]:
+    repository = PostgreSQLRepository(
+        connection_url=PostgreSQLRepository.factory()._connection_url,
+        max_connections=threads + 1,
+        group_commit=group_commit,
+    )
+    repository.connect()
+    repository.initialize()
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    flushes_before = _sample("_count")
+
+    def insert(index: int) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            repository.insert("Todo")
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=insert, args=(index,)) for index in range(threads)]
+    deadline = time.perf_counter() + duration
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    flushes = _sample("_count") - flushes_before
+    repository._clean()
+    repository.disconnect()
+
+    samples = [latency for thread in latencies for latency in thread]
+    return {
+        "throughput": len(samples) / duration,
+        "per_flush": len(samples) / flushes if flushes else 1.0,
+        **percentiles(samples, (0.5, 0.99)),
+    }
+
+
+def _sample(suffix: str) -> float:
+    return next(sample.value for sample in GROUP_COMMIT_SIZE.collect()[0].samples if sample.name.endswith(suffix))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    INJECTOR.configure("none")
+    print(
+        "{:<12} {:>8} {:>12} {:>10} {:>10} {:>10}".format(
+            "group commit", "threads", "inserts/s", "per flush", "p50", "p99"
+        )
+    )
+    for name, group_commit in CONFIGURATIONS.items():
+        for threads in args.threads:
+            result = run(group_commit, threads, args.duration)
+            print(
+                "{:<12} {:>8} {:>12,.0f} {:>10.1f} {:>10} {:>10}".format(
+                    name,
+                    threads,
+                    result["throughput"],
+                    result["per_flush"],
+                    format_seconds(result["p50"]),
+                    format_seconds(result["p99"]),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
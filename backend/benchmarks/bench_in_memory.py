@@ -0,0 +1,107 @@
+"""
+Micro-benchmark of `InMemoryRepository` at growing sizes.
+
+Compares the sorted index with live counters against the previous implementation,
+a plain dict that is sorted on every `list` and scanned on every `stats`.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_in_memory --sizes 1000 10000 100000 1000000
+```
+"""
+import argparse
+import heapq
+import random
+from typing import Tuple, Optional, Dict, Callable, Sequence
+from uuid import UUID, uuid1
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.memory import InMemoryRepository
+from benchmarks.common import populate, measure, percentiles, format_seconds
+
+
+class DictRepository(InMemoryRepository):
+    """
+    Reference implementation: unsorted dict, sort on read, scan for stats.
+    Writes only touch the dict, so that they do not pay for the indexes of `InMemoryRepository`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._todos: Dict[UUID, Todo] = {}
+
+    def stats(self) -> Stats:
+        todos = self.list()
+        return Stats(
+            active=len(list(filter(lambda todo: todo.active, todos))),
+            inactive=len(list(filter(lambda todo: not todo.active, todos))),
+        )
+
+    def list(self) -> Tuple[Todo, ...]:
+        return tuple(sorted(self._todos.values()))
+
+    def list_page(self, after: Optional[UUID], limit: int) -> Tuple[Todo, ...]:
+        todos = self._todos.values()
+        if after is not None:
+            todos = (todo for todo in todos if todo.id > after)
+        return tuple(heapq.nsmallest(limit, todos))
+
+    def insert(self, text: str) -> UUID:
+        id_ = uuid1()
+        todo = Todo(id=id_, text=text, active=True)
+        assert self._todos.get(id_) is None
+        self._todos[id_] = todo
+        return id_
+
+    def delete(self, id_: UUID) -> bool:
+        result = self._todos.pop(id_, None)
+        return result is not None
+
+    def _update(self, id_: UUID, delta: Callable[[Todo], Todo]):
+        old_todo = self._todos.get(id_)
+        if old_todo is None:
+            return False
+        else:
+            new_todo = delta(old_todo)
+            self._todos[id_] = new_todo
+            return True
+
+    def _add_all(self, todos: Sequence[Todo]) -> None:
+        self._todos.update((todo.id, todo) for todo in todos)
+
+    def _clean(self) -> None:
+        super()._clean()
+        self._todos = {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    print("{:<10} {:<8} {:<10} {:>10} {:>10}".format("size", "impl", "operation", "p50", "p99"))
+    for size in args.sizes:
+        for name, factory in (("dict", DictRepository), ("sorted", InMemoryRepository)):
+            repository = factory()
+            populate(repository, size)
+            ids = [todo.id for todo in repository.list_page(after=None, limit=size)]
+            operations = {
+                "stats": repository.stats,
+                "list": repository.list,
+                "list_page": lambda: repository.list_page(after=random.choice(ids), limit=100),
+                "get": lambda: repository.get(random.choice(ids)),
+                "deactivate": lambda: repository.deactivate(random.choice(ids)),
+                "insert": lambda: repository.insert("Hello"),
+            }
+            for operation, f in operations.items():
+                result = percentiles(measure(f, args.repetitions))
+                print(
+                    "{:<10} {:<8} {:<10} {:>10} {:>10}".format(
+                        size, name, operation, format_seconds(result["p50"]), format_seconds(result["p99"])
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
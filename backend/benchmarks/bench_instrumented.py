@@ -0,0 +1,67 @@
+"""
+Per-call overhead of `InstrumentedRepository` over the raw `InMemoryRepository`.
+
+Exits with an error if the overhead exceeds the cap, so it can guard against regressions.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_instrumented --calls 200000 --max-overhead 10e-6
+```
+"""
+import argparse
+import sys
+import time
+from uuid import uuid4
+
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.memory import InMemoryRepository
+from benchmarks.common import format_seconds
+
+
+def per_call(f, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        f()
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--max-overhead", type=float, default=10e-6, help="seconds per call")
+    args = parser.parse_args()
+
+    raw = InMemoryRepository()
+    instrumented = InstrumentedRepository(raw)
+    id_ = raw.insert("This is a Todo!")
+    missing_id = uuid4()
+    operations = {
+        "get": (lambda: raw.get(id_), lambda: instrumented.get(id_)),
+        "stats": (raw.stats, instrumented.stats),
+        "activate": (lambda: raw.activate(missing_id), lambda: instrumented.activate(missing_id)),
+    }
+
+    failed = False
+    print("{:<10} {:>10} {:>14} {:>10}".format("operation", "raw", "instrumented", "overhead"))
+    for operation, (raw_f, instrumented_f) in operations.items():
+        # best of several rounds, to filter out noise from the rest of the system
+        raw_time = min(per_call(raw_f, args.calls) for _ in range(args.rounds))
+        instrumented_time = min(per_call(instrumented_f, args.calls) for _ in range(args.rounds))
+        overhead = instrumented_time - raw_time
+        failed |= overhead > args.max_overhead
+        print(
+            "{:<10} {:>10} {:>14} {:>10}".format(
+                operation,
+                format_seconds(raw_time),
+                format_seconds(instrumented_time),
+                format_seconds(overhead),
+            )
+        )
+
+    if failed:
+        print("Overhead above {}".format(format_seconds(args.max_overhead)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Serialization throughput of the list of Todos.
+
+Compares the previous path (`_asdict` for every Todo, then Flask's `jsonify`)
+with the encoders of `app.apis.encoders`, with and without the cache of encoded Todos.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_json --size 100000
+```
+"""
+import argparse
+from uuid import uuid1
+
+from flask import Flask, jsonify
+
+from app.apis.encoders import StdlibTodoEncoder, OrjsonTodoEncoder
+from app.models.todo import Todo
+from benchmarks.common import measure, percentiles, format_seconds, format_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=10 ** 5)
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    todos = tuple(
+        Todo(id=uuid1(), text="Todo #{}".format(i), active=i % 3 != 0) for i in range(args.size)
+    )
+    app = Flask(__name__)
+    cached = OrjsonTodoEncoder(cache_size=args.size)
+    cached.todos(todos)
+    encoders = {
+        "jsonify": lambda: jsonify([todo._asdict() for todo in todos]).get_data(),
+        "stdlib": lambda: StdlibTodoEncoder().todos(todos),
+        "orjson": lambda: OrjsonTodoEncoder().todos(todos),
+        "orjson+cache": lambda: cached.todos(todos),
+    }
+
+    print(
+        "{:<14} {:>10} {:>10} {:>14} {:>10}".format("encoder", "p50", "p99", "todos/s", "size")
+    )
+    with app.app_context():
+        for name, encode in encoders.items():
+            result = percentiles(measure(encode, args.repetitions))
+            print(
+                "{:<14} {:>10} {:>10} {:>14,.0f} {:>10}".format(
+                    name,
+                    format_seconds(result["p50"]),
+                    format_seconds(result["p99"]),
+                    args.size / result["p50"],
+                    format_bytes(len(encode())),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
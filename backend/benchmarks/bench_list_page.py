@@ -0,0 +1,80 @@
+"""
+Compare `GET /todos/` returning the whole table against keyset-paginated pages.
+
+Each mode runs in a fresh process, so that the peak RSS reflects only that mode.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_list_page --size 200000
+```
+"""
+import argparse
+import random
+
+from flask import Flask
+
+from app.apis.todo import make_todos_blueprint
+from benchmarks.common import (
+    BACKENDS,
+    make_repository,
+    populate,
+    measure,
+    percentiles,
+    peak_rss_bytes,
+    run_isolated,
+    format_seconds,
+    format_bytes,
+)
+
+
+def run(backend: str, size: int, mode: str, requests: int, limit: int) -> dict:
+    repository = make_repository(backend)
+    populate(repository, size)
+    ids = [todo.id for todo in repository.list_page(after=None, limit=size)]
+
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(repository))
+    client = app.test_client()
+    baseline_rss = peak_rss_bytes()
+
+    if mode == "full":
+        request = lambda: client.get("/todos/")
+    else:
+        request = lambda: client.get(
+            "/todos/?limit={}&after={}".format(limit, random.choice(ids))
+        )
+    samples = measure(lambda: _check(request()), requests)
+
+    result = percentiles(samples)
+    result["rss"] = peak_rss_bytes() - baseline_rss
+    return result
+
+
+def _check(response) -> None:
+    assert response.status_code == 200, response.status_code
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=BACKENDS, default="in_memory")
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    print("backend={} size={} limit={}".format(args.backend, args.size, args.limit))
+    print("{:<6} {:>10} {:>10} {:>10} {:>12}".format("mode", "p50", "p90", "p99", "peak RSS +"))
+    for mode in ("full", "page"):
+        result = run_isolated(run, args.backend, args.size, mode, args.requests, args.limit)
+        print(
+            "{:<6} {:>10} {:>10} {:>10} {:>12}".format(
+                mode,
+                format_seconds(result["p50"]),
+                format_seconds(result["p90"]),
+                format_seconds(result["p99"]),
+                format_bytes(result["rss"]),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Memory footprint of the in-memory backends, in bytes per Todo.
+
+Each backend is filled in a fresh interpreter. The retained size is measured with `tracemalloc`,
+after the IDs returned by the inserts are dropped, and the growth of the peak RSS is reported alongside.
+The latencies of `get` and `list` show what the compact layout costs on reads.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_memory --sizes 1000000
+```
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Dict
+
+from benchmarks.common import (
+    make_repository,
+    populate,
+    measure,
+    percentiles,
+    peak_rss_bytes,
+    run_isolated,
+    format_seconds,
+    format_bytes,
+)
+
+BACKENDS = ("in_memory", "compact_in_memory")
+
+
+def footprint(backend: str, size: int) -> Dict[str, float]:
+    """
+    :param backend: Backend to fill.
+    :param size: Number of Todos to insert.
+    :return: Retained bytes, peak RSS growth and read latencies.
+    """
+    gc.collect()
+    rss_before = peak_rss_bytes()
+    tracemalloc.start()
+    repository = make_repository(backend)
+    sample = random.Random(42).sample(populate(repository, size), min(size, 1000))
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss = peak_rss_bytes() - rss_before
+
+    get = percentiles([t / len(sample) for t in measure(lambda: [repository.get(id_) for id_ in sample], 5)])
+    list_ = percentiles(measure(repository.list, 3))
+    return {"retained": retained, "rss": rss, "get": get["p50"], "list": list_["p50"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 6])
+    args = parser.parse_args()
+
+    print(
+        "{:<10} {:<18} {:>12} {:>10} {:>10} {:>10} {:>10}".format(
+            "size", "backend", "retained", "bytes/todo", "rss", "get", "list"
+        )
+    )
+    for size in args.sizes:
+        for backend in BACKENDS:
+            result = run_isolated(footprint, backend, size)
+            print(
+                "{:<10} {:<18} {:>12} {:>10.1f} {:>10} {:>10} {:>10}".format(
+                    size,
+                    backend,
+                    format_bytes(result["retained"]),
+                    result["retained"] / size,
+                    format_bytes(result["rss"]),
+                    format_seconds(result["get"]),
+                    format_seconds(result["list"]),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
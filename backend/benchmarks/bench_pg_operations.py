@@ -0,0 +1,91 @@
+"""
+Per-operation latency of `PostgreSQLRepository`, against the previous query path.
+
+The previous path sent the full query text on every call and wrapped every statement,
+reads included, in an explicit transaction (BEGIN and COMMIT round trips).
+The current path runs statements prepared once per connection, in autocommit mode.
+Operations with injected delays (`list`, `insert`, `deactivate`) are left out.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_pg_operations --size 10000 --repetitions 2000
+```
+"""
+import argparse
+import random
+from uuid import uuid4
+
+from app.repository.postgresql import PostgreSQLRepository
+from benchmarks.common import make_repository, populate, measure, percentiles, format_seconds
+
+
+# noinspection PyProtectedMember
+def legacy(repository: PostgreSQLRepository, query: str, params=None, fetch: bool = True):
+    with repository._connection() as conn:
+        conn.autocommit = False
+        try:
+            with conn:
+                with conn.cursor() as curs:
+                    curs.execute(query, params)
+                    return curs.fetchall() if fetch else curs.rowcount
+        finally:
+            conn.autocommit = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repetitions", type=int, default=2000)
+    args = parser.parse_args()
+
+    repository = make_repository("postgresql")
+    sql = PostgreSQLRepository.SQL
+    try:
+        populate(repository, args.size)
+        ids = [todo.id for todo in repository.list_page(after=None, limit=args.size)]
+        operations = {
+            "get": (
+                lambda: legacy(repository, sql.GET, {"id": random.choice(ids)}),
+                lambda: repository.get(random.choice(ids)),
+            ),
+            "list_page": (
+                lambda: legacy(repository, sql.LIST_PAGE, {"after": random.choice(ids), "limit": 100}),
+                lambda: repository.list_page(after=random.choice(ids), limit=100),
+            ),
+            "stats": (
+                lambda: legacy(repository, sql.STATS),
+                repository.stats,
+            ),
+            "edit_text": (
+                lambda: legacy(repository, sql.EDIT_TEXT, {"id": random.choice(ids), "text": "A"}, fetch=False),
+                lambda: repository.edit_text(random.choice(ids), "A"),
+            ),
+            "activate": (
+                lambda: legacy(repository, sql.ACTIVATE, {"id": random.choice(ids)}, fetch=False),
+                lambda: repository.activate(random.choice(ids)),
+            ),
+            "delete": (
+                lambda: legacy(repository, sql.DELETE, {"id": uuid4()}, fetch=False),
+                lambda: repository.delete(uuid4()),
+            ),
+        }
+
+        print("{:<10} {:>12} {:>12} {:>12} {:>12}".format("operation", "before p50", "before p99", "after p50", "after p99"))
+        for operation, (before, after) in operations.items():
+            before_result = percentiles(measure(before, args.repetitions))
+            after_result = percentiles(measure(after, args.repetitions))
+            print(
+                "{:<10} {:>12} {:>12} {:>12} {:>12}".format(
+                    operation,
+                    format_seconds(before_result["p50"]),
+                    format_seconds(before_result["p99"]),
+                    format_seconds(after_result["p50"]),
+                    format_seconds(after_result["p99"]),
+                )
+            )
+    finally:
+        repository._clean()
+        repository.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Latency of `PostgreSQLRepository.stats` as the table grows.
+
+Compares the trigger-maintained counters read by `stats` against
+the full `GROUP BY` count that `stats` used to run (and `reconcile_stats` still runs).
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_pg_stats --sizes 1000 10000 100000 1000000
+```
+"""
+import argparse
+
+from benchmarks.common import make_repository, populate, measure, percentiles, format_seconds
+
+FULL_COUNT = """
+    SELECT active, count(*)
+    FROM todos
+    GROUP BY active;
+"""
+
+
+# noinspection PyProtectedMember
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repetitions", type=int, default=50)
+    args = parser.parse_args()
+
+    repository = make_repository("postgresql")
+
+    def full_count():
+        with repository._cursor() as curs:
+            curs.execute(FULL_COUNT)
+            curs.fetchall()
+
+    print("{:<10} {:<12} {:>10} {:>10}".format("size", "query", "p50", "p99"))
+    try:
+        total = 0
+        for size in args.sizes:
+            populate(repository, size - total)
+            total = size
+            for name, f in (("counters", repository.stats), ("full count", full_count)):
+                result = percentiles(measure(f, args.repetitions))
+                print(
+                    "{:<10} {:<12} {:>10} {:>10}".format(
+                        size, name, format_seconds(result["p50"]), format_seconds(result["p99"])
+                    )
+                )
+    finally:
+        repository._clean()
+        repository.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Overhead of the stack sampler behind `/profile` on the throughput and latency of the Flask application.
+
+Threads send `GET /todos/?limit=100` through the Flask test client in a loop, first with the sampler idle,
+then while it samples every thread of the process in each mode and at each frequency. The `stacks` column is
+the number of stacks sampled.
+The repository is `InstrumentedRepository` over the chosen backend, as in production; injected delays are disabled.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_profiler --backend in_memory --threads 8 --frequencies 100 1000
+```
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask
+
+from app.apis.todo import make_todos_blueprint
+from app.metrics.profiler import StackSampler, CPU_MODE_SUPPORTED
+from app.repository.instrumented import InstrumentedRepository
+from app.utils.delay import INJECTOR
+from benchmarks.common import BACKENDS, make_repository, populate, percentiles, format_seconds
+
+
+def run(app: Flask, threads: int, duration: float, sampler: Optional[StackSampler], mode: str, frequency: int):
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    stacks: Dict[str, int] = {}
+
+    def request(index: int) -> None:
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get("/todos/?limit=100")
+            latencies[index].append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+
+    def profile() -> None:
+        stacks.update(sampler.sample(duration, frequency, mode))
+
+    workers = [threading.Thread(target=request, args=(index,)) for index in range(threads)]
+    if sampler is not None:
+        workers.append(threading.Thread(target=profile))
+    deadline = time.perf_counter() + duration
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    samples = [latency for thread in latencies for latency in thread]
+    return {"requests": len(samples) / duration, "samples": sum(stacks.values()), **percentiles(samples, (0.5, 0.99))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backend", choices=BACKENDS, default="in_memory")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--frequencies", type=int, nargs="+", default=[100, 1000])
+    args = parser.parse_args()
+
+    INJECTOR.configure("none")
+    repository = make_repository(args.backend)
+    populate(repository, args.size)
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(InstrumentedRepository(repository)))
+    modes = ("wall", "cpu") if CPU_MODE_SUPPORTED else ("wall",)
+    configurations = [("idle", 0)] + [(mode, frequency) for mode in modes for frequency in args.frequencies]
+
+    print("backend={} threads={} size={}".format(args.backend, args.threads, args.size))
+    print(
+        "{:<6} {:>6} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "mode", "hz", "req/s", "overhead", "p50", "p99", "stacks"
+        )
+    )
+    # warms up the application, so that the first configuration is not penalized
+    run(app, args.threads, 1.0, None, "wall", 0)
+    baseline = None
+    for mode, frequency in configurations:
+        sampler = StackSampler() if frequency else None
+        result = run(app, args.threads, args.duration, sampler, mode, frequency)
+        baseline = baseline or result["requests"]
+        print(
+            "{:<6} {:>6} {:>10,.0f} {:>9.1f}% {:>10} {:>10} {:>10,}".format(
+                mode,
+                frequency or "-",
+                result["requests"],
+                100 * (1 - result["requests"] / baseline),
+                format_seconds(result["p50"]),
+                format_seconds(result["p99"]),
+                result["samples"],
+            )
+        )
+    repository._clean()
+
+
+if __name__ == "__main__":
+    main()
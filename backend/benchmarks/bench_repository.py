@@ -0,0 +1,121 @@
+"""
+Throughput and latency percentiles of every `Repository` method, for every backend
+of the correctness tests, at several sizes and thread counts.
+
+Results are written as JSON; when a baseline is given, operations that got slower
+than the tolerance allows make the benchmark fail.
+PostgreSQL runs on a throwaway instance unless `POSTGRESQL_CONNECTION_URL` is set,
+and no synthetic delay is injected unless `--delay-profile` says otherwise.
+Usage:
+```
+    PYTHONPATH=. python -m pytest benchmarks/bench_repository.py --sizes 1000 100000 1000000 --threads 1 4 16
+    cp benchmark-results.json benchmark-baseline.json
+    PYTHONPATH=. python -m pytest benchmarks/bench_repository.py --benchmark-baseline benchmark-baseline.json
+```
+"""
+import random
+import threading
+import time
+from typing import Callable, List, Any, Dict
+
+import pytest
+
+from app.repository.base import Repository
+from benchmarks.common import populate, percentiles
+
+BATCH_SIZE = 100
+# backends driven by an event loop, which can only run in one thread at a time
+SINGLE_THREADED = {"async_in_memory", "async_postgresql"}
+# backends whose writes are safe to run from several threads at once
+THREAD_SAFE_WRITES = {"postgresql", "durable_in_memory", "concurrent_in_memory"}
+READS = ("stats", "get", "list", "list_page")
+
+
+def _operations(repository: Repository, ids: List) -> Dict[str, Callable[[random.Random], Any]]:
+    """
+    Build one call of every Repository method, in the order they are measured.
+    Deletes come last and each consume half of `ids`, so that every call deletes existing Todos;
+    they raise IndexError once their half is exhausted.
+    """
+    to_delete, to_delete_many = ids[: len(ids) // 2], ids[len(ids) // 2 :]
+
+    def pop_many() -> List:
+        if not to_delete_many:
+            raise IndexError("no Todo left to delete")
+        return [to_delete_many.pop() for _ in range(min(BATCH_SIZE, len(to_delete_many)))]
+
+    return {
+        "stats": lambda rnd: repository.stats(),
+        "get": lambda rnd: repository.get(rnd.choice(ids)),
+        "list": lambda rnd: repository.list(),
+        "list_page": lambda rnd: repository.list_page(after=rnd.choice(ids), limit=BATCH_SIZE),
+        "insert": lambda rnd: repository.insert("Benchmark"),
+        "edit_text": lambda rnd: repository.edit_text(rnd.choice(ids), "Edited"),
+        "activate": lambda rnd: repository.activate(rnd.choice(ids)),
+        "deactivate": lambda rnd: repository.deactivate(rnd.choice(ids)),
+        "insert_many": lambda rnd: repository.insert_many(["Benchmark"] * BATCH_SIZE),
+        "set_active_many": lambda rnd: repository.set_active_many(
+            rnd.sample(ids, min(BATCH_SIZE, len(ids))), active=False
+        ),
+        "delete": lambda rnd: repository.delete(to_delete.pop()),
+        "delete_many": lambda rnd: repository.delete_many(pop_many()),
+    }
+
+
+def _run(f: Callable[[random.Random], Any], threads: int, duration: float) -> Dict[str, float]:
+    """
+    Call an operation from several threads until the duration elapses or no Todo is left.
+    :return: Number of calls, throughput in calls per second and latency percentiles in seconds.
+    """
+    samples: List[List[float]] = [[] for _ in range(threads)]
+
+    def worker(index: int) -> None:
+        rnd = random.Random(index)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                f(rnd)
+            except IndexError:
+                # no Todo left
+                break
+            samples[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    deadline = start + duration
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [sample for thread_samples in samples for sample in thread_samples]
+    result = {"calls": len(latencies), "throughput": len(latencies) / elapsed}
+    if latencies:
+        result.update(percentiles(latencies))
+    return result
+
+
+def test_repository(request, repository: Repository, size: int, benchmark_results) -> None:
+    backend = request.node.callspec.params["repository"]
+    ids = list(populate(repository, size))
+    random.Random(0).shuffle(ids)
+
+    regressions = []
+    for operation, f in _operations(repository, ids).items():
+        for threads in request.config.getoption("threads"):
+            if threads > 1 and (
+                backend in SINGLE_THREADED or (operation not in READS and backend not in THREAD_SAFE_WRITES)
+            ):
+                continue
+            result = _run(f, threads, request.config.getoption("duration"))
+            if not result["calls"]:
+                continue
+            record = {"backend": backend, "size": size, "threads": threads, "operation": operation}
+            record.update(result)
+            regression = benchmark_results.add(record)
+            if regression is not None:
+                regressions.append(regression)
+
+    if regressions:
+        pytest.fail("Regressions against the baseline:\n" + "\n".join(regressions), pytrace=False)
@@ -0,0 +1,70 @@
+"""
+Restart time of `DurableInMemoryRepository`.
+
+The repository is filled and closed in one interpreter, then reopened in a fresh one:
+from the log only, from a snapshot only, and from a snapshot followed by a tail of edits.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_restart --size 1000000 --tail 10000
+```
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict
+
+from app.repository.durable import DurableInMemoryRepository
+from benchmarks.common import populate, peak_rss_bytes, run_isolated, format_seconds, format_bytes
+
+SCENARIOS = ("log", "snapshot", "snapshot+tail")
+
+
+def prepare(directory: str, scenario: str, size: int, tail: int) -> None:
+    repository = DurableInMemoryRepository(directory, sync_every=0, snapshot_every=0)
+    repository.connect()
+    ids = populate(repository, size)
+    if scenario != "log":
+        repository.snapshot()
+    if scenario == "snapshot+tail":
+        for id_ in ids[:tail]:
+            repository.edit_text(id_, "Edited")
+    repository.disconnect()
+
+
+def restart(directory: str) -> Dict[str, float]:
+    rss_before = peak_rss_bytes()
+    start = time.perf_counter()
+    repository = DurableInMemoryRepository(directory)
+    repository.connect()
+    elapsed = time.perf_counter() - start
+    size = len(repository.list())
+    repository.disconnect()
+    return {"elapsed": elapsed, "size": size, "rss": peak_rss_bytes() - rss_before}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=10 ** 6)
+    parser.add_argument("--tail", type=int, default=10 ** 4, help="Number of edits after the snapshot.")
+    args = parser.parse_args()
+
+    print("{:<16} {:>10} {:>10} {:>10} {:>10}".format("scenario", "todos", "on disk", "restart", "rss"))
+    for scenario in SCENARIOS:
+        with tempfile.TemporaryDirectory() as directory:
+            run_isolated(prepare, directory, scenario, args.size, args.tail)
+            on_disk = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            result = run_isolated(restart, directory)
+            print(
+                "{:<16} {:>10} {:>10} {:>10} {:>10}".format(
+                    scenario,
+                    result["size"],
+                    format_bytes(on_disk),
+                    format_seconds(result["elapsed"]),
+                    format_bytes(result["rss"]),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Latency of `search` on every backend, against a scan of all Todos.
+
+`in_memory` uses its secondary indexes, `compact_in_memory` scans its rows, and `postgresql` uses
+its partial and trigram indexes (when `pg_trgm` is available). `scan` filters the result of `list`,
+as a client without server-side filters has to. Each search is a page of 100 Todos after a random ID,
+except the rare text, which matches a single Todo.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_search --sizes 100000 1000000
+```
+"""
+import argparse
+import random
+import time
+from itertools import islice
+from typing import Optional, Tuple
+from uuid import UUID
+
+from app.models.todo import Todo
+from app.repository.base import filter_todos
+from app.repository.memory import InMemoryRepository
+from app.utils.delay import INJECTOR
+from benchmarks.common import BACKENDS, make_repository, populate, measure, percentiles, format_seconds
+
+
+class ScanRepository(InMemoryRepository):
+    """
+    Reference implementation: filter all Todos.
+    """
+
+    def search(
+        self,
+        active: Optional[bool] = None,
+        text: Optional[str] = None,
+        after: Optional[UUID] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[Todo, ...]:
+        todos = filter_todos(self.list(), active, text)
+        return tuple(islice((todo for todo in todos if after is None or todo.id > after), limit))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 5, 10 ** 6])
+    parser.add_argument("--backends", nargs="+", default=["scan", *BACKENDS])
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    INJECTOR.configure("none")
+    print("{:<10} {:<18} {:<14} {:>10} {:>10}".format("size", "backend", "search", "p50", "p99"))
+    for size in args.sizes:
+        for backend in args.backends:
+            repository = ScanRepository() if backend == "scan" else make_repository(backend)
+            ids = populate(repository, size)
+            start = time.perf_counter()
+            repository.search(text="#{}".format(size // 2), limit=1)
+            first = time.perf_counter() - start
+            searches = {
+                "inactive": lambda: repository.search(active=False, after=random.choice(ids), limit=100),
+                "rare text": lambda: repository.search(text="#{}".format(random.randrange(size // 10, size))),
+                "common text": lambda: repository.search(text="odo #1", after=random.choice(ids), limit=100),
+                "short text": lambda: repository.search(text="7", after=random.choice(ids), limit=100),
+            }
+            print(
+                "{:<10} {:<18} {:<14} {:>10} {:>10}".format(size, backend, "first text", format_seconds(first), "")
+            )
+            for name, f in searches.items():
+                result = percentiles(measure(f, args.repetitions))
+                print(
+                    "{:<10} {:<18} {:<14} {:>10} {:>10}".format(
+                        size, backend, name, format_seconds(result["p50"]), format_seconds(result["p99"])
+                    )
+                )
+            repository._clean()
+            if backend == "postgresql":
+                repository.disconnect()
+
+
+if __name__ == "__main__":
+    main()
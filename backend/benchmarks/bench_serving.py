@@ -0,0 +1,137 @@
+"""
+Load-test the threaded Flask serving path against the asyncio (aiohttp) one.
+
+Both servers use an in-memory repository whose `get` is slowed down by a fixed delay,
+to simulate a database query: the threaded server pins a thread per in-flight request,
+the asyncio server awaits the delay on a single event loop.
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_serving --concurrency 10 100 1000 --delay 0.05
+```
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import socket
+import time
+from typing import List, Tuple
+
+import aiohttp
+
+from benchmarks.common import percentiles, format_seconds
+
+MODES = ("threaded", "async")
+
+
+def serve(mode: str, port: int, delay: float) -> None:
+    from app.utils.delay import Delay, DelayInjector, inject_delay
+
+    injector = DelayInjector({"fixed": {"memory.get": Delay(delay, delay)}}, profile="fixed")
+
+    if mode == "threaded":
+        from flask import Flask
+        from app.apis.todo import make_todos_blueprint
+        from app.repository.memory import InMemoryRepository
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        repository = InMemoryRepository()
+        repository.get = inject_delay("memory.get", injector=injector)(repository.get)
+        app = Flask(__name__)
+        app.register_blueprint(make_todos_blueprint(repository))
+        app.run(host="127.0.0.1", port=port, threaded=True)
+    else:
+        from aiohttp import web
+        from app.apis.todo_async import make_async_todos_app
+        from app.repository.aio.memory import AsyncInMemoryRepository
+
+        repository = AsyncInMemoryRepository()
+        repository.get = inject_delay("memory.get", injector=injector)(repository.get)
+        app = web.Application()
+        app.add_subapp("/todos", make_async_todos_app(repository))
+        web.run_app(app, host="127.0.0.1", port=port, print=None, backlog=4096)
+
+
+async def load(port: int, concurrency: int, requests: int) -> Tuple[List[float], int, float]:
+    url = "http://127.0.0.1:{}/todos/".format(port)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async with session.post(url, json={"text": "Benchmark"}) as response:
+            id_ = (await response.json())["id"]
+
+        latencies = []
+        errors = 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.get(url + id_) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int) -> None:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start on port {}".format(port))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print("{:<10} {:>11} {:>10} {:>10} {:>10} {:>8}".format("mode", "concurrency", "req/s", "p50", "p99", "errors"))
+    for mode in MODES:
+        port = _free_port()
+        server = context.Process(target=serve, args=(mode, port, args.delay), daemon=True)
+        server.start()
+        try:
+            _wait_for(port)
+            for concurrency in args.concurrency:
+                latencies, errors, elapsed = asyncio.run(load(port, concurrency, args.requests))
+                result = percentiles(latencies)
+                print(
+                    "{:<10} {:>11} {:>10.0f} {:>10} {:>10} {:>8}".format(
+                        mode,
+                        concurrency,
+                        args.requests / elapsed,
+                        format_seconds(result["p50"]),
+                        format_seconds(result["p99"]),
+                        errors,
+                    )
+                )
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
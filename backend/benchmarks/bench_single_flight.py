@@ -0,0 +1,96 @@
+"""
+Load on PostgreSQL and latency of a burst of concurrent `list` calls, with and without `SingleFlightRepository`.
+
+Every thread calls `list` in a loop over the same table; `InstrumentedRepository` sits below the single-flight
+decorator, so that its `list` count is the number of queries that actually reached PostgreSQL.
+Injected delays are disabled, unless `--delay-profile` selects one (e.g., `workshop`, for the slow `list`).
+Usage:
+```
+    PYTHONPATH=. python -m benchmarks.bench_single_flight --threads 1 8 32 --size 10000
+```
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+from prometheus_client import REGISTRY
+
+from app.repository.base import Repository
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.postgresql import PostgreSQLRepository
+from app.repository.single_flight import SingleFlightRepository
+from app.utils.delay import INJECTOR
+from benchmarks.common import populate, percentiles, format_seconds
+
+
+def run(repository: Repository, threads: int, duration: float) -> Dict[str, float]:
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    queries_before = _queries()
+
+    def read(index: int) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            repository.list()
+            latencies[index].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=read, args=(index,)) for index in range(threads)]
+    deadline = time.perf_counter() + duration
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    samples = [latency for thread in latencies for latency in thread]
+    return {
+        "calls": len(samples) / duration,
+        "queries": (_queries() - queries_before) / duration,
+        **percentiles(samples, (0.5, 0.99)),
+    }
+
+
+def _queries() -> float:
+    return REGISTRY.get_sample_value("app_repository_query_duration_seconds_count", {"query": "list"}) or 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--delay-profile", default="none")
+    args = parser.parse_args()
+
+    INJECTOR.configure(args.delay_profile)
+    backend = PostgreSQLRepository(
+        connection_url=PostgreSQLRepository.factory()._connection_url, max_connections=max(args.threads)
+    )
+    backend.connect()
+    backend.initialize()
+    backend._clean()
+    populate(backend, args.size)
+    instrumented = InstrumentedRepository(backend)
+    configurations = {"none": instrumented, "single flight": SingleFlightRepository(instrumented)}
+
+    print(
+        "{:<14} {:>8} {:>10} {:>10} {:>10} {:>10}".format("coalescing", "threads", "calls/s", "queries/s", "p50", "p99")
+    )
+    for name, repository in configurations.items():
+        for threads in args.threads:
+            result = run(repository, threads, args.duration)
+            print(
+                "{:<14} {:>8} {:>10,.0f} {:>10,.0f} {:>10} {:>10}".format(
+                    name,
+                    threads,
+                    result["calls"],
+                    result["queries"],
+                    format_seconds(result["p50"]),
+                    format_seconds(result["p99"]),
+                )
+            )
+    backend._clean()
+    backend.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import multiprocessing
+import resource
+import time
+from typing import Callable, List, Sequence, Dict, Any, Tuple
+from uuid import UUID
+
+from app.repository.base import Repository
+from app.repository.compact import CompactInMemoryRepository
+from app.repository.memory import InMemoryRepository
+from app.repository.postgresql import PostgreSQLRepository
+
+BACKENDS = ("in_memory", "compact_in_memory", "postgresql")
+
+
+def make_repository(backend: str) -> Repository:
+    """
+    Create a ready-to-use, empty repository for the given backend.
+    :param backend: One of `BACKENDS`.
+    :return: Empty repository.
+    """
+    if backend == "in_memory":
+        repository = InMemoryRepository()
+    elif backend == "compact_in_memory":
+        repository = CompactInMemoryRepository()
+    elif backend == "postgresql":
+        repository = PostgreSQLRepository.factory()
+        repository.connect()
+        repository.initialize()
+    else:
+        raise ValueError("Invalid backend: {}".format(backend))
+    repository._clean()
+    return repository
+
+
+# noinspection PyProtectedMember
+def populate(repository: Repository, size: int, chunk_size: int = 10000) -> Tuple[UUID, ...]:
+    """
+    Fill a repository with `size` Todos as fast as the backend allows; one in three is inactive.
+    :param repository: Repository to fill.
+    :param size: Number of Todos to insert.
+    :param chunk_size: Number of Todos inserted per batch, when the backend has no faster path.
+    :return: IDs of the inserted Todos.
+    """
+    if isinstance(repository, PostgreSQLRepository):
+        with repository._cursor() as curs:
+            curs.execute(
+                """
+                INSERT INTO todos(text, active)
+                SELECT 'Todo #' || i, i %% 3 <> 0
+                FROM generate_series(1, %(size)s) AS i
+                RETURNING id;
+                """,
+                {"size": size},
+            )
+            return tuple(row[0] for row in curs.fetchall())
+
+    ids: List[UUID] = []
+    for start in range(0, size, chunk_size):
+        texts = ["Todo #{}".format(i) for i in range(start, min(size, start + chunk_size))]
+        ids.extend(repository.insert_many(texts))
+    repository.set_active_many(ids[::3], active=False)
+    return tuple(ids)
+
+
+def measure(f: Callable[[], Any], repetitions: int) -> List[float]:
+    """
+    Call a function several times and collect its latencies.
+    :param f: Function to measure.
+    :param repetitions: Number of calls.
+    :return: Latencies in seconds.
+    """
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        f()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentiles(
+    samples: Sequence[float], quantiles: Sequence[float] = (0.5, 0.9, 0.99)
+) -> Dict[str, float]:
+    """
+    Compute latency percentiles using the nearest-rank method.
+    :param samples: Latencies in seconds.
+    :param quantiles: Quantiles to compute, between 0 and 1.
+    :return: Mapping from percentile name (e.g. `p99`) to latency in seconds.
+    """
+    ordered = sorted(samples)
+    result = {}
+    for q in quantiles:
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+        result["p{:g}".format(q * 100)] = ordered[index]
+    return result
+
+
+def peak_rss_bytes() -> int:
+    """
+    :return: Peak resident set size of the current process, in bytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_isolated(f: Callable[..., Any], *args) -> Any:
+    """
+    Run a function in a fresh interpreter, so that peak RSS is not polluted by other runs.
+    :param f: Top-level (picklable) function to run.
+    :param args: Arguments for the function.
+    :return: Value returned by the function.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=1) as pool:
+        return pool.apply(f, args)
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return "{:.2f}s".format(seconds)
+    if seconds >= 1e-3:
+        return "{:.2f}ms".format(seconds * 1e3)
+    return "{:.2f}us".format(seconds * 1e6)
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return "{:.1f}{}".format(size, unit)
+        size /= 1024
+    return "{:.1f}GiB".format(size)
@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import pytest
+
+from app.utils.delay import INJECTOR
+from benchmarks.common import format_seconds
+
+# reuse the repositories and the parametrization of the correctness tests
+from tests.conftest import (
+    pytest_generate_tests as _parametrize_repository,
+    in_memory_repository,
+    postgresql_repository,
+    durable_repository,
+    event_loop,
+    async_postgresql_repository,
+    repository,
+)
+
+Key = Tuple[str, int, int, str]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10 ** 3, 10 ** 5, 10 ** 6],
+        help="Number of Todos in the repository.",
+    )
+    group.addoption(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Number of threads calling the repository concurrently.",
+    )
+    group.addoption(
+        "--duration",
+        type=float,
+        default=1.0,
+        help="Time spent measuring each operation, in seconds.",
+    )
+    group.addoption(
+        "--delay-profile",
+        default="none",
+        help="Profile of the delays injected in the repositories.",
+    )
+    group.addoption(
+        "--benchmark-json",
+        type=Path,
+        default=Path("benchmark-results.json"),
+        help="File to write the results to.",
+    )
+    group.addoption(
+        "--benchmark-baseline",
+        type=Path,
+        default=None,
+        help="Results of a previous run to compare against.",
+    )
+    group.addoption(
+        "--benchmark-tolerance",
+        type=float,
+        default=0.25,
+        help="Relative slowdown against the baseline reported as a regression.",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    _parametrize_repository(metafunc)
+    if "size" in metafunc.fixturenames:
+        metafunc.parametrize("size", metafunc.config.getoption("sizes"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def postgresql_connection_url(tmp_path_factory):
+    """
+    Use `POSTGRESQL_CONNECTION_URL` if set, otherwise a throwaway PostgreSQL instance
+    created with `initdb` and `pg_ctl`, found on `PATH` or in `POSTGRESQL_BIN_DIR`.
+    """
+    if os.environ.get("POSTGRESQL_CONNECTION_URL"):
+        yield os.environ["POSTGRESQL_CONNECTION_URL"]
+        return
+
+    path = os.environ.get("POSTGRESQL_BIN_DIR")
+    initdb, pg_ctl = shutil.which("initdb", path=path), shutil.which("pg_ctl", path=path)
+    if initdb is None or pg_ctl is None:
+        raise pytest.UsageError(
+            "Set POSTGRESQL_CONNECTION_URL, or put initdb and pg_ctl on PATH or in POSTGRESQL_BIN_DIR"
+        )
+
+    root = tmp_path_factory.mktemp("postgresql")
+    data = str(root / "data")
+    subprocess.run(
+        [initdb, "-D", data, "-U", "postgres", "--auth=trust", "-E", "UTF8"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    subprocess.run(
+        [
+            pg_ctl,
+            "start",
+            "-w",
+            "-D",
+            data,
+            "-l",
+            str(root / "postgresql.log"),
+            "-o",
+            "-c listen_addresses='' -k {}".format(root),
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    url = "postgresql://postgres:@/postgres?host={}".format(root)
+    os.environ["POSTGRESQL_CONNECTION_URL"] = url
+    try:
+        yield url
+    finally:
+        del os.environ["POSTGRESQL_CONNECTION_URL"]
+        subprocess.run(
+            [pg_ctl, "stop", "-w", "-m", "fast", "-D", data], check=True, stdout=subprocess.DEVNULL
+        )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def delay_profile(request):
+    profile = INJECTOR.profile
+    INJECTOR.configure(request.config.getoption("delay_profile"))
+    yield
+    INJECTOR.configure(profile)
+
+
+class BenchmarkResults:
+    """
+    Collect the results of a run and compare them against a baseline.
+    """
+
+    def __init__(self, baseline: List[Dict[str, Any]], tolerance: float):
+        self.records: List[Dict[str, Any]] = []
+        self._baseline: Dict[Key, Dict[str, Any]] = {_key(record): record for record in baseline}
+        self._tolerance = tolerance
+
+    def add(self, record: Dict[str, Any]) -> Optional[str]:
+        """
+        :param record: Result of a single operation.
+        :return: Description of the regression against the baseline, if any.
+        """
+        self.records.append(record)
+        baseline = self._baseline.get(_key(record))
+        if baseline is None:
+            return None
+
+        limit = 1 + self._tolerance
+        regressions = []
+        if record["throughput"] * limit < baseline["throughput"]:
+            regressions.append(
+                "throughput {:.1f}/s < {:.1f}/s".format(record["throughput"], baseline["throughput"])
+            )
+        if record["p50"] > baseline["p50"] * limit:
+            regressions.append(
+                "p50 {} > {}".format(format_seconds(record["p50"]), format_seconds(baseline["p50"]))
+            )
+        if not regressions:
+            return None
+        return "{}[size={}, threads={}] {}: {}".format(
+            record["backend"], record["size"], record["threads"], record["operation"], ", ".join(regressions)
+        )
+
+
+def _key(record: Dict[str, Any]) -> Key:
+    return record["backend"], record["size"], record["threads"], record["operation"]
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    baseline_path = request.config.getoption("benchmark_baseline")
+    baseline = json.loads(baseline_path.read_text()) if baseline_path is not None else []
+    results = BenchmarkResults(baseline, tolerance=request.config.getoption("benchmark_tolerance"))
+    yield results
+    request.config.getoption("benchmark_json").write_text(json.dumps(results.records, indent=2))
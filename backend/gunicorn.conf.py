@@ -0,0 +1,86 @@
+"""
+Gunicorn configuration to serve `app.wsgi:app` with several pre-forked worker processes.
+Gunicorn loads it automatically when started from this folder: `gunicorn app.wsgi:app`.
+Metrics from all workers are aggregated with the multiprocess mode of the Prometheus client:
+each worker writes its samples to files in `PROMETHEUS_MULTIPROC_DIR`,
+and the master process exposes their aggregate on the Prometheus port.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+# the Prometheus client reads the directory when it is first imported,
+# so it must be set before any worker imports the application
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-backend")
+)
+os.environ["prometheus_multiproc_dir"] = multiproc_dir
+
+bind = "{}:{}".format(
+    os.environ.get("FLASK_HOST", "0.0.0.0"), os.environ.get("FLASK_PORT", 5000)
+)
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+keepalive = 5
+
+
+def on_starting(server):
+    # `PUT /admin/delay` switches the delay profile of the worker that serves it only:
+    # with several workers, the profile would depend on the worker, so switching it is disabled
+    if server.cfg.workers > 1 and os.environ.pop("ADMIN_TOKEN", None):
+        server.log.warning("ADMIN_TOKEN ignored: the delay profile cannot be switched with several workers")
+
+    # drop the samples of the previous run, they belong to dead processes
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir)
+
+    from app.repository.postgresql import PostgreSQLRepository
+
+    # create the schema once, before the workers race to use it
+    repository = PostgreSQLRepository.factory(max_connections=1)
+    repository.connect()
+    try:
+        repository.initialize()
+    finally:
+        repository.disconnect()
+
+
+def when_ready(server):
+    from prometheus_client import CollectorRegistry
+    from prometheus_client.exposition import start_http_server
+    from prometheus_client.multiprocess import MultiProcessCollector
+
+    registry = CollectorRegistry()
+    MultiProcessCollector(registry)
+    host = os.environ.get("PROMETHEUS_HOST", "0.0.0.0")
+    port = int(os.environ.get("PROMETHEUS_PORT", 6000))
+    start_http_server(port=port, addr=host, registry=registry)
+
+
+def post_worker_init(worker):
+    # the metrics server runs in the master, which serves no request: workers are profiled on their own port,
+    # shared by all of them, so each profile is taken in one worker (see `X-Profiled-Pid`)
+    token = os.environ.get("PROFILER_TOKEN")
+    if not token:
+        return
+
+    from app.metrics.profiler import start_http_server
+
+    host = os.environ.get("PROMETHEUS_HOST", "0.0.0.0")
+    port = int(os.environ.get("PROFILER_PORT", 6001))
+    start_http_server(port=port, addr=host, token=token, reuse_port=True)
+
+
+def worker_exit(server, worker):
+    wsgi = sys.modules.get("app.wsgi")
+    if wsgi is not None:
+        wsgi.repository.disconnect()
+
+
+def child_exit(server, worker):
+    from prometheus_client.multiprocess import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,172 @@
+import asyncio
+from typing import Iterator, Iterable
+
+import pytest
+
+from app.models.todo import Todo
+from app.repository.aio.base import AsyncRepository
+from app.repository.aio.memory import AsyncInMemoryRepository
+from app.repository.aio.postgresql import AsyncPostgreSQLRepository
+from app.repository.caching import CachingRepository
+from app.repository.compact import CompactInMemoryRepository
+from app.repository.concurrent import ConcurrentInMemoryRepository
+from app.repository.durable import DurableInMemoryRepository
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.memory import InMemoryRepository
+from app.repository.postgresql import PostgreSQLRepository
+from app.repository.single_flight import SingleFlightRepository
+
+
+def pytest_generate_tests(metafunc):
+    if "repository" in metafunc.fixturenames:
+        metafunc.parametrize(
+            "repository",
+            [
+                "in_memory",
+                "postgresql",
+                "group_commit_postgresql",
+                "replica_postgresql",
+                "instrumented_in_memory",
+                "caching_in_memory",
+                "single_flight_in_memory",
+                "compact_in_memory",
+                "durable_in_memory",
+                "concurrent_in_memory",
+                "async_in_memory",
+                "async_postgresql",
+            ],
+            indirect=True,
+        )
+
+
+@pytest.fixture
+def in_memory_repository():
+    yield InMemoryRepository()
+
+
+@pytest.fixture
+def postgresql_repository():
+    repository = PostgreSQLRepository.factory()
+    repository.connect()
+    repository.initialize()
+    yield repository
+    repository.disconnect()
+
+
+@pytest.fixture
+def group_commit_postgresql_repository(monkeypatch):
+    monkeypatch.setenv("POSTGRESQL_GROUP_COMMIT_OPERATIONS", "insert,activate,deactivate,delete")
+    repository = PostgreSQLRepository.factory()
+    repository.connect()
+    repository.initialize()
+    yield repository
+    repository.disconnect()
+
+
+@pytest.fixture
+def replica_postgresql_repository(monkeypatch):
+    # the primary stands in for its replica
+    monkeypatch.setenv(
+        "POSTGRESQL_REPLICA_CONNECTION_URL", PostgreSQLRepository.factory()._connection_url
+    )
+    repository = PostgreSQLRepository.factory()
+    repository.connect()
+    repository.initialize()
+    yield repository
+    repository.disconnect()
+
+
+@pytest.fixture
+def durable_repository(tmp_path):
+    repository = DurableInMemoryRepository(directory=str(tmp_path), sync_every=0)
+    repository.connect()
+    yield repository
+    repository.disconnect()
+
+
+@pytest.fixture
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def async_postgresql_repository(event_loop):
+    repository = AsyncPostgreSQLRepository.factory()
+    event_loop.run_until_complete(repository.connect())
+    event_loop.run_until_complete(repository.initialize())
+    yield repository
+    event_loop.run_until_complete(repository.disconnect())
+
+
+class SyncRepository:
+    """
+    Run each coroutine of an asynchronous repository to completion, to reuse the same tests.
+    """
+
+    def __init__(self, repository: AsyncRepository, loop: asyncio.AbstractEventLoop):
+        self._repository = repository
+        self._loop = loop
+
+    def __getattr__(self, name: str):
+        method = getattr(self._repository, name)
+        return lambda *args, **kwargs: self._loop.run_until_complete(method(*args, **kwargs))
+
+    def export_todos(self) -> Iterator[Todo]:
+        todos = self._repository.export_todos()
+        while True:
+            try:
+                yield self._loop.run_until_complete(todos.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def import_todos(self, todos: Iterable[Todo]) -> int:
+        async def iterate():
+            for todo in todos:
+                yield todo
+
+        return self._loop.run_until_complete(self._repository.import_todos(todos=iterate()))
+
+
+# noinspection PyProtectedMember
+@pytest.fixture
+def repository(
+    request,
+    in_memory_repository,
+    postgresql_repository,
+    group_commit_postgresql_repository,
+    replica_postgresql_repository,
+    durable_repository,
+    async_postgresql_repository,
+    event_loop,
+):
+    if request.param == "in_memory":
+        repository = in_memory_repository
+    elif request.param == "postgresql":
+        repository = postgresql_repository
+    elif request.param == "group_commit_postgresql":
+        repository = group_commit_postgresql_repository
+    elif request.param == "replica_postgresql":
+        repository = replica_postgresql_repository
+    elif request.param == "instrumented_in_memory":
+        repository = InstrumentedRepository(in_memory_repository)
+    elif request.param == "caching_in_memory":
+        repository = CachingRepository(in_memory_repository)
+    elif request.param == "single_flight_in_memory":
+        repository = SingleFlightRepository(in_memory_repository)
+    elif request.param == "compact_in_memory":
+        repository = CompactInMemoryRepository()
+    elif request.param == "durable_in_memory":
+        repository = durable_repository
+    elif request.param == "concurrent_in_memory":
+        repository = ConcurrentInMemoryRepository()
+    elif request.param == "async_in_memory":
+        repository = SyncRepository(AsyncInMemoryRepository(), event_loop)
+    elif request.param == "async_postgresql":
+        repository = SyncRepository(async_postgresql_repository, event_loop)
+    else:
+        raise ValueError("Invalid repository in test configuration")
+    repository._clean()
+    yield repository
+    repository._clean()
@@ -0,0 +1,123 @@
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.caching import CachingRepository
+from app.repository.memory import InMemoryRepository
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    yield Clock()
+
+
+@pytest.fixture
+def backend():
+    yield Mock(wraps=InMemoryRepository())
+
+
+@pytest.fixture
+def repository(backend, clock):
+    yield CachingRepository(backend, max_size=2, ttl=10.0, clock=clock)
+
+
+def test_get_is_cached(repository: CachingRepository, backend: Mock) -> None:
+    id_ = repository.insert("This is a Todo!")
+
+    assert repository.get(id_) == Todo(id=id_, text="This is a Todo!", active=True)
+    assert repository.get(id_) == Todo(id=id_, text="This is a Todo!", active=True)
+    assert backend.get.call_count == 1
+
+
+def test_get_expires(repository: CachingRepository, backend: Mock, clock: Clock) -> None:
+    id_ = repository.insert("This is a Todo!")
+
+    repository.get(id_)
+    clock.now = 10.0
+    repository.get(id_)
+    assert backend.get.call_count == 2
+
+
+def test_get_evicts_least_recently_used(repository: CachingRepository, backend: Mock) -> None:
+    ids = [repository.insert("Todo #{}".format(i)) for i in range(3)]
+
+    repository.get(ids[0])
+    repository.get(ids[1])
+    repository.get(ids[0])
+    repository.get(ids[2])
+    assert _get_calls(backend) == [ids[0], ids[1], ids[2]]
+
+    repository.get(ids[0])
+    repository.get(ids[1])
+    assert _get_calls(backend) == [ids[0], ids[1], ids[2], ids[1]]
+
+
+def test_writes_invalidate_affected_entries(repository: CachingRepository, backend: Mock) -> None:
+    id_1 = repository.insert("This is a Todo!")
+    id_2 = repository.insert("This is a ANOTHER Todo!")
+    repository.get(id_1)
+    repository.get(id_2)
+    repository.stats()
+
+    repository.edit_text(id_1, "Hello")
+    assert repository.get(id_1) == Todo(id=id_1, text="Hello", active=True)
+    repository.get(id_2)
+    repository.stats()
+    assert _get_calls(backend) == [id_1, id_2, id_1]
+    assert backend.stats.call_count == 1
+
+    repository.deactivate(id_2)
+    assert repository.stats() == Stats(active=1, inactive=1)
+    assert backend.stats.call_count == 2
+
+
+def test_list_snapshot(repository: CachingRepository, backend: Mock) -> None:
+    repository.insert("This is a Todo!")
+    todos = repository.list()
+    assert repository.list() == todos
+    assert backend.list.call_count == 1
+
+    id_ = repository.insert("This is a ANOTHER Todo!")
+    assert len(repository.list()) == 2
+    repository.delete(id_)
+    assert repository.list() == todos
+    assert backend.list.call_count == 3
+
+
+def test_missing_todo_is_cached(repository: CachingRepository, backend: Mock) -> None:
+    id_ = repository.insert("This is a Todo!")
+    repository.delete(id_)
+
+    assert repository.get(id_) is None
+    assert repository.get(id_) is None
+    assert backend.get.call_count == 1
+
+
+def test_new_version_invalidates_everything(repository: CachingRepository, backend: Mock) -> None:
+    id_ = repository.insert("This is a Todo!")
+    repository.version()
+    repository.get(id_)
+    repository.list()
+
+    # a write that bypasses the cache, e.g. from another process
+    backend.edit_text(id_, "Hello")
+    assert repository.get(id_).text == "This is a Todo!"
+    repository.version()
+    assert repository.get(id_).text == "Hello"
+    assert repository.list()[0].text == "Hello"
+    assert backend.list.call_count == 2
+
+
+def _get_calls(backend: Mock) -> List:
+    return [call[1]["id_"] for call in backend.get.call_args_list]
@@ -0,0 +1,93 @@
+import random
+from typing import Dict
+from uuid import UUID, uuid4
+
+import pytest
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.compact import CompactInMemoryRepository
+
+
+@pytest.fixture
+def compact_repository():
+    # tiny chunks, so that chunks get split and emptied
+    yield CompactInMemoryRepository(chunk_size=2)
+
+
+def test_matches_a_model(compact_repository: CompactInMemoryRepository) -> None:
+    model: Dict[UUID, Todo] = {}
+    rnd = random.Random(42)
+    for step in range(2000):
+        operation = rnd.random()
+        if operation < 0.3 or not model:
+            text = "Todo #{} ".format(step) + "✓" * rnd.randrange(10)
+            id_ = compact_repository.insert(text)
+            model[id_] = Todo(id=id_, text=text, active=True)
+        elif operation < 0.5:
+            todo = rnd.choice(list(model.values()))
+            text = "Edited #{}".format(step) * rnd.randrange(3)
+            assert compact_repository.edit_text(todo.id, text)
+            model[todo.id] = todo._replace(text=text)
+        elif operation < 0.7:
+            todo = rnd.choice(list(model.values()))
+            active = rnd.random() < 0.5
+            assert compact_repository.set_active_many([todo.id], active) == (True,)
+            model[todo.id] = todo._replace(active=active)
+        else:
+            id_ = rnd.choice(list(model))
+            assert compact_repository.delete(id_)
+            assert not compact_repository.delete(id_)
+            del model[id_]
+
+        assert compact_repository.stats() == Stats(
+            active=sum(todo.active for todo in model.values()),
+            inactive=sum(not todo.active for todo in model.values()),
+        )
+    todos = tuple(sorted(model.values()))
+    assert compact_repository.list() == todos
+    assert all(compact_repository.get(todo.id) == todo for todo in todos)
+    middle = len(todos) // 2
+    assert compact_repository.list_page(todos[middle].id, 10) == todos[middle + 1 : middle + 11]
+
+
+def test_arena_is_compacted(compact_repository: CompactInMemoryRepository) -> None:
+    ids = compact_repository.insert_many(["x" * 1000 for _ in range(10)])
+    for id_ in ids[:-1]:
+        compact_repository.edit_text(id_, "y" * 2000)
+        compact_repository.edit_text(id_, "short")
+
+    assert len(compact_repository._arena) < 10 * 1000
+    assert compact_repository.get(ids[-1]).text == "x" * 1000
+    assert all(compact_repository.get(id_).text == "short" for id_ in ids[:-1])
+
+
+def test_rows_are_reused(compact_repository: CompactInMemoryRepository) -> None:
+    ids = compact_repository.insert_many(["Todo"] * 10)
+    compact_repository.delete_many(ids[:5])
+    compact_repository.insert_many(["New"] * 5)
+
+    assert len(compact_repository._id_high) == 10
+    assert compact_repository.stats().active == 10
+
+
+def test_text_that_cannot_be_encoded_changes_nothing(compact_repository: CompactInMemoryRepository) -> None:
+    id_ = compact_repository.insert("Kept")
+    todos = compact_repository.list()
+    version = compact_repository.version()
+
+    # a lone surrogate, e.g., from the JSON string "\ud800"
+    with pytest.raises(UnicodeEncodeError):
+        compact_repository.insert("\ud800")
+    with pytest.raises(UnicodeEncodeError):
+        compact_repository.insert_many(["Valid", "\ud800"])
+    with pytest.raises(UnicodeEncodeError):
+        compact_repository.edit_text(id_, "\ud800")
+    with pytest.raises(UnicodeEncodeError):
+        compact_repository.import_todos(
+            [Todo(id=uuid4(), text="Valid", active=True), Todo(id=uuid4(), text="\ud800", active=True)]
+        )
+
+    assert compact_repository.list() == todos
+    assert compact_repository.stats() == Stats(active=1, inactive=0)
+    assert compact_repository.version() == version
@@ -0,0 +1,192 @@
+import random
+import sys
+import threading
+import time
+from typing import Dict, List
+from uuid import UUID
+
+import pytest
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.concurrent import ConcurrentInMemoryRepository
+
+WRITERS = 8
+READERS = 4
+OPERATIONS = 2000
+
+
+@pytest.fixture
+def switch_often():
+    # switch threads as often as possible, to interleave operations
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_stress(switch_often) -> None:
+    repository = ConcurrentInMemoryRepository(stripes=4)
+    shared = repository.insert_many(["Shared #{}".format(i) for i in range(10)])
+    models: List[Dict[UUID, Todo]] = [{} for _ in range(WRITERS)]
+    errors: List[BaseException] = []
+    done = threading.Event()
+
+    def write(index: int) -> None:
+        rnd = random.Random(index)
+        model = models[index]
+        try:
+            for step in range(OPERATIONS):
+                operation = rnd.random()
+                if operation < 0.4 or not model:
+                    text = "Todo #{} of writer #{}".format(step, index)
+                    id_ = repository.insert(text)
+                    model[id_] = Todo(id=id_, text=text, active=True)
+                elif operation < 0.6:
+                    todo = rnd.choice(list(model.values()))
+                    assert repository.deactivate(todo.id)
+                    model[todo.id] = todo._replace(active=False)
+                elif operation < 0.8:
+                    todo = rnd.choice(list(model.values()))
+                    assert repository.edit_text(todo.id, "Edited")
+                    model[todo.id] = todo._replace(text="Edited")
+                elif operation < 0.9:
+                    id_ = rnd.choice(list(model))
+                    assert repository.delete(id_)
+                    del model[id_]
+                else:
+                    # contended writes to the same Todos
+                    assert repository.set_active_many(shared, rnd.random() < 0.5) == (True,) * len(shared)
+        except BaseException as e:  # pragma: nocover
+            errors.append(e)
+
+    def read() -> None:
+        last_version = 0
+        try:
+            while not done.is_set():
+                version = repository.version()
+                assert version >= last_version
+                last_version = version
+                todos = repository.list()
+                assert all(a.id < b.id for a, b in zip(todos, todos[1:]))
+                assert set(shared) <= {todo.id for todo in todos}
+                page = repository.list_page(after=todos[len(todos) // 2].id, limit=50)
+                assert all(a.id < b.id for a, b in zip(page, page[1:]))
+                stats = repository.stats()
+                assert stats.active >= 0 and stats.inactive >= 0
+        except BaseException as e:  # pragma: nocover
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(READERS)]
+    writers = [threading.Thread(target=write, args=(index,)) for index in range(WRITERS)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    expected = {todo.id: todo for model in models for todo in model.values()}
+    todos = repository.list()
+    assert {todo.id: todo for todo in todos if todo.id not in shared} == expected
+    assert len(todos) == len(expected) + len(shared)
+    assert repository.stats() == Stats(
+        active=sum(todo.active for todo in todos), inactive=sum(not todo.active for todo in todos)
+    )
+
+
+def test_reads_count_each_todo_once(switch_often) -> None:
+    repository = ConcurrentInMemoryRepository(stripes=2)
+    ids = repository.insert_many(["Todo #{}".format(i) for i in range(10)])
+    errors: List[BaseException] = []
+    done = threading.Event()
+
+    def toggle() -> None:
+        while not done.is_set():
+            for id_ in ids:
+                repository.deactivate(id_)
+                repository.activate(id_)
+            repository.edit_text(ids[0], "Edited")
+
+    writer = threading.Thread(target=toggle)
+    writer.start()
+    try:
+        for _ in range(2000):
+            stats = repository.stats()
+            assert stats.active + stats.inactive == len(ids)
+            assert sorted(todo.id for todo in repository.list()) == sorted(ids)
+    except BaseException as e:  # pragma: nocover
+        errors.append(e)
+    finally:
+        done.set()
+        writer.join()
+    assert errors == []
+
+
+def test_list_copies_a_stripe_being_written_under_its_lock() -> None:
+    repository = ConcurrentInMemoryRepository(stripes=1)
+    repository.insert("Todo")
+    stripe = repository._stripes[0]
+
+    def write() -> None:
+        time.sleep(0.1)
+        stripe.version += 1
+        stripe.lock.release()
+
+    # as if a write had started to change the Todos of the stripe
+    stripe.lock.acquire()
+    stripe.writes += 1
+    writer = threading.Thread(target=write)
+    writer.start()
+    start = time.monotonic()
+    assert len(repository.list()) == 1
+    assert time.monotonic() - start >= 0.1
+    writer.join()
+
+
+def test_list_does_not_wait_for_writers() -> None:
+    repository = ConcurrentInMemoryRepository()
+    id_ = repository.insert("Todo")
+    stripe = repository._stripe(id_)
+
+    with stripe.lock:
+        assert repository.list() == (Todo(id=id_, text="Todo", active=True),)
+        assert repository.stats() == Stats(active=1, inactive=0)
+        assert repository.get(id_) == Todo(id=id_, text="Todo", active=True)
+
+
+def test_snapshot_is_reused_until_a_write() -> None:
+    repository = ConcurrentInMemoryRepository()
+    repository.insert("Todo")
+
+    assert repository.list() is repository.list()
+    todos = repository.list()
+    repository.insert("Another Todo")
+    assert repository.list() is not todos
+    assert len(repository.list()) == 2
+
+
+def test_pages_after_a_write_do_not_sort_all_todos() -> None:
+    # more Todos per stripe than read at a time
+    repository = ConcurrentInMemoryRepository(stripes=2)
+    repository.insert_many(["Todo #{}".format(i) for i in range(200)])
+    snapshot = repository._take_snapshot()
+    id_ = repository.insert("Todo #200")
+    repository.deactivate(id_)
+    todos = sorted(todo for stripe in repository._stripes for todo in stripe.todos.values())
+
+    pages: List[Todo] = []
+    after = None
+    while True:
+        page = repository.list_page(after=after, limit=30)
+        pages.extend(page)
+        if len(page) < 30:
+            break
+        after = page[-1].id
+    assert pages == todos
+    assert repository.search(active=False, text="#20", limit=5) == (Todo(id=id_, text="Todo #200", active=False),)
+    assert repository.search(active=False, after=id_) == ()
+    assert repository._snapshot is snapshot
+    assert repository.list() == tuple(todos)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from flask import Flask
+from flask.testing import FlaskClient
+from prometheus_client import REGISTRY
+
+from app.apis.admin import make_admin_blueprint
+from app.apis.admin_async import make_async_admin_app
+from app.utils.delay import Delay, DelayInjector, inject_delay
+
+PROFILES = {
+    "none": {},
+    "always": {"test.point": Delay(0.001, 0.002)},
+    "rare": {"test.point": Delay(0.001, 0.001, probability=0.5)},
+}
+
+AUTHORIZATION = {"Authorization": "Bearer secret"}
+
+
+@pytest.fixture
+def injector():
+    yield DelayInjector(PROFILES, profile="always", seed=42)
+
+
+@pytest.fixture
+def client(injector):
+    app = Flask(__name__)
+    app.register_blueprint(make_admin_blueprint(injector, token="secret"))
+    yield app.test_client()
+
+
+def _sample(point: str) -> float:
+    return REGISTRY.get_sample_value("app_injected_delay_seconds_count", {"point": point}) or 0.0
+
+
+def test_sample_is_deterministic_with_seed(injector: DelayInjector) -> None:
+    first = [injector.sample("test.point") for _ in range(10)]
+    injector.configure("always", seed=42)
+    second = [injector.sample("test.point") for _ in range(10)]
+
+    assert first == second
+    assert all(0.001 <= wait <= 0.002 for wait in first)
+
+
+def test_sample_unknown_point(injector: DelayInjector) -> None:
+    assert injector.sample("other.point") == 0
+
+
+def test_sample_with_probability(injector: DelayInjector) -> None:
+    injector.configure("rare")
+    waits = [injector.sample("test.point") for _ in range(1000)]
+    assert 300 < sum(1 for wait in waits if wait > 0) < 700
+
+
+def test_configure_unknown_profile(injector: DelayInjector) -> None:
+    with pytest.raises(ValueError):
+        injector.configure("unknown")
+    assert injector.profile == "always"
+
+
+def test_from_env(monkeypatch, tmp_path) -> None:
+    path = tmp_path / "profiles.json"
+    path.write_text(
+        json.dumps({"tail": {"test.point": {"min_delay": 0.2, "max_delay": 0.2, "probability": 0.01}}})
+    )
+    monkeypatch.setenv("DELAY_PROFILES_FILE", str(path))
+    monkeypatch.setenv("DELAY_PROFILE", "tail")
+    monkeypatch.setenv("DELAY_SEED", "7")
+
+    injector = DelayInjector.from_env()
+    assert injector.profile == "tail"
+    assert injector.seed == 7
+    assert injector.profiles["tail"] == {"test.point": Delay(0.2, 0.2, probability=0.01)}
+    assert "workshop" in injector.profiles
+
+
+def test_from_env_malformed_profiles(monkeypatch, tmp_path) -> None:
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"tail": {"test.point": {"min_delay": 2.0, "max_delay": 1.0}}}))
+    monkeypatch.setenv("DELAY_PROFILES_FILE", str(path))
+
+    with pytest.raises(ValueError):
+        DelayInjector.from_env()
+
+
+def test_inject_delay_records_metric(injector: DelayInjector) -> None:
+    f = inject_delay("test.point", injector=injector)(lambda: "result")
+    before = _sample("test.point")
+
+    assert f() == "result"
+    injector.configure("none")
+    assert f() == "result"
+
+    assert _sample("test.point") - before == 1
+
+
+def test_inject_delay_coroutine(injector: DelayInjector) -> None:
+    async def f():
+        return "result"
+
+    before = _sample("test.coroutine")
+    result = asyncio.run(inject_delay("test.coroutine", injector=injector)(f)())
+
+    assert result == "result"
+    assert _sample("test.coroutine") == before
+
+
+def test_get_delay(client: FlaskClient) -> None:
+    response = client.get("/admin/delay")
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json()["profile"] == "always"
+    assert response.get_json()["seed"] == 42
+    assert response.get_json()["profiles"]["always"] == {
+        "test.point": {"min_delay": 0.001, "max_delay": 0.002, "probability": 1.0}
+    }
+
+
+def test_configure_delay(client: FlaskClient, injector: DelayInjector) -> None:
+    response = client.put("/admin/delay", json={"profile": "none", "seed": 1}, headers=AUTHORIZATION)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert injector.profile == "none"
+    assert injector.seed == 1
+
+
+@pytest.mark.parametrize(
+    "body", [{}, {"profile": "unknown"}, {"profile": "none", "seed": "1"}, ["none"]]
+)
+def test_configure_delay_invalid(client: FlaskClient, injector: DelayInjector, body) -> None:
+    response = client.put("/admin/delay", json=body, headers=AUTHORIZATION)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert injector.profile == "always"
+
+
+def test_configure_delay_not_json(client: FlaskClient) -> None:
+    response = client.put("/admin/delay", data="none", headers=AUTHORIZATION)
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer other"}, {"Authorization": "secret"}])
+def test_configure_delay_unauthorized(client: FlaskClient, injector: DelayInjector, headers) -> None:
+    response = client.put("/admin/delay", json={"profile": "none"}, headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert injector.profile == "always"
+
+
+def test_configure_delay_without_token(injector: DelayInjector) -> None:
+    app = Flask(__name__)
+    app.register_blueprint(make_admin_blueprint(injector))
+    response = app.test_client().put("/admin/delay", json={"profile": "none"}, headers=AUTHORIZATION)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert injector.profile == "always"
+
+
+def test_configure_delay_async(injector: DelayInjector) -> None:
+    async def run():
+        app = web.Application()
+        app.add_subapp("/admin", make_async_admin_app(injector, token="secret"))
+        async with TestClient(TestServer(app)) as client:
+            response = await client.put("/admin/delay", json={"profile": "none"})
+            assert response.status == HTTPStatus.UNAUTHORIZED
+            response = await client.put("/admin/delay", json={"profile": "unknown"}, headers=AUTHORIZATION)
+            assert response.status == HTTPStatus.BAD_REQUEST
+            response = await client.put("/admin/delay", json={"profile": "none"}, headers=AUTHORIZATION)
+            assert response.status == HTTPStatus.NO_CONTENT
+            response = await client.get("/admin/delay")
+            assert (await response.json())["profile"] == "none"
+
+    asyncio.run(run())
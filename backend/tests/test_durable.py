@@ -0,0 +1,184 @@
+import errno
+import os
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+
+from app.models.stats import Stats
+from app.models.todo import Todo
+from app.repository.durable import DurableInMemoryRepository
+
+
+@pytest.fixture
+def directory(tmp_path):
+    yield str(tmp_path)
+
+
+def reopen(repository: DurableInMemoryRepository, **kwargs) -> DurableInMemoryRepository:
+    repository.disconnect()
+    reopened = DurableInMemoryRepository(directory=repository._directory, **kwargs)
+    reopened.connect()
+    return reopened
+
+
+def write_some_todos(repository: DurableInMemoryRepository) -> None:
+    first = repository.insert("First")
+    repository.edit_text(first, "First, edited")
+    ids = repository.insert_many(["Second", "Third", "Fourth", "Fifth"])
+    repository.deactivate(ids[0])
+    repository.set_active_many(ids[1:3], False)
+    repository.activate(ids[1])
+    repository.delete(ids[3])
+    repository.delete_many([ids[2], first])
+
+
+@pytest.mark.parametrize("snapshot_every", [0, 1, 3])
+def test_restart_restores_todos(directory: str, snapshot_every: int) -> None:
+    repository = DurableInMemoryRepository(directory, snapshot_every=snapshot_every)
+    repository.connect()
+    write_some_todos(repository)
+    todos = repository.list()
+    version = repository.version()
+
+    repository = reopen(repository)
+
+    assert repository.list() == todos
+    assert repository.stats() == Stats(active=1, inactive=1)
+    assert all(repository.get(todo.id) == todo for todo in todos)
+    assert repository.version() > version
+    repository.disconnect()
+
+
+@pytest.mark.parametrize("snapshot_every", [0, 1])
+def test_restart_restores_imported_todos(directory: str, snapshot_every: int) -> None:
+    repository = DurableInMemoryRepository(directory, snapshot_every=snapshot_every)
+    repository.connect()
+    id_ = repository.insert("Inserted")
+    todos = [Todo(id=uuid4(), text="Imported", active=True), Todo(id=uuid4(), text="Inactive", active=False)]
+    repository.import_todos(todos)
+    repository.deactivate(id_)
+
+    repository = reopen(repository)
+
+    assert repository.list() == tuple(sorted(todos + [Todo(id=id_, text="Inserted", active=False)]))
+    assert repository.stats() == Stats(active=1, inactive=2)
+    assert repository.search(active=False, text="inactive") == (todos[1],)
+    repository.disconnect()
+
+
+def test_snapshot_removes_covered_segments(directory: str) -> None:
+    repository = DurableInMemoryRepository(directory, snapshot_every=0)
+    repository.connect()
+    repository.insert_many(["First", "Second"])
+    repository.snapshot()
+    id_ = repository.insert("Third")
+    todos = repository.list()
+
+    assert sorted(os.listdir(directory)) == ["snapshot.bin", "wal.00000001.log"]
+    repository = reopen(repository)
+    assert repository.list() == todos
+    assert repository.get(id_) == Todo(id=id_, text="Third", active=True)
+    repository.disconnect()
+
+
+def test_torn_record_is_dropped(directory: str) -> None:
+    repository = DurableInMemoryRepository(directory)
+    repository.connect()
+    id_ = repository.insert("Kept")
+    repository.insert("Torn")
+    repository.disconnect()
+    path = os.path.join(directory, "wal.00000000.log")
+    size = os.path.getsize(path)
+    with open(path, "r+b") as file:
+        file.truncate(size - 2)
+
+    repository.connect()
+    assert repository.list() == (Todo(id=id_, text="Kept", active=True),)
+    other_id = repository.insert("After")
+    repository = reopen(repository)
+    assert [todo.id for todo in repository.list()] == sorted([id_, other_id])
+    repository.disconnect()
+
+
+class FullDisk:
+    """
+    Log that takes the first bytes of a write, then fails like a full disk.
+    """
+
+    def __init__(self, log):
+        self._log = log
+
+    def __getattr__(self, name: str):
+        return getattr(self._log, name)
+
+    def write(self, data) -> int:
+        self._log.write(data[:10])
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+
+def test_failed_write_changes_nothing(directory: str) -> None:
+    repository = DurableInMemoryRepository(directory)
+    repository.connect()
+    id_ = repository.insert("Kept")
+    todos = repository.list()
+    version = repository.version()
+
+    with pytest.raises(UnicodeEncodeError):
+        repository.insert("\ud800")
+    log = repository._log
+    repository._log = FullDisk(log)
+    with pytest.raises(OSError):
+        repository.insert("Lost")
+    with pytest.raises(OSError):
+        repository.edit_text(id_, "Lost")
+    with pytest.raises(OSError):
+        repository.delete_many([id_])
+    repository._log = log
+
+    assert repository.list() == todos
+    assert repository.version() == version
+    other_id = repository.insert("After")
+    repository = reopen(repository)
+    assert repository.get(id_) == Todo(id=id_, text="Kept", active=True)
+    assert [todo.id for todo in repository.list()] == sorted([id_, other_id])
+    repository.disconnect()
+
+
+def test_corrupted_segment_is_rejected(directory: str) -> None:
+    repository = DurableInMemoryRepository(directory, snapshot_every=0)
+    repository.connect()
+    repository.insert("First")
+    repository.disconnect()
+    with open(os.path.join(directory, "wal.00000000.log"), "r+b") as file:
+        file.write(b"\xff")
+    with open(os.path.join(directory, "wal.00000001.log"), "wb"):
+        pass
+
+    with pytest.raises(ValueError):
+        DurableInMemoryRepository(directory).connect()
+
+
+@pytest.mark.parametrize("sync_every, expected_syncs", [(1, 6), (3, 2), (0, 0)])
+def test_sync_batching(directory: str, sync_every: int, expected_syncs: int) -> None:
+    repository = DurableInMemoryRepository(directory, sync_every=sync_every)
+    repository.connect()
+    with patch("app.repository.durable.os.fsync") as fsync:
+        for i in range(6):
+            repository.insert("Todo #{}".format(i))
+        assert fsync.call_count == expected_syncs
+    repository.disconnect()
+
+
+def test_sync_interval(directory: str) -> None:
+    repository = DurableInMemoryRepository(directory, sync_every=0, sync_interval=10.0)
+    repository.connect()
+    with patch("app.repository.durable.os.fsync") as fsync, patch(
+        "app.repository.durable.time.monotonic"
+    ) as monotonic:
+        monotonic.return_value = repository._last_sync + 5
+        repository.insert("Not synced")
+        monotonic.return_value = repository._last_sync + 10
+        repository.insert("Synced")
+        assert fsync.call_count == 1
+    repository.disconnect()
@@ -0,0 +1,85 @@
+import json
+from uuid import uuid1
+
+import orjson
+
+import pytest
+
+from app.apis.encoders import (
+    TodoEncoder,
+    StdlibTodoEncoder,
+    OrjsonTodoEncoder,
+    make_encoder,
+)
+from app.models.todo import Todo
+
+TODOS = (
+    Todo(id=uuid1(), text="This is a Todo!", active=True),
+    Todo(id=uuid1(), text='"Quoted" 🤖\n', active=False),
+)
+
+
+@pytest.fixture(params=["stdlib", "orjson", "orjson_cached"])
+def encoder(request):
+    if request.param == "stdlib":
+        yield StdlibTodoEncoder()
+    elif request.param == "orjson":
+        yield OrjsonTodoEncoder()
+    else:
+        yield OrjsonTodoEncoder(cache_size=1)
+
+
+def test_todo(encoder: TodoEncoder) -> None:
+    todo = TODOS[1]
+    assert json.loads(encoder.todo(todo)) == {"id": str(todo.id), "text": todo.text, "active": False}
+
+
+def test_todos(encoder: TodoEncoder) -> None:
+    assert json.loads(encoder.todos(TODOS)) == [
+        {"id": str(todo.id), "text": todo.text, "active": todo.active} for todo in TODOS
+    ]
+    assert json.loads(encoder.todos(())) == []
+
+
+def test_page(encoder: TodoEncoder) -> None:
+    assert json.loads(encoder.page(TODOS[:1], TODOS[0].id)) == {
+        "todos": [{"id": str(TODOS[0].id), "text": TODOS[0].text, "active": True}],
+        "next": str(TODOS[0].id),
+    }
+    assert json.loads(encoder.page((), None)) == {"todos": [], "next": None}
+
+
+def test_cache_is_invalidated_by_modifications() -> None:
+    encoder = OrjsonTodoEncoder(cache_size=10)
+    todo = TODOS[0]
+    assert encoder.todo(todo) is encoder.todo(todo)
+
+    modified = todo._replace(active=False)
+    assert json.loads(encoder.todo(modified))["active"] is False
+
+
+def test_orjson_encodes_like_the_fields_of_the_todo() -> None:
+    for todo in TODOS:
+        assert OrjsonTodoEncoder().todo(todo) == orjson.dumps(todo._asdict())
+    assert OrjsonTodoEncoder().todos(TODOS) == orjson.dumps([todo._asdict() for todo in TODOS])
+
+
+def test_cache_evicts_the_least_recently_used_todo() -> None:
+    encoder = OrjsonTodoEncoder(cache_size=2)
+    first, second = TODOS
+    encoded_first, encoded_second = encoder.todo(first), encoder.todo(second)
+    assert encoder.todo(first) is encoded_first
+
+    encoder.todo(Todo(id=uuid1(), text="Third", active=True))
+    assert encoder.todo(first) is encoded_first
+    assert encoder.todo(second) is not encoded_second
+
+
+def test_make_encoder(monkeypatch) -> None:
+    monkeypatch.setenv("JSON_ENCODER", "stdlib")
+    assert isinstance(make_encoder(), StdlibTodoEncoder)
+    monkeypatch.setenv("JSON_ENCODER", "orjson")
+    assert isinstance(make_encoder(), OrjsonTodoEncoder)
+    monkeypatch.setenv("JSON_ENCODER", "ujson")
+    with pytest.raises(ValueError):
+        make_encoder()
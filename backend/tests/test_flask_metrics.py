@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+from prometheus_client import CollectorRegistry
+
+from app.apis.todo import make_todos_blueprint
+from app.main import make_flask_app
+from app.metrics.flask import register_prometheus
+from app.repository.memory import InMemoryRepository
+
+
+@pytest.fixture
+def registry():
+    yield CollectorRegistry()
+
+
+@pytest.fixture
+def client(registry):
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(InMemoryRepository()))
+    register_prometheus(app, registry=registry)
+    yield app.test_client()
+
+
+def test_counts_requests(client: FlaskClient, registry: CollectorRegistry) -> None:
+    client.get("/todos/")
+    client.get("/todos/")
+    client.post("/todos/", json={"text": "I like speck"})
+
+    labels = {"endpoint": "list_todos", "method": "GET", "status_code": "200"}
+    assert registry.get_sample_value("app_flask_http_request_total", labels) == 2
+    labels = {"endpoint": "create_todo", "method": "POST", "status_code": "500"}
+    assert registry.get_sample_value("app_flask_http_request_total", labels) == 1
+
+
+def test_unmatched_routes_share_one_label(client: FlaskClient, registry: CollectorRegistry) -> None:
+    client.get("/speck")
+    client.get("/speck/{}".format("a" * 20))
+
+    labels = {"endpoint": "unmatched", "method": "GET", "status_code": "404"}
+    assert registry.get_sample_value("app_flask_http_request_total", labels) == 2
+
+
+def test_records_duration_and_sizes(client: FlaskClient, registry: CollectorRegistry) -> None:
+    response = client.post("/todos/", json={"text": "This is a Todo!"})
+
+    labels = {"endpoint": "create_todo", "method": "POST"}
+    assert registry.get_sample_value("app_flask_http_request_duration_seconds_count", labels) == 1
+    assert registry.get_sample_value("app_flask_http_request_size_bytes_sum", labels) == len(
+        b'{"text": "This is a Todo!"}'
+    )
+    assert registry.get_sample_value("app_flask_http_response_size_bytes_sum", labels) == len(
+        response.data
+    )
+    assert registry.get_sample_value("app_flask_http_requests_in_progress", labels) == 0
+
+
+def test_apps_share_the_metrics_of_a_registry(registry: CollectorRegistry) -> None:
+    clients = []
+    for _ in range(2):
+        app = Flask(__name__)
+        app.register_blueprint(make_todos_blueprint(InMemoryRepository()))
+        register_prometheus(app, registry=registry)
+        clients.append(app.test_client())
+    for client in clients:
+        client.get("/todos/")
+
+    labels = {"endpoint": "list_todos", "method": "GET", "status_code": "200"}
+    assert registry.get_sample_value("app_flask_http_request_total", labels) == 2
+
+
+def test_make_flask_app_twice() -> None:
+    for _ in range(2):
+        assert make_flask_app(InMemoryRepository()).test_client().get("/todos/").status_code == HTTPStatus.OK
@@ -0,0 +1,174 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence
+from uuid import UUID
+
+import pytest
+
+from app.models.stats import Stats
+from app.repository.group_commit import GroupCommitter, GROUP_COMMIT_SIZE
+from app.repository.postgresql import PostgreSQLRepository, GroupCommit
+from app.utils.delay import INJECTOR
+
+
+class Flush:
+    def __init__(self):
+        self.batches: List[Sequence[int]] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, writes: Sequence[int]) -> List[int]:
+        self.release.wait()
+        self.batches.append(writes)
+        return [write * 2 for write in writes]
+
+
+@pytest.fixture
+def flush():
+    yield Flush()
+
+
+def submit_all(committer: GroupCommitter, writes: Sequence[int]) -> List[int]:
+    with ThreadPoolExecutor(max_workers=len(writes)) as executor:
+        return list(executor.map(committer.submit, writes))
+
+
+def test_each_caller_gets_its_result(flush: Flush) -> None:
+    committer = GroupCommitter(flush, max_size=10, max_delay=0.05)
+    committer.start()
+
+    assert submit_all(committer, list(range(30))) == [write * 2 for write in range(30)]
+    committer.close()
+    assert sorted(write for batch in flush.batches for write in batch) == list(range(30))
+    assert all(len(batch) <= 10 for batch in flush.batches)
+    assert len(flush.batches) < 30
+
+
+def test_writes_submitted_during_a_flush_are_grouped(flush: Flush) -> None:
+    committer = GroupCommitter(flush, max_size=100, max_delay=0)
+    committer.start()
+    flush.release.clear()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        first = executor.submit(committer.submit, -1)
+        while committer._queue:
+            pass
+        others = [executor.submit(committer.submit, write) for write in range(9)]
+        while len(committer._queue) < 9:
+            pass
+        flush.release.set()
+        assert first.result() == -2
+        assert [other.result() for other in others] == [write * 2 for write in range(9)]
+    committer.close()
+
+    assert flush.batches[0] == [-1]
+    assert sorted(flush.batches[1]) == list(range(9))
+
+
+def test_flush_exception_is_raised_to_every_caller() -> None:
+    def fail(_: Sequence[int]) -> List[int]:
+        raise ValueError("Flush failed")
+
+    committer = GroupCommitter(fail, max_size=5, max_delay=0.05)
+    committer.start()
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(committer.submit, write) for write in range(5)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+    committer.close()
+
+
+def test_failing_write_only_fails_its_caller(flush: Flush) -> None:
+    def fail_on_negative(writes: Sequence[int]) -> List[int]:
+        if any(write < 0 for write in writes):
+            raise ValueError("Negative write")
+        return flush(writes)
+
+    committer = GroupCommitter(fail_on_negative, max_size=10, max_delay=0.05)
+    committer.start()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = {write: executor.submit(committer.submit, write) for write in [-1] + list(range(9))}
+        with pytest.raises(ValueError):
+            futures.pop(-1).result()
+        assert {write: future.result() for write, future in futures.items()} == {
+            write: write * 2 for write in range(9)
+        }
+    committer.close()
+
+    assert sorted(write for batch in flush.batches for write in batch) == list(range(9))
+
+
+def test_close_flushes_pending_writes(flush: Flush) -> None:
+    committer = GroupCommitter(flush, max_size=100, max_delay=60)
+    committer.start()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(committer.submit, 21)
+        while not committer._queue:
+            pass
+        committer.close()
+        assert future.result() == 42
+    with pytest.raises(RuntimeError):
+        committer.submit(1)
+
+
+def test_invalid_operations() -> None:
+    with pytest.raises(ValueError):
+        PostgreSQLRepository("", max_connections=1, group_commit=GroupCommit(operations=frozenset({"edit_text"})))
+
+
+@pytest.fixture
+def group_commit_repository(monkeypatch):
+    monkeypatch.setenv("POSTGRESQL_GROUP_COMMIT_OPERATIONS", "insert,activate,deactivate,delete")
+    monkeypatch.setenv("POSTGRESQL_GROUP_COMMIT_MAX_DELAY", "0.05")
+    repository = PostgreSQLRepository.factory(max_connections=2)
+    repository.connect()
+    repository.initialize()
+    repository._clean()
+    # all writes must arrive within the same window
+    profile = INJECTOR.profile
+    INJECTOR.configure("none")
+    yield repository
+    INJECTOR.configure(profile)
+    repository._clean()
+    repository.disconnect()
+
+
+def test_concurrent_writes_are_committed_together(group_commit_repository: PostgreSQLRepository) -> None:
+    repository = group_commit_repository
+    before = GROUP_COMMIT_SIZE.collect()[0]
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        ids = list(executor.map(repository.insert, ["Todo #{}".format(i) for i in range(20)]))
+        assert len(set(ids)) == 20
+        assert all(executor.map(repository.deactivate, ids[:10]))
+        deleted = list(executor.map(repository.delete, ids[:5] + ids[:5]))
+
+    assert sorted(deleted) == [False] * 5 + [True] * 5
+    assert repository.stats() == Stats(active=10, inactive=5)
+    assert {todo.text for todo in repository.list()} == {"Todo #{}".format(i) for i in range(5, 20)}
+    flushes = _sample(GROUP_COMMIT_SIZE.collect()[0], "_count") - _sample(before, "_count")
+    writes = _sample(GROUP_COMMIT_SIZE.collect()[0], "_sum") - _sample(before, "_sum")
+    assert writes == 40
+    assert flushes < 40
+
+
+def _sample(metric, suffix: str) -> float:
+    return next(sample.value for sample in metric.samples if sample.name.endswith(suffix))
+
+
+def test_invalid_write_does_not_fail_the_batch(group_commit_repository: PostgreSQLRepository) -> None:
+    repository = group_commit_repository
+    texts = ["Todo #{}".format(i) for i in range(9)] + ["NUL \x00"]
+
+    def insert(text: str):
+        try:
+            return repository.insert(text)
+        except ValueError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(insert, texts))
+
+    assert isinstance(results[-1], ValueError)
+    assert all(isinstance(result, UUID) for result in results[:-1])
+    assert {todo.text for todo in repository.list()} == set(texts[:-1])
@@ -0,0 +1,53 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.memory import InMemoryRepository
+
+
+class FailingRepository(InMemoryRepository):
+    def stats(self):
+        raise RuntimeError("Database is down")
+
+
+def _sample(name: str, query: str) -> float:
+    return REGISTRY.get_sample_value(name, {"query": query}) or 0.0
+
+
+def test_records_duration() -> None:
+    repository = InstrumentedRepository(InMemoryRepository())
+    before = _sample("app_repository_query_duration_seconds_count", "insert")
+
+    repository.insert("This is a Todo!")
+    repository.insert("This is a ANOTHER Todo!")
+
+    after = _sample("app_repository_query_duration_seconds_count", "insert")
+    assert after - before == 2
+    assert _sample("app_repository_queries_in_progress", "insert") == 0
+
+
+def test_records_exceptions() -> None:
+    repository = InstrumentedRepository(FailingRepository())
+    before = _sample("app_repository_query_exceptions_total", "stats")
+    duration_before = _sample("app_repository_query_duration_seconds_count", "stats")
+
+    with pytest.raises(RuntimeError):
+        repository.stats()
+
+    assert _sample("app_repository_query_exceptions_total", "stats") - before == 1
+    assert _sample("app_repository_query_duration_seconds_count", "stats") - duration_before == 1
+    assert _sample("app_repository_queries_in_progress", "stats") == 0
+
+
+def test_records_export_over_iteration() -> None:
+    repository = InstrumentedRepository(InMemoryRepository())
+    repository.insert_many(["This is a Todo!", "This is a ANOTHER Todo!"])
+    before = _sample("app_repository_query_duration_seconds_count", "export_todos")
+
+    todos = repository.export_todos()
+    next(todos)
+    assert _sample("app_repository_queries_in_progress", "export_todos") == 1
+    assert len(list(todos)) == 1
+
+    assert _sample("app_repository_query_duration_seconds_count", "export_todos") - before == 1
+    assert _sample("app_repository_queries_in_progress", "export_todos") == 0
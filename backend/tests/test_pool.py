@@ -0,0 +1,123 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from app.repository.pool import BlockingConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, query):
+                if connection.broken:
+                    raise psycopg2.OperationalError("server closed the connection")
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def _make_pool(**kwargs) -> BlockingConnectionPool:
+    kwargs.setdefault("max_connections", 1)
+    kwargs.setdefault("acquire_timeout", 0.05)
+    return BlockingConnectionPool(dsn="", connect=lambda dsn: FakeConnection(), **kwargs)
+
+
+def test_reuses_connections() -> None:
+    pool = _make_pool()
+    conn = pool.getconn()
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_times_out_when_exhausted() -> None:
+    pool = _make_pool()
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+
+
+def test_waits_for_a_connection() -> None:
+    pool = _make_pool(acquire_timeout=5.0)
+    conn = pool.getconn()
+    timer = threading.Timer(0.05, lambda: pool.putconn(conn))
+    timer.start()
+    assert pool.getconn() is conn
+    timer.join()
+
+
+def test_replaces_closed_connections() -> None:
+    pool = _make_pool()
+    conn = pool.getconn()
+    conn.closed = 2
+    pool.putconn(conn)
+    assert pool.getconn() is not conn
+
+
+def test_pings_idle_connections() -> None:
+    pool = _make_pool(ping_after=0.0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+    new_conn = pool.getconn()
+    assert new_conn is not conn
+    assert conn.closed
+
+
+def test_recycles_old_connections() -> None:
+    pool = _make_pool(max_lifetime=0.01)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    time.sleep(0.02)
+    assert pool.getconn() is not conn
+
+
+def test_reaps_expired_idle_connections() -> None:
+    pool = _make_pool(max_connections=3, max_idle=0.05)
+    connections = [pool.getconn() for _ in range(3)]
+    for conn in connections:
+        pool.putconn(conn)
+
+    # a steady load reuses the most recently used connection only: the others expire anyway
+    deadline = time.monotonic() + 0.1
+    while time.monotonic() < deadline:
+        conn = pool.getconn()
+        assert conn is connections[-1]
+        pool.putconn(conn)
+        time.sleep(0.01)
+
+    assert all(conn.closed for conn in connections[:-1])
+    assert not connections[-1].closed
+    assert pool._size == 1
+
+
+def test_closeall() -> None:
+    pool = _make_pool(max_connections=2)
+    idle, in_use = pool.getconn(), pool.getconn()
+    pool.putconn(idle)
+    pool.closeall()
+    assert idle.closed
+
+    pool.putconn(in_use)
+    assert in_use.closed
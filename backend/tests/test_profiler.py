@@ -0,0 +1,150 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Optional
+
+import pytest
+from flask import Flask
+
+from app.apis.todo import make_todos_blueprint
+from app.metrics.profiler import StackSampler, ProfilerBusy, CPU_MODE_SUPPORTED, start_http_server
+from app.repository.instrumented import InstrumentedRepository
+from app.repository.memory import InMemoryRepository
+
+
+class SlowRepository(InMemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def list(self):
+        self.release.wait()
+        return super().list()
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_stacks_are_attributed_to_endpoint_and_repository_method() -> None:
+    repository = SlowRepository()
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(InstrumentedRepository(repository)))
+
+    idle = threading.Thread(target=repository.release.wait, name="idle")
+    idle.start()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        response = executor.submit(lambda: app.test_client().get("/todos/"))
+        try:
+            stacks = StackSampler().sample(0.2, frequency=100, mode="wall")
+        finally:
+            repository.release.set()
+            idle.join()
+        assert response.result().status_code == HTTPStatus.OK
+
+    attributed = [stack for stack in stacks if stack.startswith("endpoint:list_todos;repository:list;")]
+    assert attributed
+    assert any("test_profiler:list;threading:wait" in stack for stack in attributed)
+    assert any(stack.startswith("thread:idle;") for stack in stacks)
+
+
+@pytest.mark.skipif(not CPU_MODE_SUPPORTED, reason="CPU time of threads is not available")
+def test_cpu_mode_skips_idle_threads() -> None:
+    stop = threading.Event()
+    busy = threading.Thread(target=_spin, args=(stop,), name="busy")
+    idle = threading.Thread(target=stop.wait, name="idle")
+    busy.start()
+    idle.start()
+    # lets the idle thread reach its wait
+    time.sleep(0.1)
+    try:
+        stacks = StackSampler().sample(0.5, frequency=100, mode="cpu")
+    finally:
+        stop.set()
+        busy.join()
+        idle.join()
+
+    assert any(stack.startswith("thread:busy;") for stack in stacks)
+    assert not any(stack.startswith("thread:idle;") for stack in stacks)
+
+
+@pytest.mark.skipif(not CPU_MODE_SUPPORTED, reason="CPU time of threads is not available")
+def test_cpu_mode_counts_threads_started_during_the_profile() -> None:
+    stop = threading.Event()
+
+    def short() -> None:
+        sum(range(100000))
+        stop.wait()
+
+    def start_threads() -> None:
+        time.sleep(0.1)
+        threading.Thread(target=short, name="short").start()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(start_threads)
+        try:
+            stacks = StackSampler().sample(0.3, frequency=100, mode="cpu")
+        finally:
+            stop.set()
+
+    assert any(stack.startswith("thread:short;") for stack in stacks)
+
+
+def test_one_profile_at_a_time() -> None:
+    sampler = StackSampler()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = executor.submit(sampler.sample, 0.3, 10, "wall")
+        time.sleep(0.1)
+        with pytest.raises(ProfilerBusy):
+            sampler.sample(0.1, 10, "wall")
+        first.result()
+    with pytest.raises(ValueError):
+        sampler.sample(0, 10, "wall")
+    with pytest.raises(ValueError):
+        sampler.sample(1, 10, "other")
+
+
+@pytest.fixture
+def server():
+    httpd = start_http_server(port=0, addr="127.0.0.1", token="secret")
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(server, path: str, headers: Optional[Dict[str, str]] = None):
+    url = "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, ""
+
+
+def test_profile_endpoint(server) -> None:
+    authorization = {"Authorization": "Bearer secret"}
+
+    status, body = _get(server, "/profile?seconds=0.1&hz=50&mode=wall", authorization)
+    assert status == HTTPStatus.OK
+    for line in body.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith(("endpoint:", "thread:")) and int(count) > 0
+    assert _get(server, "/profile?seconds=0.1", {"Authorization": "Bearer other"})[0] == HTTPStatus.UNAUTHORIZED
+    assert _get(server, "/profile?seconds=0.1")[0] == HTTPStatus.UNAUTHORIZED
+    assert _get(server, "/profile?seconds=600", authorization)[0] == HTTPStatus.BAD_REQUEST
+    assert _get(server, "/profile?hz=abc", authorization)[0] == HTTPStatus.BAD_REQUEST
+    status, body = _get(server, "/metrics")
+    assert status == HTTPStatus.OK and "app_profiler_profiles_total" in body
+
+
+def test_profile_endpoint_is_disabled_without_token() -> None:
+    httpd = start_http_server(port=0, addr="127.0.0.1")
+    try:
+        assert _get(httpd, "/profile?seconds=0.1")[0] == HTTPStatus.NOT_FOUND
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
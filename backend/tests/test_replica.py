@@ -0,0 +1,155 @@
+import math
+from http import HTTPStatus
+from typing import List, Optional
+from uuid import UUID
+
+import pytest
+from flask import Flask
+
+from app.apis.todo import make_todos_blueprint, READ_YOUR_WRITES_COOKIE
+from app.models.todo import Todo
+from app.repository.memory import InMemoryRepository
+from app.repository.postgresql import PostgreSQLRepository
+from app.repository.routing import READ_ROUTING, ReplicaLag, read_from_primary, is_pinned_to_primary
+
+
+def _routed(reason: str) -> float:
+    pool = "replica" if reason == "replica" else "primary"
+    return READ_ROUTING.labels(pool=pool, reason=reason)._value.get()
+
+
+@pytest.fixture
+def replica_repository():
+    # the primary stands in for its replica: the routing does not depend on replication
+    connection_url = PostgreSQLRepository.factory()._connection_url
+    repository = PostgreSQLRepository(
+        connection_url, max_connections=2, replica_url=connection_url, max_replica_lag=1.0
+    )
+    repository.connect()
+    repository.initialize()
+    yield repository
+    repository.disconnect()
+
+
+def test_reads_go_to_the_replica(replica_repository: PostgreSQLRepository) -> None:
+    repository = replica_repository
+    before = _routed("replica")
+
+    id_ = repository.insert("Todo")
+    assert repository.get(id_).text == "Todo"
+    repository.list()
+    repository.list_page(after=None, limit=10)
+    repository.stats()
+    repository.version()
+    assert _routed("replica") - before == 5
+    assert repository._replica_pool._size == 1
+    repository.delete(id_)
+
+
+def test_pinned_reads_go_to_the_primary(replica_repository: PostgreSQLRepository) -> None:
+    repository = replica_repository
+    before = _routed("read_your_writes"), _routed("replica")
+
+    with read_from_primary():
+        assert is_pinned_to_primary()
+        repository.stats()
+    assert not is_pinned_to_primary()
+    assert (_routed("read_your_writes"), _routed("replica")) == (before[0] + 1, before[1])
+    assert repository._replica_pool._size == 0
+
+
+def test_lagging_replica_is_skipped(replica_repository: PostgreSQLRepository) -> None:
+    repository = replica_repository
+    assert repository._replica_lag.get() == 0.0
+    repository._replica_lag = ReplicaLag(lambda: 2.0, refresh_interval=0)
+    before = _routed("replica_lag")
+
+    repository.stats()
+    assert _routed("replica_lag") - before == 1
+
+
+def test_replica_lag_is_measured_at_most_once_per_interval() -> None:
+    measures = [0.5, 3.0]
+    lag = ReplicaLag(lambda: measures.pop(0), refresh_interval=3600)
+
+    assert lag.get() == 0.5
+    assert lag.get() == 0.5
+    assert measures == [3.0]
+
+
+def test_replica_lag_is_infinite_when_unreachable() -> None:
+    def fail() -> float:
+        raise OSError("Replica unreachable")
+
+    assert ReplicaLag(fail).get() == math.inf
+
+
+class PinRecordingRepository(InMemoryRepository):
+    def __init__(self):
+        super().__init__()
+        self.pinned: List[bool] = []
+
+    def version(self) -> int:
+        self.pinned.append(is_pinned_to_primary())
+        return super().version()
+
+    def get(self, id_: UUID) -> Optional[Todo]:
+        self.pinned.append(is_pinned_to_primary())
+        return super().get(id_)
+
+
+@pytest.fixture
+def recording_repository():
+    yield PinRecordingRepository()
+
+
+def make_client(repository: PinRecordingRepository, window: float):
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(repository, read_your_writes_window=window))
+    return app.test_client()
+
+
+def test_writers_read_from_the_primary(recording_repository: PinRecordingRepository) -> None:
+    repository = recording_repository
+    client = make_client(repository, window=60)
+
+    client.get("/todos/")
+    response = client.post("/todos/", json={"text": "Todo"})
+    assert response.status_code == HTTPStatus.CREATED
+    assert READ_YOUR_WRITES_COOKIE in response.headers["Set-Cookie"]
+    client.get("/todos/{}".format(response.get_json()["id"]))
+
+    # other clients are not pinned
+    make_client(repository, window=60).get("/todos/")
+    assert repository.pinned == [False, True, False]
+    assert not is_pinned_to_primary()
+
+
+def test_failed_writes_do_not_pin(recording_repository: PinRecordingRepository) -> None:
+    repository = recording_repository
+    client = make_client(repository, window=60)
+
+    response = client.delete("/todos/{}".format(UUID(int=1)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert "Set-Cookie" not in response.headers
+    client.get("/todos/")
+    assert repository.pinned == [False]
+
+
+def test_expired_pin(recording_repository: PinRecordingRepository) -> None:
+    repository = recording_repository
+    client = make_client(repository, window=60)
+
+    client.set_cookie("localhost", READ_YOUR_WRITES_COOKIE, "1.0", path="/todos")
+    client.get("/todos/")
+    assert repository.pinned == [False]
+
+
+def test_read_your_writes_disabled(recording_repository: PinRecordingRepository) -> None:
+    repository = recording_repository
+    client = make_client(repository, window=0)
+
+    response = client.post("/todos/", json={"text": "Todo"})
+    assert "Set-Cookie" not in response.headers
+    client.get("/todos/")
+    assert repository.pinned == [False]
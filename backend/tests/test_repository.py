@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Tuple, Optional, List, Iterator
 from uuid import uuid4, UUID
 
 import pytest
@@ -6,50 +6,9 @@ import pytest
 from app.models.stats import Stats
 from app.models.todo import Todo
 from app.repository.base import Repository
-from app.repository.instrumented import InstrumentedRepository
-from app.repository.memory import InMemoryRepository
 from app.repository.postgresql import PostgreSQLRepository
 
 
-def pytest_generate_tests(metafunc):
-    if "repository" in metafunc.fixturenames:
-        metafunc.parametrize(
-            "repository",
-            ["in_memory", "postgresql", "instrumented_in_memory"],
-            indirect=True,
-        )
-
-
-@pytest.fixture
-def in_memory_repository():
-    yield InMemoryRepository()
-
-
-@pytest.fixture
-def postgresql_repository():
-    repository = PostgreSQLRepository.factory()
-    repository.connect()
-    repository.initialize()
-    yield repository
-    repository.disconnect()
-
-
-# noinspection PyProtectedMember
-@pytest.fixture
-def repository(request, in_memory_repository, postgresql_repository):
-    if request.param == "in_memory":
-        repository = in_memory_repository
-    elif request.param == "postgresql":
-        repository = postgresql_repository
-    elif request.param == "instrumented_in_memory":
-        repository = InstrumentedRepository(in_memory_repository)
-    else:
-        raise ValueError("Invalid repository in test configuration")
-    repository._clean()
-    yield repository
-    repository._clean()
-
-
 def test_stats_empty(repository: Repository) -> None:
     stats = repository.stats()
     assert stats == Stats(active=0, inactive=0)
@@ -65,6 +24,85 @@ def test_stats(repository: Repository) -> None:
     assert stats == Stats(active=2, inactive=1)
 
 
+def test_stats_after_updates(repository: Repository) -> None:
+    id_1, _ = _insert_todo(repository, "This is a Todo!")
+    id_2, _ = _insert_todo(repository, "This is a ANOTHER Todo!")
+    repository.deactivate(id_1)
+    repository.deactivate(id_1)
+    repository.activate(id_2)
+    repository.edit_text(id_1, "Hello")
+    assert repository.stats() == Stats(active=1, inactive=1)
+
+    repository.delete(id_1)
+    assert repository.stats() == Stats(active=1, inactive=0)
+
+    repository.delete(id_2)
+    repository.delete(id_2)
+    assert repository.stats() == Stats(active=0, inactive=0)
+
+
+# noinspection PyProtectedMember
+def test_reconcile_stats(postgresql_repository: PostgreSQLRepository) -> None:
+    postgresql_repository._clean()
+    postgresql_repository.insert_many(["A", "B", "C"])
+    with postgresql_repository._cursor() as curs:
+        # slots survive a TRUNCATE, to keep their version: put the whole count in one of them
+        curs.execute(
+            "UPDATE todos_counters "
+            "SET active = CASE WHEN slot = (SELECT min(slot) FROM todos_counters) THEN 42 ELSE 0 END;"
+        )
+    assert postgresql_repository.stats() == Stats(active=42, inactive=0)
+
+    version = postgresql_repository.version()
+    postgresql_repository.reconcile_stats()
+    assert postgresql_repository.stats() == Stats(active=3, inactive=0)
+    assert postgresql_repository.version() == version
+    postgresql_repository._clean()
+
+
+# noinspection PyProtectedMember
+def test_statements_are_prepared_once_per_connection(
+    postgresql_repository: PostgreSQLRepository,
+) -> None:
+    postgresql_repository.get(_random_id())
+    postgresql_repository.get(_random_id())
+
+    with postgresql_repository._cursor() as curs:
+        curs.execute("SELECT name FROM pg_prepared_statements;")
+        assert [row[0] for row in curs] == ["todos_get"]
+
+
+def test_version_increases_on_writes(repository: Repository) -> None:
+    versions = [repository.version()]
+    id_, _ = _insert_todo(repository, "This is a Todo!")
+    versions.append(repository.version())
+    repository.edit_text(id_, "Hello")
+    versions.append(repository.version())
+    repository.deactivate(id_)
+    versions.append(repository.version())
+    repository.insert_many(["A", "B"])
+    versions.append(repository.version())
+    repository.delete(id_)
+    versions.append(repository.version())
+    repository._clean()
+    versions.append(repository.version())
+    assert versions == sorted(set(versions))
+
+
+def test_version_unchanged_by_reads_and_missed_writes(repository: Repository) -> None:
+    id_, _ = _insert_todo(repository, "This is a Todo!")
+    version = repository.version()
+
+    repository.get(id_)
+    repository.list()
+    repository.stats()
+    repository.activate(_random_id())
+    repository.delete(_random_id())
+    repository.delete_many([_random_id()])
+    repository.insert_many([])
+    assert repository.version() == version
+
+
 def test_get_not_existing_todo(repository: Repository) -> None:
     todo = repository.get(_random_id())
     assert todo is None
@@ -105,6 +143,153 @@ def test_get_list_with_multiple_todos(repository: Repository) -> None:
     )
 
 
+def test_list_page_empty(repository: Repository) -> None:
+    todos = repository.list_page(after=None, limit=10)
+    assert todos == ()
+
+
+def test_list_page(repository: Repository) -> None:
+    for i in range(5):
+        _insert_todo(repository, "Todo #{}".format(i))
+    all_todos = repository.list()
+
+    first_page = repository.list_page(after=None, limit=2)
+    assert first_page == all_todos[:2]
+
+    second_page = repository.list_page(after=first_page[-1].id, limit=2)
+    assert second_page == all_todos[2:4]
+
+    last_page = repository.list_page(after=second_page[-1].id, limit=2)
+    assert last_page == all_todos[4:]
+
+
+def test_list_page_after_not_existing_todo(repository: Repository) -> None:
+    for i in range(3):
+        _insert_todo(repository, "Todo #{}".format(i))
+    all_todos = repository.list()
+
+    todos = repository.list_page(after=UUID(int=0), limit=10)
+    assert todos == all_todos
+
+    todos = repository.list_page(after=UUID(int=2 ** 128 - 1), limit=10)
+    assert todos == ()
+
+
+def _expected_search(
+    repository: Repository, active: Optional[bool], text: Optional[str], after: Optional[UUID] = None
+) -> Tuple[Todo, ...]:
+    return tuple(
+        todo
+        for todo in repository.list()
+        if (active is None or todo.active == active)
+        and (not text or text.lower() in todo.text.lower())
+        and (after is None or todo.id > after)
+    )
+
+
+SEARCHES = [
+    (active, text)
+    for active in (None, True, False)
+    for text in (None, "", "o", "buy", "MILK", "milk and", "100%", "a_b", "not found")
+]
+
+
+def test_search(repository: Repository) -> None:
+    texts = ["Buy milk", "buy Milk and eggs", "Call Bob", "Be 100% sure", "a_b", "axb", "Buy bread", "o"]
+    ids = repository.insert_many(texts)
+    repository.deactivate(ids[1])
+    repository.deactivate(ids[2])
+    # searching builds any lazy index, which the following writes must keep up to date
+    repository.search(text="milk")
+
+    repository.edit_text(ids[0], "Buy oat milk")
+    repository.edit_text(ids[6], "Sell bread")
+    repository.activate(ids[2])
+    repository.deactivate(ids[3])
+    repository.delete(ids[7])
+    repository.insert("Buy more milk")
+
+    for active, text in SEARCHES:
+        assert repository.search(active=active, text=text) == _expected_search(repository, active, text)
+
+
+def test_search_pages(repository: Repository) -> None:
+    ids = repository.insert_many(["Todo #{}".format(i) for i in range(10)])
+    repository.set_active_many(ids[::3], active=False)
+
+    for active, text in ((None, None), (True, None), (False, None), (True, "todo #"), (None, "#1")):
+        expected = _expected_search(repository, active, text)
+        todos: List[Todo] = []
+        after = None
+        while True:
+            page = repository.search(active=active, text=text, after=after, limit=2)
+            todos.extend(page)
+            if len(page) < 2:
+                break
+            after = page[-1].id
+        assert tuple(todos) == expected
+
+    after = repository.list()[4].id
+    assert repository.search(active=True, after=after) == _expected_search(repository, True, None, after)
+    assert repository.search(text="todo", after=UUID(int=2 ** 128 - 1)) == ()
+
+
+def test_search_after_clean(repository: Repository) -> None:
+    repository.insert("Buy milk")
+    assert len(repository.search(active=True, text="milk")) == 1
+    repository._clean()
+
+    assert repository.search(active=True, text="milk") == ()
+    id_ = repository.insert("Buy more milk")
+    assert repository.search(active=True, text="milk") == (Todo(id=id_, text="Buy more milk", active=True),)
+
+
+def test_export_todos(repository: Repository) -> None:
+    ids = repository.insert_many(["Todo #{}".format(i) for i in range(5)])
+    repository.deactivate(ids[1])
+
+    todos = repository.export_todos()
+    assert next(todos) == repository.list()[0]
+    assert tuple(todos) == repository.list()[1:]
+    assert tuple(repository.export_todos()) == repository.list()
+
+
+def test_import_todos(repository: Repository) -> None:
+    id_ = repository.insert("Stored")
+    todos = [
+        Todo(id=uuid4(), text="Imported", active=True),
+        Todo(id=uuid4(), text="Tab\tnew line\nback\\slash", active=False),
+        Todo(id=uuid4(), text="", active=True),
+    ]
+
+    assert repository.import_todos(iter(todos)) == 3
+    assert repository.list() == tuple(sorted(todos + [Todo(id=id_, text="Stored", active=True)]))
+    assert repository.stats() == Stats(active=3, inactive=1)
+    assert repository.search(active=False, text="new line") == (todos[1],)
+    assert repository.import_todos([]) == 0
+
+
+def test_import_todos_is_all_or_nothing(repository: Repository) -> None:
+    id_ = repository.insert("Stored")
+    version = repository.version()
+    new = Todo(id=uuid4(), text="New", active=True)
+
+    with pytest.raises(ValueError):
+        repository.import_todos([new, Todo(id=id_, text="Duplicate", active=True)])
+    with pytest.raises(ValueError):
+        repository.import_todos([new, new])
+
+    def failing_todos() -> Iterator[Todo]:
+        yield new
+        raise ValueError("Invalid Todo")
+
+    with pytest.raises(ValueError, match="Invalid Todo"):
+        repository.import_todos(failing_todos())
+    assert repository.list() == (Todo(id=id_, text="Stored", active=True),)
+    assert repository.stats() == Stats(active=1, inactive=0)
+    assert repository.version() == version
+
+
 def test_edit_text_not_existing_todo(repository: Repository) -> None:
     id_, text = _insert_todo(repository, "This is a Todo!")
 
@@ -211,6 +396,46 @@ def test_delete_existing_todo(repository: Repository) -> None:
     assert todos == (Todo(id=id_2, text=text_2, active=True),)
 
 
+def test_insert_many(repository: Repository) -> None:
+    ids = repository.insert_many(["A", "B", "C"])
+    assert len(set(ids)) == 3
+
+    for id_, text in zip(ids, ["A", "B", "C"]):
+        assert repository.get(id_) == Todo(id=id_, text=text, active=True)
+    assert repository.stats() == Stats(active=3, inactive=0)
+
+
+def test_insert_many_empty(repository: Repository) -> None:
+    assert repository.insert_many([]) == ()
+    assert repository.list() == ()
+
+
+def test_set_active_many(repository: Repository) -> None:
+    id_1, text_1 = _insert_todo(repository, "This is a Todo!")
+    id_2, text_2 = _insert_todo(repository, "This is a ANOTHER Todo!")
+    id_3 = _random_id()
+
+    result = repository.set_active_many([id_1, id_3, id_2], active=False)
+    assert result == (True, False, True)
+    assert repository.stats() == Stats(active=0, inactive=2)
+
+    result = repository.set_active_many([id_2], active=True)
+    assert result == (True,)
+    assert repository.get(id_1) == Todo(id=id_1, text=text_1, active=False)
+    assert repository.get(id_2) == Todo(id=id_2, text=text_2, active=True)
+
+
+def test_delete_many(repository: Repository) -> None:
+    id_1, _ = _insert_todo(repository, "This is a Todo!")
+    id_2, text_2 = _insert_todo(repository, "This is a ANOTHER Todo!")
+    id_3, _ = _insert_todo(repository, "This is a yet ANOTHER Todo!")
+
+    result = repository.delete_many([id_1, _random_id(), id_3])
+    assert result == (True, False, True)
+    assert repository.list() == (Todo(id=id_2, text=text_2, active=True),)
+    assert repository.delete_many([]) == ()
+
+
 def _random_id() -> UUID:
     return uuid4()
 
@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.models.stats import Stats
+from app.repository.memory import InMemoryRepository
+from app.repository.routing import read_from_primary
+from app.repository.single_flight import SingleFlightRepository
+
+
+class BlockingRepository(InMemoryRepository):
+    """
+    Repository whose reads wait until released, to hold identical reads in flight together.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.calls: List[str] = []
+        self.error: Optional[Exception] = None
+
+    def list(self):
+        self.calls.append("list")
+        self.release.wait()
+        return super().list()
+
+    def stats(self):
+        self.calls.append("stats")
+        self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return super().stats()
+
+
+@pytest.fixture
+def backend():
+    yield BlockingRepository()
+
+
+@pytest.fixture
+def single_flight(backend):
+    yield SingleFlightRepository(backend)
+
+
+def _coalesced(query: str) -> float:
+    return REGISTRY.get_sample_value("app_repository_coalesced_calls_total", {"query": query}) or 0.0
+
+
+def _wait_until(condition) -> None:
+    while not condition():
+        time.sleep(0.001)
+
+
+def test_identical_reads_share_one_call(single_flight: SingleFlightRepository, backend: BlockingRepository) -> None:
+    backend.release.set()
+    id_ = single_flight.insert("This is a Todo!")
+    backend.release.clear()
+    before = _coalesced("list")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(single_flight.list) for _ in range(8)]
+        _wait_until(lambda: _coalesced("list") - before == 7)
+        backend.release.set()
+        results = [future.result() for future in futures]
+
+    assert backend.calls == ["list"]
+    assert all(result is results[0] for result in results)
+    assert [todo.id for todo in results[0]] == [id_]
+    assert _coalesced("list") - before == 7
+
+    # nothing is kept once the call returned
+    single_flight.list()
+    assert backend.calls == ["list", "list"]
+
+
+def test_errors_reach_every_waiter(single_flight: SingleFlightRepository, backend: BlockingRepository) -> None:
+    backend.error = RuntimeError("Database is down")
+    before = _coalesced("stats")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(single_flight.stats) for _ in range(4)]
+        _wait_until(lambda: _coalesced("stats") - before == 3)
+        backend.release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match="Database is down"):
+                future.result()
+
+    backend.error = None
+    assert single_flight.stats() == Stats(active=0, inactive=0)
+    assert backend.calls == ["stats", "stats"]
+
+
+def test_reads_after_a_write_do_not_join_older_calls(
+    single_flight: SingleFlightRepository, backend: BlockingRepository
+) -> None:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(single_flight.stats)
+        _wait_until(lambda: len(backend.calls) == 1)
+        # a write that ends while the first call runs
+        single_flight.insert("This is a Todo!")
+        second = executor.submit(single_flight.stats)
+        _wait_until(lambda: len(backend.calls) == 2)
+        backend.release.set()
+
+        assert second.result() == Stats(active=1, inactive=0)
+        first.result()
+
+
+def test_pinned_reads_do_not_join_other_reads(
+    single_flight: SingleFlightRepository, backend: BlockingRepository
+) -> None:
+    def pinned_stats():
+        with read_from_primary():
+            return single_flight.stats()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(single_flight.stats), executor.submit(pinned_stats)]
+        _wait_until(lambda: len(backend.calls) == 2)
+        backend.release.set()
+        assert [future.result() for future in futures] == [Stats(active=0, inactive=0)] * 2
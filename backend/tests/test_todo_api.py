@@ -0,0 +1,194 @@
+from http import HTTPStatus
+
+import pytest
+from flask import Flask
+from flask.testing import FlaskClient
+
+from app.apis.todo import make_todos_blueprint
+from app.models.stats import Stats
+from app.repository.memory import InMemoryRepository
+
+
+@pytest.fixture
+def repository():
+    yield InMemoryRepository()
+
+
+@pytest.fixture
+def client(repository):
+    app = Flask(__name__)
+    app.register_blueprint(make_todos_blueprint(repository))
+    with app.test_client() as client:
+        yield client
+
+
+def test_list_without_pagination(client: FlaskClient, repository) -> None:
+    id_ = repository.insert("This is a Todo!")
+
+    response = client.get("/todos/")
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json() == [{"id": str(id_), "text": "This is a Todo!", "active": True}]
+
+
+def test_list_not_modified(client: FlaskClient, repository) -> None:
+    repository.insert("This is a Todo!")
+    response = client.get("/todos/")
+    etag = response.headers["ETag"]
+
+    response = client.get("/todos/", headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.data == b""
+
+    repository.insert("This is a ANOTHER Todo!")
+    response = client.get("/todos/", headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()) == 2
+
+
+def test_get_not_modified(client: FlaskClient, repository) -> None:
+    id_ = repository.insert("This is a Todo!")
+    response = client.get("/todos/{}".format(id_))
+    etag = response.headers["ETag"]
+
+    response = client.get("/todos/{}".format(id_), headers={"If-None-Match": "W/" + etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    repository.delete(id_)
+    response = client.get("/todos/{}".format(id_), headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert "ETag" not in response.headers
+
+
+def test_get_not_modified_is_scoped_to_the_todo(client: FlaskClient, repository) -> None:
+    id_ = repository.insert("This is a Todo!")
+    other_id = repository.insert("This is another Todo!")
+    etag = client.get("/todos/{}".format(id_)).headers["ETag"]
+    list_etag = client.get("/todos/").headers["ETag"]
+
+    assert client.get("/todos/{}".format(other_id), headers={"If-None-Match": etag}).status_code == HTTPStatus.OK
+    for missing in ("00000000-0000-0000-0000-000000000000", "ffffffff-ffff-ffff-ffff-ffffffffffff"):
+        response = client.get("/todos/{}".format(missing), headers={"If-None-Match": list_etag})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    # a write to another Todo does not invalidate it
+    repository.edit_text(other_id, "Edited")
+    response = client.get("/todos/{}".format(id_), headers={"If-None-Match": etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_list_pages(client: FlaskClient, repository) -> None:
+    for i in range(5):
+        repository.insert("Todo #{}".format(i))
+    expected = [str(todo.id) for todo in repository.list()]
+
+    ids = []
+    response = client.get("/todos/?limit=2")
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        page = response.get_json()
+        ids.extend(todo["id"] for todo in page["todos"])
+        if page["next"] is None:
+            break
+        response = client.get("/todos/?limit=2&after={}".format(page["next"]))
+
+    assert ids == expected
+
+
+def test_list_filtered(client: FlaskClient, repository) -> None:
+    ids = repository.insert_many(["Buy milk", "Buy bread", "Call Bob", "buy MILK again"])
+    repository.deactivate(ids[1])
+    repository.deactivate(ids[3])
+
+    def texts(query: str):
+        response = client.get("/todos/?{}".format(query))
+        assert response.status_code == HTTPStatus.OK
+        body = response.get_json()
+        return sorted(todo["text"] for todo in (body["todos"] if "limit" in query else body))
+
+    assert texts("active=true") == ["Buy milk", "Call Bob"]
+    assert texts("active=false") == ["Buy bread", "buy MILK again"]
+    assert texts("q=milk") == ["Buy milk", "buy MILK again"]
+    assert texts("q=milk&active=false") == ["buy MILK again"]
+    assert texts("q=") == ["Buy bread", "Buy milk", "Call Bob", "buy MILK again"]
+    assert texts("q=buy&limit=10") == ["Buy bread", "Buy milk", "buy MILK again"]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "limit=100000", "after=abc", "active=yes"])
+def test_list_invalid_page(client: FlaskClient, query: str) -> None:
+    response = client.get("/todos/?{}".format(query))
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_create_batch(client: FlaskClient, repository) -> None:
+    response = client.post("/todos/batch", json={"texts": ["A", "I like speck", "B"]})
+    assert response.status_code == HTTPStatus.OK
+    results = response.get_json()["results"]
+    assert [result["status"] for result in results] == [201, 500, 201]
+    assert [todo.text for todo in repository.list()] == ["A", "B"]
+
+
+def test_update_batch(client: FlaskClient, repository) -> None:
+    id_1 = str(repository.insert("A"))
+    id_2 = str(repository.insert("B"))
+
+    response = client.post("/todos/batch/deactivate", json={"ids": [id_1, "abc"]})
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json()["results"] == [
+        {"id": id_1, "status": 204},
+        {"id": "abc", "status": 404},
+    ]
+
+    response = client.post("/todos/batch/delete", json={"ids": [id_1, id_2]})
+    assert [result["status"] for result in response.get_json()["results"]] == [204, 204]
+    assert repository.list() == ()
+
+
+@pytest.mark.parametrize("body", [{}, {"ids": "abc"}, {"ids": [1, 2]}])
+def test_invalid_batch(client: FlaskClient, body: dict) -> None:
+    response = client.post("/todos/batch/delete", json=body)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_export_import(client: FlaskClient, repository) -> None:
+    ids = repository.insert_many(["Todo #{}".format(i) for i in range(2500)])
+    repository.deactivate(ids[1])
+
+    response = client.get("/todos/export")
+    assert response.status_code == HTTPStatus.OK
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    body = response.get_data()
+    assert body.count(b"\n") == 2500
+    repository._clean()
+
+    body_with_new = body + b'\n{"text": "New"}\n'
+    response = client.post("/todos/import", data=body_with_new, content_type="application/x-ndjson")
+    assert response.status_code == HTTPStatus.OK
+    assert response.get_json() == {"imported": 2501}
+    assert repository.stats() == Stats(active=2500, inactive=1)
+    assert not repository.get(ids[1]).active
+    assert client.get("/todos/export").get_data().startswith(body)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"not json\n", b'["Todo"]\n', b'{"active": true}\n', b'{"id": "abc", "text": "Todo"}\n', b'{"text": 1}\n'],
+)
+def test_import_invalid(client: FlaskClient, repository, body: bytes) -> None:
+    valid = b'{"text": "Todo"}\n'
+    response = client.post("/todos/import", data=valid + body, content_type="application/x-ndjson")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert repository.list() == ()
+
+
+def test_import_duplicate_or_not_ndjson(client: FlaskClient, repository) -> None:
+    id_ = repository.insert("Todo")
+    body = '{{"id": "{}", "text": "Duplicate"}}\n'.format(id_)
+
+    response = client.post("/todos/import", data=body, content_type="application/x-ndjson")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = client.post("/todos/import", data=body, content_type="application/json")
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert repository.stats() == Stats(active=1, inactive=0)
@@ -0,0 +1,138 @@
+import asyncio
+from http import HTTPStatus
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.apis.todo_async import make_async_todos_app
+from app.repository.aio.memory import AsyncInMemoryRepository
+
+
+def _run(scenario) -> None:
+    """
+    Run a test scenario against a fresh application backed by an in-memory repository.
+    :param scenario: Coroutine function that takes a test client and the repository.
+    """
+
+    async def run():
+        repository = AsyncInMemoryRepository()
+        app = web.Application()
+        app.add_subapp("/todos", make_async_todos_app(repository))
+        async with TestClient(TestServer(app)) as client:
+            await scenario(client, repository)
+
+    asyncio.run(run())
+
+
+def test_crud() -> None:
+    async def scenario(client: TestClient, repository: AsyncInMemoryRepository):
+        response = await client.post("/todos/", json={"text": "This is a Todo!"})
+        assert response.status == HTTPStatus.CREATED
+        id_ = (await response.json())["id"]
+
+        response = await client.patch("/todos/{}".format(id_), json={"text": "Hello"})
+        assert response.status == HTTPStatus.NO_CONTENT
+        response = await client.post("/todos/{}/deactivate".format(id_))
+        assert response.status == HTTPStatus.NO_CONTENT
+
+        response = await client.get("/todos/{}".format(id_))
+        assert await response.json() == {"id": id_, "text": "Hello", "active": False}
+        response = await client.get("/todos/")
+        assert await response.json() == [{"id": id_, "text": "Hello", "active": False}]
+
+        response = await client.delete("/todos/{}".format(id_))
+        assert response.status == HTTPStatus.NO_CONTENT
+        response = await client.get("/todos/{}".format(id_))
+        assert response.status == HTTPStatus.NOT_FOUND
+
+    _run(scenario)
+
+
+def test_speck_and_invalid_requests() -> None:
+    async def scenario(client: TestClient, repository: AsyncInMemoryRepository):
+        response = await client.post("/todos/", json={"text": "I like speck"})
+        assert response.status == HTTPStatus.INTERNAL_SERVER_ERROR
+        response = await client.post("/todos/", data="text")
+        assert response.status == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        response = await client.post("/todos/", json={})
+        assert response.status == HTTPStatus.BAD_REQUEST
+        response = await client.post("/todos/abc/activate")
+        assert response.status == HTTPStatus.NOT_FOUND
+        response = await client.get("/todos/?limit=0")
+        assert response.status == HTTPStatus.BAD_REQUEST
+
+    _run(scenario)
+
+
+def test_not_modified() -> None:
+    async def scenario(client: TestClient, repository: AsyncInMemoryRepository):
+        id_ = await repository.insert("This is a Todo!")
+        for path in ("/todos/", "/todos/?limit=10", "/todos/{}".format(id_)):
+            response = await client.get(path)
+            etag = response.headers["ETag"]
+            response = await client.get(path, headers={"If-None-Match": etag})
+            assert response.status == HTTPStatus.NOT_MODIFIED
+
+        await repository.edit_text(id_, "Hello")
+        response = await client.get("/todos/{}".format(id_), headers={"If-None-Match": etag})
+        assert response.status == HTTPStatus.OK
+        assert (await response.json())["text"] == "Hello"
+
+    _run(scenario)
+
+
+def test_pages_and_batches() -> None:
+    async def scenario(client: TestClient, repository: AsyncInMemoryRepository):
+        response = await client.post("/todos/batch", json={"texts": ["A", "speck", "B", "C"]})
+        results = (await response.json())["results"]
+        assert [result["status"] for result in results] == [201, 500, 201, 201]
+        ids = [result["id"] for result in results if "id" in result]
+
+        response = await client.get("/todos/?limit=2")
+        page = await response.json()
+        assert len(page["todos"]) == 2
+        response = await client.get("/todos/?limit=2&after={}".format(page["next"]))
+        page = await response.json()
+        assert len(page["todos"]) == 1 and page["next"] is None
+
+        await client.post("/todos/batch/deactivate", json={"ids": ids[:1]})
+        response = await client.get("/todos/?active=false&q=a")
+        assert [todo["text"] for todo in await response.json()] == ["A"]
+        response = await client.get("/todos/?active=true&limit=2")
+        assert sorted(todo["text"] for todo in (await response.json())["todos"]) == ["B", "C"]
+        response = await client.get("/todos/?active=1")
+        assert response.status == HTTPStatus.BAD_REQUEST
+
+        response = await client.post("/todos/batch/delete", json={"ids": ids[:2] + ["abc"]})
+        results = (await response.json())["results"]
+        assert [result["status"] for result in results] == [204, 204, 404]
+        assert len(await repository.list()) == 1
+
+    _run(scenario)
+
+
+def test_export_import() -> None:
+    async def scenario(client: TestClient, repository: AsyncInMemoryRepository):
+        await repository.insert_many(["Todo #{}".format(i) for i in range(2500)])
+        id_ = (await repository.list())[1].id
+        await repository.deactivate(id_)
+
+        response = await client.get("/todos/export")
+        assert response.content_type == "application/x-ndjson"
+        body = await response.read()
+        assert body.count(b"\n") == 2500
+        await repository._clean()
+
+        headers = {"Content-Type": "application/x-ndjson"}
+        response = await client.post("/todos/import", data=body + b'{"text": "New"}\n', headers=headers)
+        assert await response.json() == {"imported": 2501}
+        assert not (await repository.get(id_)).active
+        response = await client.post("/todos/import", data=body[: body.index(b"\n")], headers=headers)
+        assert response.status == HTTPStatus.BAD_REQUEST
+        response = await client.post("/todos/import", data=b"{", headers=headers)
+        assert response.status == HTTPStatus.BAD_REQUEST
+        response = await client.post("/todos/import", json={"text": "Todo"})
+        assert response.status == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+        assert len(await repository.list()) == 2501
+
+    _run(scenario)
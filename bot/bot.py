@@ -0,0 +1,294 @@
+"""
+Open-loop load generator for the Todos backend.
+
+Requests are fired at a constant arrival rate, whether or not the previous ones completed,
+over a bounded pool of keep-alive connections. Latencies are measured from the time
+each request was due to be sent, so that a slow backend cannot hide its queueing delay
+(coordinated omission). The scenario mix is the one of the original `bot.sh`:
+404 probes, create, update, activate, deactivate, get, list, delete and the "speck" bug.
+Usage:
+```
+    python bot.py --backend http://localhost:5000 --rate 500 --concurrency 100 --duration 60
+```
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import time
+import uuid
+from collections import defaultdict
+from http import HTTPStatus
+from typing import Dict, List, Tuple, Callable, Awaitable, Optional
+
+import aiohttp
+
+TEXT = "I am a robot 🤖"
+EDITED_TEXT = "I am a robot 🤖 and I like 🐖"
+SPECK_TEXT = "🤖 likes speck 🐖"
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+Key = Tuple[str, str]
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram in the spirit of HdrHistogram: latencies are recorded in microseconds
+    with a relative error below 1%, in memory that grows with the range of values, not their number.
+    """
+
+    SUB_BUCKET_BITS = 8
+
+    def __init__(self):
+        self._counts: Dict[Tuple[int, int], int] = defaultdict(int)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        value = max(1, int(seconds * 1e6))
+        exponent = max(0, value.bit_length() - self.SUB_BUCKET_BITS)
+        self._counts[(exponent, value >> exponent)] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for bucket, count in other._counts.items():
+            self._counts[bucket] += count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, quantile: float) -> float:
+        """
+        :param quantile: Quantile between 0 and 1.
+        :return: Highest latency of the bucket holding the quantile, in seconds.
+        """
+        rank = max(1, int(round(quantile * self.count)))
+        seen = 0
+        for exponent, sub_bucket in sorted(self._counts):
+            seen += self._counts[(exponent, sub_bucket)]
+            if seen >= rank:
+                return min(self.max, (((sub_bucket + 1) << exponent) - 1) / 1e6)
+        return self.max
+
+
+class LoadGenerator:
+    """
+    Fire the scenario mix at a constant rate and record latencies per endpoint and status.
+    """
+
+    def __init__(self, backend: str, rate: float, concurrency: int, seed: Optional[int]):
+        self._backend = backend.rstrip("/")
+        self._rate = rate
+        self._concurrency = concurrency
+        self._random = random.Random(seed)
+        self._ids: List[str] = []
+        self._in_flight = 0
+        self._histograms: Dict[Key, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # weights follow the proportions of a loop of the original bot.sh
+        self._scenarios: List[Tuple[Callable[[], Awaitable[Key]], int]] = [
+            (self._probe_missing_endpoint, 20),
+            (self._create, 10),
+            (self._edit_text, 10),
+            (self._activate, 10),
+            (self._deactivate, 10),
+            (self._get, 10),
+            (self._list, 10),
+            (self._delete, 10),
+            (self._create_speck, 10),
+            (self._delete_missing, 10),
+        ]
+
+    async def run(self, duration: Optional[float], report_interval: float) -> Dict[Key, LatencyHistogram]:
+        """
+        :param duration: Time to generate load for, in seconds; forever if None.
+        :param report_interval: Time between two reports, in seconds.
+        :return: Latencies of the whole run, by endpoint and status.
+        """
+        loop = asyncio.get_event_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        connector = aiohttp.TCPConnector(limit=self._concurrency)
+        total: Dict[Key, LatencyHistogram] = defaultdict(LatencyHistogram)
+        async with aiohttp.ClientSession(connector=connector) as self._session:
+            tasks = set()
+            start = loop.time()
+            next_report = start + report_interval
+            sent = 0
+            while not stop.is_set() and (duration is None or loop.time() - start < duration):
+                due = start + sent / self._rate
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = loop.create_task(self._fire(due))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+
+                if loop.time() >= next_report:
+                    interval, self._histograms = self._histograms, defaultdict(LatencyHistogram)
+                    for key, histogram in interval.items():
+                        total[key].merge(histogram)
+                    print_report(interval, report_interval, self._in_flight)
+                    next_report += report_interval
+
+            if tasks:
+                await asyncio.wait(tasks)
+        for key, histogram in self._histograms.items():
+            total[key].merge(histogram)
+        return total
+
+    async def _fire(self, due: float) -> None:
+        scenario = self._random.choices(
+            [scenario for scenario, _ in self._scenarios], [weight for _, weight in self._scenarios]
+        )[0]
+        self._in_flight += 1
+        try:
+            endpoint, status = await scenario()
+        finally:
+            self._in_flight -= 1
+        self._histograms[(endpoint, status)].record(asyncio.get_event_loop().time() - due)
+
+    async def _request(self, method: str, endpoint: str, path: str, **kwargs) -> Tuple[Key, Optional[dict]]:
+        try:
+            async with self._session.request(method, self._backend + path, **kwargs) as response:
+                body = await response.read()
+                data = json.loads(body) if response.status == HTTPStatus.CREATED else None
+                return (endpoint, str(response.status)), data
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            return (endpoint, type(error).__name__), None
+
+    def _pick_id(self) -> Optional[str]:
+        return self._random.choice(self._ids) if self._ids else None
+
+    async def _probe_missing_endpoint(self) -> Key:
+        key, _ = await self._request("GET", "GET /speck", "/speck")
+        return key
+
+    async def _create(self) -> Key:
+        key, data = await self._request("POST", "POST /todos/", "/todos/", json={"text": TEXT})
+        if data is not None:
+            self._ids.append(data["id"])
+        return key
+
+    async def _create_speck(self) -> Key:
+        key, _ = await self._request("POST", "POST /todos/", "/todos/", json={"text": SPECK_TEXT})
+        return key
+
+    async def _edit_text(self) -> Key:
+        id_ = self._pick_id()
+        if id_ is None:
+            return await self._create()
+        key, _ = await self._request(
+            "PATCH", "PATCH /todos/<id>", "/todos/{}".format(id_), json={"text": EDITED_TEXT}
+        )
+        return key
+
+    async def _activate(self) -> Key:
+        id_ = self._pick_id()
+        if id_ is None:
+            return await self._create()
+        key, _ = await self._request(
+            "POST", "POST /todos/<id>/activate", "/todos/{}/activate".format(id_)
+        )
+        return key
+
+    async def _deactivate(self) -> Key:
+        id_ = self._pick_id()
+        if id_ is None:
+            return await self._create()
+        key, _ = await self._request(
+            "POST", "POST /todos/<id>/deactivate", "/todos/{}/deactivate".format(id_)
+        )
+        return key
+
+    async def _get(self) -> Key:
+        id_ = self._pick_id()
+        if id_ is None:
+            return await self._create()
+        key, _ = await self._request("GET", "GET /todos/<id>", "/todos/{}".format(id_))
+        return key
+
+    async def _list(self) -> Key:
+        key, _ = await self._request("GET", "GET /todos/", "/todos/")
+        return key
+
+    async def _delete(self) -> Key:
+        if not self._ids:
+            return await self._create()
+        # swap with the last ID to remove in constant time
+        index = self._random.randrange(len(self._ids))
+        self._ids[index], self._ids[-1] = self._ids[-1], self._ids[index]
+        id_ = self._ids.pop()
+        key, _ = await self._request("DELETE", "DELETE /todos/<id>", "/todos/{}".format(id_))
+        return key
+
+    async def _delete_missing(self) -> Key:
+        key, _ = await self._request("DELETE", "DELETE /todos/<id>", "/todos/{}".format(uuid.uuid4()))
+        return key
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return "{:.2f}s".format(seconds)
+    if seconds >= 1e-3:
+        return "{:.2f}ms".format(seconds * 1e3)
+    return "{:.0f}us".format(seconds * 1e6)
+
+
+def print_report(histograms: Dict[Key, LatencyHistogram], elapsed: float, in_flight: int) -> None:
+    """
+    Print count, rate and latency percentiles by endpoint and status.
+    :param histograms: Latencies by endpoint and status.
+    :param elapsed: Time covered by the latencies, in seconds.
+    :param in_flight: Number of requests still waiting for a response.
+    """
+    quantiles = ["p{:g}".format(q * 100) for q in QUANTILES]
+    header = "{:<28} {:<16} {:>8} {:>9}" + " {:>9}" * (len(QUANTILES) + 1)
+    print(time.strftime("%H:%M:%S"), "in flight: {}".format(in_flight))
+    print(header.format("endpoint", "status", "count", "rate", *quantiles, "max"))
+    for (endpoint, status), histogram in sorted(histograms.items()):
+        print(
+            header.format(
+                endpoint,
+                status,
+                histogram.count,
+                "{:.1f}/s".format(histogram.count / elapsed),
+                *(format_seconds(histogram.percentile(q)) for q in QUANTILES),
+                format_seconds(histogram.max),
+            )
+        )
+    print(flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=os.environ.get("BACKEND", "http://localhost:5000"))
+    parser.add_argument(
+        "--rate", type=float, default=float(os.environ.get("RATE", "1")), help="Requests per second."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("CONCURRENCY", "1")),
+        help="Max number of open connections.",
+    )
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to run for; forever by default.")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Seconds between two reports.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the scenario mix.")
+    args = parser.parse_args()
+
+    generator = LoadGenerator(args.backend, args.rate, args.concurrency, args.seed)
+    start = time.monotonic()
+    total = asyncio.run(generator.run(args.duration, args.report_interval))
+    print("Total")
+    print_report(total, time.monotonic() - start, 0)
+
+
+if __name__ == "__main__":
+    main()